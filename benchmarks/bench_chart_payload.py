@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Chart Payload Benchmark
+=======================
+
+Measures how much the dashboard's points and faults histograms send to the
+browser per filter change: the JSON of the figures' traces when every
+filtered row is passed to ``px.histogram``, when the aggregate cube's value
+counts are, and when the bins are computed on the server by
+``nw_stats.data.histogram`` and only the bars are sent. Layout and template
+are the same in all three and not counted. The server-side bars are checked against a
+``np.histogram`` of the filtered rows with the same edges.
+
+Usage:
+    python benchmarks/bench_chart_payload.py                 # newest data/snwk_competition_results_*.json
+    python benchmarks/bench_chart_payload.py --scales 1 16 --filters 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+
+# Add the project root to Python path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.bench_cube import random_cells
+from benchmarks.bench_entities import scaled_competitions
+from benchmarks.bench_flatten import default_results_file
+from nw_stats.data.aggregate_cube import ALL, CUBE_DIMENSIONS, build_cube
+from nw_stats.data.histogram import histogram_bins, histogram_figure
+from nw_stats.data.results_stream import participants_from_competitions
+
+CHARTS = [("points", "poäng", "Poäng"), ("faults", "fel", "Fel")]
+
+
+def payload_bytes(fig) -> int:
+    """Bytes of the figure's traces as serialized for the browser (layout and template excluded)."""
+    return len(plotly.io.json.to_json_plotly(fig.to_plotly_json()["data"]).encode("utf-8"))
+
+
+def filter_rows(participants: pd.DataFrame, cell) -> pd.DataFrame:
+    mask = np.ones(len(participants), dtype=bool)
+    for dimension, value in zip(CUBE_DIMENSIONS, cell):
+        if value != ALL:
+            mask &= (participants[dimension] == value).to_numpy()
+    return participants[mask]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark histogram payloads: raw rows against server-side bins.")
+    parser.add_argument("--results", type=Path, default=None, help="results JSON file")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16],
+                        help="dataset sizes, as multiples of the results file")
+    parser.add_argument("--filters", type=int, default=20, help="random filter combinations per size")
+    args = parser.parse_args()
+
+    source = args.results or default_results_file()
+    mismatches = 0
+    print(f"{source.name}: points + faults histograms per filter change, mean over {args.filters} filter combinations")
+    for scale in args.scales:
+        participants = participants_from_competitions(scaled_competitions(source, scale))
+        cube = build_cube(participants)
+        cells = random_cells(participants, args.filters)
+        sizes = {"rows": 0, "value counts": 0, "bars": 0}
+        bin_time = 0.0
+        for cell in cells:
+            filtered = filter_rows(participants, cell)
+            for measure, column, label in CHARTS:
+                counts = getattr(cube, measure)(cell)
+                sizes["rows"] += payload_bytes(px.histogram(filtered, x=column, nbins=10))
+                sizes["value counts"] += payload_bytes(
+                    px.histogram(counts, x=column, y="count", histfunc="sum", nbins=10)
+                )
+                start = time.perf_counter()
+                bins = histogram_bins(counts[column], counts["count"], nbins=10)
+                bin_time += time.perf_counter() - start
+                sizes["bars"] += payload_bytes(histogram_figure(bins, title=label, label=label))
+
+                values = filtered[column].dropna().to_numpy(dtype="float64")
+                if len(bins):
+                    edges = np.r_[bins["start"].to_numpy(), bins["end"].iloc[-1]]
+                    expected = np.histogram(values, bins=edges)[0]
+                    mismatches += not (np.array_equal(expected, bins["count"]) and expected.sum() == len(values))
+                else:
+                    mismatches += len(values) > 0
+
+        per_change = {name: size / len(cells) for name, size in sizes.items()}
+        print(f"  x{scale:<3} {len(participants):>9,} starts  rows {per_change['rows'] / 1024:9.1f} KiB  "
+              f"value counts {per_change['value counts'] / 1024:6.1f} KiB  "
+              f"bars {per_change['bars'] / 1024:5.1f} KiB  "
+              f"({per_change['rows'] / per_change['bars']:6.0f}x smaller, binned in "
+              f"{bin_time / len(cells) * 1000:.2f} ms)")
+
+    print("Bars match the filtered rows" if not mismatches else f"{mismatches} histograms differ")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
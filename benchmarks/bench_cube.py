@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Aggregate Cube Benchmark
+========================
+
+Measures what one sidebar filter change costs in the dashboard: filtering
+the participants frame and recomputing the chart aggregates from the rows,
+against looking them up in ``nw_stats.data.aggregate_cube``. Both are run
+for the same random filter combinations, and the looked-up aggregates are
+checked against the scanned ones, and the starts of the all-"All" cell
+against the number of rows. The cube's build time, peak traced memory
+(``tracemalloc``) and size are reported too.
+
+The results file is measured as it is. Repeating it would not change the
+number of distinct judges, breeds, times and start positions, which is what
+the cube's size depends on, so larger sizes are synthetic frames whose
+cardinalities grow with the rows: up to 150 judges and 250 breeds (a few
+common, many rare), times to 1200 s and start positions to 80, with 1% of
+breeds and 5% of times missing.
+
+Usage:
+    python benchmarks/bench_cube.py                      # newest data/snwk_competition_results_*.json
+    python benchmarks/bench_cube.py --rows 25000 100000 400000 --filters 200
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to Python path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.bench_flatten import default_results_file
+from nw_stats.data.aggregate_cube import (
+    ALL, CUBE_DIMENSIONS, TIME_CATEGORY_BINS, TIME_CATEGORY_LABELS, AggregateCube, Cell, build_cube,
+)
+from nw_stats.data.results_stream import iter_competitions, participants_from_competitions
+
+
+def synthetic_participants(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Participants with realistic value ranges whose judges and breeds grow with ``rows``."""
+    rng = np.random.default_rng(seed)
+
+    def skewed(prefix: str, count: int) -> pd.Categorical:
+        weights = 1 / np.arange(1, count + 1) ** 0.8
+        picks = rng.choice(count, rows, p=weights / weights.sum())
+        return pd.Categorical.from_codes(picks, categories=[f"{prefix} {i}" for i in range(count)])
+
+    searches = rng.choice(["total", "Fordon", "Behållare", "Inomhus", "Utomhus"], rows)
+    breeds = skewed("Ras", min(250, 20 + rows // 1500))
+    breeds[rng.random(rows) < 0.01] = np.nan
+    times = np.round(np.clip(rng.lognormal(np.log(120), 0.8, rows), 2, 1200), 2)
+    times[rng.random(rows) < 0.05] = np.nan
+    start_positions = rng.integers(1, 81, rows)
+    return pd.DataFrame({
+        "typ": pd.Categorical(rng.choice(["TEM", "TSM"], rows, p=[0.7, 0.3])),
+        "typ_av_sök": pd.Categorical(searches),
+        "klass": pd.Categorical(rng.choice(["NW1", "NW2", "NW3"], rows)),
+        "domare": skewed("Domare", min(150, 10 + rows // 2500)),
+        "hundras": breeds,
+        # Totals are out of 100, single searches out of 25
+        "poäng": pd.array(np.where(searches == "total", rng.integers(0, 101, rows), rng.integers(0, 26, rows)),
+                          dtype="Int16"),
+        "fel": pd.array(rng.integers(0, 12, rows), dtype="Int16"),
+        "tid": times,
+        "start_position": pd.array(start_positions, dtype="Int16"),
+        "placering": pd.array(rng.integers(1, start_positions + 1), dtype="Int16"),
+    })
+
+
+def random_cells(participants: pd.DataFrame, count: int, seed: int = 0) -> List[Cell]:
+    """Filter combinations taken from random rows, each dimension left at ``ALL`` half the time."""
+    rng = random.Random(seed)
+    dimensions = participants[CUBE_DIMENSIONS].astype(str)
+    cells = []
+    for _ in range(count):
+        row = dimensions.iloc[rng.randrange(len(dimensions))]
+        cells.append(tuple(ALL if rng.random() < 0.5 else row[d] for d in CUBE_DIMENSIONS))
+    return cells
+
+
+def scan(participants: pd.DataFrame, cell: Cell) -> dict:
+    """The aggregates the way the dashboard computed them: filter the rows, then aggregate."""
+    mask = np.ones(len(participants), dtype=bool)
+    for dimension, value in zip(CUBE_DIMENSIONS, cell):
+        if value != ALL:
+            mask &= (participants[dimension] == value).to_numpy()
+    filtered = participants[mask]
+    time_categories = pd.cut(filtered["tid"], bins=TIME_CATEGORY_BINS, labels=TIME_CATEGORY_LABELS)
+    placed = filtered.dropna(subset=["start_position", "placering"])
+    bin_size = max(1, int(placed["start_position"].max() / 10)) if len(placed) else 1
+    start_binned = (placed["start_position"] - 1) // bin_size * bin_size + 1
+    return {
+        "starts": len(filtered),
+        "points": filtered["poäng"].value_counts().sort_index(),
+        "faults": filtered["fel"].value_counts().sort_index(),
+        "time_categories": time_categories.value_counts().reindex(TIME_CATEGORY_LABELS),
+        "placement": placed.groupby(start_binned)["placering"].agg(["mean", "count"]),
+    }
+
+
+def lookup(cube: AggregateCube, cell: Cell) -> dict:
+    return {
+        "starts": cube.starts(cell),
+        "points": cube.points(cell),
+        "faults": cube.faults(cell),
+        "time_categories": cube.time_categories(cell),
+        "placement": cube.placement(cell, min_count=0),
+        "time_points": cube.time_points(cell),
+    }
+
+
+def matches(scanned: dict, looked_up: dict) -> bool:
+    placement = scanned["placement"]
+    return (
+        scanned["starts"] == looked_up["starts"]
+        and list(scanned["points"].items()) == list(zip(looked_up["points"]["poäng"], looked_up["points"]["count"]))
+        and list(scanned["faults"].items()) == list(zip(looked_up["faults"]["fel"], looked_up["faults"]["count"]))
+        and list(scanned["time_categories"]) == list(looked_up["time_categories"]["count"])
+        and list(placement.index) == list(looked_up["placement"]["start_binned"])
+        and np.allclose(placement["mean"].round(1), looked_up["placement"]["avg_placement"])
+    )
+
+
+def run(name: str, participants: pd.DataFrame, filters: int) -> int:
+    """Benchmark one frame and return the number of mismatching filter combinations."""
+    start = time.perf_counter()
+    cube = build_cube(participants)
+    build_time = time.perf_counter() - start
+    tracemalloc.start()
+    build_cube(participants)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cells = random_cells(participants, filters)
+
+    start = time.perf_counter()
+    scanned = [scan(participants, cell) for cell in cells]
+    scan_time = (time.perf_counter() - start) / len(cells)
+    start = time.perf_counter()
+    looked_up = [lookup(cube, cell) for cell in cells]
+    lookup_time = (time.perf_counter() - start) / len(cells)
+    mismatches = sum(not matches(s, l) for s, l in zip(scanned, looked_up))
+    # Every row counts in the all-"All" cell, also rows missing a dimension value
+    mismatches += cube.starts(AggregateCube.cell()) != len(participants)
+
+    print(f"  {name:<14} {len(participants):>9,} starts  cube built in {build_time:6.2f}s "
+          f"(peak {peak / 1024 ** 2:6.1f} MiB, cube {cube.memory_usage() / 1024 ** 2:6.1f} MiB)  "
+          f"scan {scan_time * 1000:7.2f} ms  lookup {lookup_time * 1000:6.2f} ms")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark filter changes: row scans against the aggregate cube.")
+    parser.add_argument("--results", type=Path, default=None, help="results JSON file")
+    parser.add_argument("--rows", type=int, nargs="+", default=[25000, 100000, 400000],
+                        help="sizes of the synthetic frames")
+    parser.add_argument("--filters", type=int, default=100, help="random filter combinations per size")
+    args = parser.parse_args()
+
+    source = args.results or default_results_file()
+    print(f"{source.name} and synthetic frames: per filter change, mean over {args.filters} random filter combinations")
+    mismatches = run("results file", participants_from_competitions(iter_competitions(source)), args.filters)
+    for rows in args.rows:
+        mismatches += run("synthetic", synthetic_participants(rows), args.filters)
+
+    print("Aggregates identical" if not mismatches else f"{mismatches} filter combinations differ")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Entity Tables Benchmark
+=======================
+
+Compares the flat participants frame with the entity tables of
+``nw_stats.data.entities``: memory of each representation and the time of
+the same per-dog and per-handler aggregations on string columns against
+integer ids. The tables are also joined back and checked against the flat
+frame.
+
+Usage:
+    python benchmarks/bench_entities.py                  # newest data/snwk_competition_results_*.json
+    python benchmarks/bench_entities.py --scale 20       # competitions repeated 20 times under new ids
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add the project root to Python path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.bench_flatten import default_results_file
+from nw_stats.data import entities
+from nw_stats.data.results_stream import iter_competitions, participants_from_competitions
+
+
+def scaled_competitions(path: Path, scale: int) -> List[Dict]:
+    """The competitions of ``path`` repeated ``scale`` times, each copy under a new ``arr=`` id."""
+    competitions = list(iter_competitions(path))
+    scaled = []
+    for copy in range(scale):
+        for competition in competitions:
+            scaled.append({**competition, "url": competition.get("url", "").replace("arr=", f"arr=x{copy}-")})
+    return scaled
+
+
+def best_time(func: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the entity tables against the flat frame.")
+    parser.add_argument("--results", type=Path, default=None, help="results JSON file")
+    parser.add_argument("--scale", type=int, default=1, help="repeat the competitions this many times")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions, best time is reported")
+    args = parser.parse_args()
+
+    source = args.results or default_results_file()
+    competitions = scaled_competitions(source, args.scale)
+    flat = participants_from_competitions(competitions)
+    start = time.perf_counter()
+    tables = entities.build_entity_tables(competitions)
+    build_time = time.perf_counter() - start
+    facts = tables.participants
+
+    flat_bytes = flat.memory_usage(deep=True).sum()
+    table_bytes = entities.memory_usage(tables)
+    print(f"{source.name} x{args.scale}: {len(flat):,} starts, tables built in {build_time:.3f}s")
+    print(f"  flat frame       {flat_bytes / 1024 ** 2:7.2f} MiB")
+    print(f"  entity tables    {table_bytes.sum() / 1024 ** 2:7.2f} MiB ({flat_bytes / table_bytes.sum():.1f}x smaller)")
+    for name, size in table_bytes.items():
+        print(f"    {name:<18} {size / 1024 ** 2:7.2f} MiB")
+
+    aggregations = [
+        ("mean points per dog",
+         lambda: flat.groupby("stamtavlenamn")["poäng"].mean(),
+         lambda: facts.groupby("dog_id")["poäng"].mean()),
+        ("starts per handler and competition",
+         lambda: flat.groupby(["förare", "datum", "plats"], observed=True).size(),
+         lambda: facts.groupby(["handler_id", "competition_id"]).size()),
+    ]
+    for name, on_strings, on_ids in aggregations:
+        string_time = best_time(on_strings, args.repeat)
+        id_time = best_time(on_ids, args.repeat)
+        print(f"  {name:<36} strings {string_time * 1000:7.2f} ms  ids {id_time * 1000:7.2f} ms "
+              f"({string_time / id_time:4.1f}x)")
+
+    joined = entities.participants_frame(tables)
+    # A dog's call name and breed come from its latest start, so those may differ
+    differing = [
+        column for column in flat.columns
+        if column not in ("hund_namn", "hundras") and not joined[column].equals(flat[column])
+    ]
+    print("Joined tables match the flat frame" if not differing else f"Differences: {', '.join(differing)}")
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Participant Flattening Benchmark
+================================
+
+Compares the columnar ``nw_stats.data.flatten.create_participants_dataframe``
+and the chunked streaming reader in ``nw_stats.data.results_stream`` with the
+original row-by-row implementation that was copy-pasted into the dashboard
+and the notebook. Each run loads the results file and flattens it; wall time
+and peak traced memory (``tracemalloc``) are reported for each, and the
+resulting frames are checked for equal values.
+
+Usage:
+    python benchmarks/bench_flatten.py                          # newest data/snwk_competition_results_*.json
+    python benchmarks/bench_flatten.py --results results.json
+    python benchmarks/bench_flatten.py --scale 20               # results repeated 20 times (temporary file)
+"""
+
+import argparse
+import gc
+import glob
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to Python path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from nw_stats.config import ProjectPaths
+from nw_stats.data import flatten
+from nw_stats.data.results_stream import load_participants
+
+
+def legacy_convert_time_to_seconds(time_str):
+    """The original per-row time conversion."""
+    if pd.isna(time_str) or time_str == '':
+        return None
+    try:
+        time_str = str(time_str).replace(',', '.')
+        if ':' in time_str:
+            parts = time_str.split(':')
+            if len(parts) == 2:
+                return float(parts[0]) * 60 + float(parts[1])
+            elif len(parts) == 3:
+                return float(parts[0]) * 3600 + float(parts[1]) * 60 + float(parts[2])
+        else:
+            return float(time_str)
+    except (TypeError, ValueError):
+        return None
+
+
+def legacy_create_participants_dataframe(competitions_data: List[Dict]) -> pd.DataFrame:
+    """The original list-of-dicts flattening from the dashboard."""
+    participants_list = []
+    for comp in competitions_data:
+        comp_date = comp.get('datum', '')
+        comp_location = comp.get('plats', '')
+        comp_type = comp.get('typ', '')
+        comp_class = comp.get('klass', '')
+        comp_organizer = comp.get('arrangör', '')
+        comp_coordinator = comp.get('anordnare', '')
+
+        for result_set in comp.get('resultat', []):
+            search_type = result_set.get('sök', '')
+            judges = result_set.get('domare', [])
+            judge_names = ', '.join(judges) if judges else ''
+
+            for participant in result_set.get('tabell', []):
+                participants_list.append({
+                    'klass': comp_class,
+                    'datum': comp_date,
+                    'plats': comp_location,
+                    'typ': comp_type,
+                    'arrangör': comp_organizer,
+                    'anordnare': comp_coordinator,
+                    'typ_av_sök': search_type,
+                    'domare': judge_names,
+                    'förare': participant.get('handler', ''),
+                    'hund_namn': participant.get('dog_call_name', ''),
+                    'stamtavlenamn': participant.get('dog_full_name', ''),
+                    'hundras': participant.get('dog_breed', ''),
+                    'start_position': participant.get('start_number', ''),
+                    'placering': participant.get('placement', ''),
+                    'poäng': participant.get('points', ''),
+                    'fel': participant.get('faults', ''),
+                    'tid': legacy_convert_time_to_seconds(participant.get('time', '')),
+                })
+    return pd.DataFrame(participants_list)
+
+
+def default_results_file() -> Path:
+    results = sorted(glob.glob(str(ProjectPaths.DATA / "snwk_competition_results_*.json")))
+    if results:
+        return Path(results[-1])
+    return ProjectPaths.DATA / "sample_competition_results.json"
+
+
+def scaled_results_file(path: Path, scale: int, directory: str) -> Path:
+    """Write the competitions of ``path`` repeated ``scale`` times to a new file."""
+    with open(path, "r", encoding="utf-8") as f:
+        competitions = json.load(f)
+    scaled_path = Path(directory) / f"scaled_x{scale}_{path.name}"
+    with open(scaled_path, "w", encoding="utf-8") as f:
+        json.dump(competitions * scale, f, indent=2, ensure_ascii=False)
+    return scaled_path
+
+
+def load_and_flatten(create: Callable) -> Callable[[Path], pd.DataFrame]:
+    def run(path: Path) -> pd.DataFrame:
+        with open(path, "r", encoding="utf-8") as f:
+            return create(json.load(f))
+    return run
+
+
+def measure(load: Callable[[Path], pd.DataFrame], path: Path, repeat: int) -> Tuple[pd.DataFrame, float, int]:
+    """
+    Load and flatten ``repeat`` times, then once more under ``tracemalloc``.
+
+    Tracing slows allocation-heavy code down unevenly, so times come from the
+    untraced runs only.
+
+    Returns:
+        The frame, best wall seconds and peak traced bytes
+    """
+    best_time = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        frame = load(path)
+        best_time = min(best_time, time.perf_counter() - start)
+        del frame
+
+    gc.collect()
+    tracemalloc.start()
+    frame = load(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return frame, best_time, peak
+
+
+def frames_match(legacy: pd.DataFrame, columnar: pd.DataFrame) -> List[str]:
+    """Columns whose values differ once the legacy frame gets the new types."""
+    differing = []
+    for column in flatten.PARTICIPANT_COLUMNS:
+        old = legacy[column]
+        new = columnar[column]
+        if column in flatten.INTEGER_COLUMNS:
+            old = pd.to_numeric(old, errors="coerce").astype(flatten.INTEGER_DTYPE)
+        elif column == "tid":
+            old = pd.to_numeric(old, errors="coerce").astype("float64")
+            if np.allclose(old, new, equal_nan=True):
+                continue
+        else:
+            old = old.fillna("").astype(str)
+            new = new.astype(str)
+        if not old.reset_index(drop=True).equals(new.reset_index(drop=True)):
+            differing.append(column)
+    return differing
+
+
+def run_implementations(implementations: List[Tuple[str, Callable]], path: Path,
+                        repeat: int) -> Tuple[List[Tuple], Dict[str, pd.DataFrame]]:
+    results = []
+    frames = {}
+    for name, load in implementations:
+        frame, best_time, peak = measure(load, path, repeat)
+        frames[name] = frame
+        results.append((name, best_time, peak, frame.memory_usage(deep=True).sum()))
+    return results, frames
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark participant flattening.")
+    parser.add_argument("--results", type=Path, default=None, help="results JSON file to flatten")
+    parser.add_argument("--scale", type=int, default=1, help="repeat the competitions this many times")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions, best time is reported")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="print per-column memory of the columnar frame against the legacy one")
+    args = parser.parse_args()
+
+    source = args.results or default_results_file()
+    implementations = [
+        ("legacy (row dicts)", load_and_flatten(legacy_create_participants_dataframe)),
+        ("columnar", load_and_flatten(flatten.create_participants_dataframe)),
+        ("streaming", load_participants),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = scaled_results_file(source, args.scale, tmp_dir) if args.scale > 1 else source
+        results, frames = run_implementations(implementations, path, args.repeat)
+
+    rows = len(frames["columnar"])
+    print(f"{source.name} x{args.scale}: {rows:,} participant rows (load + flatten)")
+    legacy_time, legacy_peak = results[0][1], results[0][2]
+    for name, elapsed, peak, frame_bytes in results:
+        print(f"  {name:<20} {elapsed:7.3f}s  {legacy_time / elapsed:5.2f}x  "
+              f"peak {peak / 1024 ** 2:7.1f} MiB ({legacy_peak / peak:4.2f}x)  "
+              f"frame {frame_bytes / 1024 ** 2:6.1f} MiB")
+
+    if args.memory_report:
+        with pd.option_context("display.width", 120, "display.float_format", "{:.1f}".format):
+            print(flatten.memory_report(frames["columnar"], baseline=frames["legacy (row dicts)"]))
+
+    differing = frames_match(frames["legacy (row dicts)"], frames["columnar"])
+    if not frames["streaming"].equals(frames["columnar"]):
+        differing.append("streaming")
+    print("Values identical" if not differing else f"Differences: {', '.join(differing)}")
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == "__main__":
+    main()
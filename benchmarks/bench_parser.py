@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Result Page Parser Benchmark
+============================
+
+Compares the single-pass parser in ``nw_stats.data_collection.parsers`` with
+the original per-field regex parser on saved or synthetic result pages, checks
+that both produce identical output and reports parse time per page.
+
+Usage:
+    python benchmarks/bench_parser.py                    # synthetic pages
+    python benchmarks/bench_parser.py --pages saved/     # directory of *.html pages
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+# Add the project root to Python path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from nw_stats.data_collection import parsers
+from nw_stats.devtools.synthetic_site import result_page_html
+
+# (page type, competition type) combinations covering every parser branch
+PAGE_VARIANTS = [("Visa total", "TEM"), ("Visa Behållarsök", "TSM"), ("Visa Inomhussök", "TEM")]
+
+
+def legacy_parse_result_page(html: str, page_type: str, competition_type: str,
+                             search_type: str = "") -> Tuple[Optional[Dict], str]:
+    """The page parsing loop body of the original parse_competition_results."""
+    result_dict = {}
+    soup = BeautifulSoup(html, "html.parser")
+
+    if competition_type == "TEM":
+        if not search_type and page_type.split()[-1] == "total":
+            result_dict['sök'] = "total"
+            h2_headers = soup.find_all("h2")
+            if h2_headers:
+                extracted_search_type = h2_headers[-1].text.split()[-1]
+                if extracted_search_type and extracted_search_type not in ['', 'total']:
+                    search_type = extracted_search_type
+        elif search_type and search_type.strip():
+            result_dict['sök'] = search_type
+    elif competition_type == "TSM":
+        raw_search_type = page_type.split()[-1].removesuffix("sök")
+        if raw_search_type == "Behållar":
+            search_type = "Behållare"
+        elif raw_search_type == "Fordons":
+            search_type = "Fordon"
+        elif raw_search_type and raw_search_type.strip():
+            search_type = raw_search_type
+        else:
+            search_type = ""
+        if search_type and search_type.strip():
+            result_dict['sök'] = search_type
+
+    if page_type.split()[-1] == "total":
+        ref_div = soup.find("div", class_="domardiv")
+        if ref_div:
+            text_list = ref_div.get_text().split()
+            if len(text_list) == 4:
+                result_dict['domare'] = [f"{text_list[-2]} {text_list[-1]}"]
+            elif len(text_list) == 8:
+                result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}"]
+            elif len(text_list) == 12:
+                result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}", f"{text_list[-2]} {text_list[-1]}"]
+            elif len(text_list) == 9:
+                result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}"]
+            elif len(text_list) == 13:
+                result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}", f"{text_list[10]} {text_list[11]}"]
+            else:
+                judge_text = ref_div.get_text()
+                judge_pattern = r"Domare\s*\d*\s*:\s*([A-ZÅÄÖ][\w\-\s]+?)(?=\s*(?:Domare\s*\d*\s*:|$))"
+                matches = re.findall(judge_pattern, judge_text, re.IGNORECASE)
+                if matches:
+                    result_dict['domare'] = [match.strip() for match in matches]
+                else:
+                    result_dict['domare'] = ["okänd"]
+        else:
+            result_dict['domare'] = ["okänd"]
+    else:
+        p = soup.find("p", string=re.compile("Domare"))
+        if p:
+            match = re.search(r"Domare\s*[^:]*:\s*(.*)", p.get_text())
+            result_dict['domare'] = [match.group(1).strip()] if match else ["okänd"]
+        else:
+            result_dict['domare'] = ["okänd"]
+
+    results_list = soup.find("ul")
+    if not results_list:
+        return None, search_type
+
+    branch_results = []
+    for participant in results_list.find_all("li"):
+        participant_results = {}
+        participant_text = participant.get_text()
+
+        placement_match = re.search(r"Placering:\s*(\d+)", participant_text)
+        if placement_match:
+            participant_results["placement"] = int(placement_match.group(1))
+
+        for strong in participant.find_all("strong"):
+            strong_text = strong.get_text().strip()
+            if "&" in strong_text and "Placering" not in strong_text and "Totalpoäng" not in strong_text:
+                if " & " in strong_text:
+                    handler, dog = strong_text.split(" & ", 1)
+                    participant_results["dog_call_name"] = dog.strip()
+                break
+
+        total_points_match = re.search(r"Totalpoäng:\s*(\d+)", participant_text)
+        points_match = re.search(r"Poäng:\s*(\d+)", participant_text)
+        if total_points_match:
+            participant_results["points"] = int(total_points_match.group(1))
+        elif points_match:
+            participant_results["points"] = int(points_match.group(1))
+
+        total_faults_match = re.search(r"Totalfel:\s*(\d+)", participant_text)
+        faults_match = re.search(r"Fel:\s*(\d+)", participant_text)
+        if total_faults_match:
+            participant_results["faults"] = int(total_faults_match.group(1))
+        elif faults_match:
+            participant_results["faults"] = int(faults_match.group(1))
+
+        total_time_match = re.search(r"Totaltid:\s*([\d:,]+)", participant_text)
+        time_match = re.search(r"Tid:\s*([\d:,]+)", participant_text)
+        if total_time_match:
+            participant_results["time"] = total_time_match.group(1).strip()
+        elif time_match:
+            participant_results["time"] = time_match.group(1).strip()
+
+        start_match = re.search(r"Startnr:\s*(\d+)", participant_text)
+        if start_match:
+            participant_results["start_number"] = int(start_match.group(1))
+
+        handler_match = re.search(r"Förare:\s*([^\n\r]+)", participant_text)
+        if handler_match:
+            participant_results["handler"] = handler_match.group(1).strip()
+
+        dog_match = re.search(r"Hund:\s*([^\n\r]+)", participant_text)
+        if dog_match:
+            participant_results["dog_full_name"] = dog_match.group(1).strip()
+
+        breed_match = re.search(r"Ras:\s*([^\n\r]+)", participant_text)
+        if breed_match:
+            participant_results["dog_breed"] = breed_match.group(1).strip()
+
+        branch_results.append(participant_results)
+
+    result_dict['tabell'] = branch_results
+    return result_dict, search_type
+
+
+def load_pages(pages_dir: Optional[Path], count: int, participants: int) -> List[str]:
+    if pages_dir is not None:
+        return [path.read_text(encoding="utf-8") for path in sorted(pages_dir.glob("*.html"))]
+    return [
+        result_page_html(seed, participants=participants, total=seed % 2 == 0, judges=1 + seed % 3)
+        for seed in range(count)
+    ]
+
+
+def time_parser(parse: Callable, pages: List[str], repeat: int) -> Tuple[float, List]:
+    best = float("inf")
+    outputs: List = []
+    for _ in range(repeat):
+        outputs = []
+        start = time.process_time()
+        for html in pages:
+            for page_type, competition_type in PAGE_VARIANTS:
+                outputs.append(parse(html, page_type, competition_type))
+        best = min(best, time.process_time() - start)
+    return best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the result page parser.")
+    parser.add_argument("--pages", type=Path, help="directory of saved result pages (*.html)")
+    parser.add_argument("--count", type=int, default=20, help="number of synthetic pages")
+    parser.add_argument("--participants", type=int, default=200, help="starters per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, best time is reported")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.count, args.participants)
+    if not pages:
+        sys.exit(f"No *.html pages found in {args.pages}")
+    parses = len(pages) * len(PAGE_VARIANTS)
+
+    legacy_time, legacy_outputs = time_parser(legacy_parse_result_page, pages, args.repeat)
+    results = [("legacy (html.parser)", legacy_time)]
+    mismatches = 0
+    for html_parser in dict.fromkeys(["html.parser", parsers.HTML_PARSER]):
+        parsers.HTML_PARSER = html_parser
+        new_time, new_outputs = time_parser(parsers.parse_result_page, pages, args.repeat)
+        results.append((f"single-pass ({html_parser})", new_time))
+        mismatches += sum(old != new for old, new in zip(legacy_outputs, new_outputs))
+
+    print(f"{len(pages)} pages x {len(PAGE_VARIANTS)} variants = {parses} parses")
+    for name, elapsed in results:
+        print(f"  {name:<28} {elapsed:8.3f}s CPU  {1000 * elapsed / parses:7.2f} ms/page  "
+              f"{legacy_time / elapsed:5.2f}x")
+    print("Output identical" if not mismatches else f"{mismatches} parses differ from the legacy parser")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Scraper Throughput Benchmark
+============================
+
+Runs the scraper's ``main()`` end to end against a local replay server and
+reports pages/sec, competitions/sec, bytes and parse CPU per stage (including
+the CPU of the result parse worker processes). Latency and error rate of the
+server are configurable, so fetch and parse changes can be measured offline
+and reproducibly.
+
+The fetched pages are archived, and afterwards ``nw-reparse`` rebuilds the
+results from that archive, which must reproduce the scraped results exactly.
+
+Usage:
+    python benchmarks/bench_scrape.py                           # synthetic site
+    python benchmarks/bench_scrape.py --recordings recordings/  # recorded pages
+    python benchmarks/bench_scrape.py --latency 0.1 --error-rate 0.02 --workers 8
+    python benchmarks/bench_scrape.py --parse-workers 0         # parse in the main process
+    python benchmarks/bench_scrape.py --adaptive --rps 20       # adaptive pacing up to 20 req/s
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Add the project root to Python path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from nw_stats.data_collection import parsers, reparse, scrape_data
+from nw_stats.data_collection.competition_index import RESULTS_GLOB
+from nw_stats.data_collection.http_client import HttpClient
+from nw_stats.data_collection.page_archive import PageArchive
+from nw_stats.data_collection.rate_limit import AdaptiveRateLimiter, HostRateLimiter
+from nw_stats.devtools.replay_server import ReplayServer
+from nw_stats.devtools.synthetic_site import write_synthetic_site
+
+STAGES = ["listing", "subpages", "results", "parse"]
+
+
+class StageAccounting:
+    """Attributes requests, bytes, wall time and parse CPU to scraper stages."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.requests = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.parse_cpu = defaultdict(float)
+        self.started = {}
+        self.finished = {}
+
+    @property
+    def stage(self) -> str:
+        return getattr(self._local, "stage", "other")
+
+    def wrap_stage(self, stage: str, func):
+        def wrapper(*args, **kwargs):
+            self._local.stage = stage
+            with self._lock:
+                self.calls[stage] += 1
+                self.started.setdefault(stage, time.perf_counter())
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.finished[stage] = time.perf_counter()
+        return wrapper
+
+    def wrap_parse(self, func):
+        def wrapper(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.parse_cpu[self.stage] += time.thread_time() - start
+        return wrapper
+
+    def wrap_send(self, func):
+        def wrapper(*args, **kwargs):
+            response = func(*args, **kwargs)
+            with self._lock:
+                self.requests[self.stage] += 1
+                self.bytes[self.stage] += len(response.content)
+            return response
+        return wrapper
+
+
+def instrument(accounting: StageAccounting, parse_inline: bool) -> None:
+    scrape_data.fetch_competitions_for_year = accounting.wrap_stage(
+        "listing", scrape_data.fetch_competitions_for_year)
+    scrape_data.extract_competition_subpages = accounting.wrap_stage(
+        "subpages", scrape_data.extract_competition_subpages)
+    scrape_data.fetch_competition_pages = accounting.wrap_stage(
+        "results", scrape_data.fetch_competition_pages)
+    scrape_data.make_soup = accounting.wrap_parse(scrape_data.make_soup)
+    if parse_inline:
+        # Worker processes cannot be instrumented (or handed a closure);
+        # their CPU time is taken from os.times() instead
+        scrape_data.parse_fetched_competition = accounting.wrap_stage(
+            "parse", scrape_data.parse_fetched_competition)
+        parsers.parse_result_page = accounting.wrap_parse(parsers.parse_result_page)
+    client = scrape_data.get_http_client()
+    client.send = accounting.wrap_send(client.send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local replay server.")
+    parser.add_argument("--recordings", type=Path, help="recording directory (default: synthetic site)")
+    parser.add_argument("--years", type=int, nargs="+", default=[2025, 2024], help="years to scrape")
+    parser.add_argument("--competitions", type=int, default=30, help="synthetic competitions per year")
+    parser.add_argument("--participants", type=int, default=60, help="synthetic starters per class")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency per response in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of responses that are 503")
+    parser.add_argument("--workers", type=int, default=scrape_data.Config.MAX_CONCURRENT_REQUESTS)
+    parser.add_argument("--parse-workers", type=int, default=scrape_data.Config.PARSE_WORKERS,
+                        help="result parse processes, 0 parses inline")
+    parser.add_argument("--rps", type=float, default=1000.0, help="rate limit in requests/s per host")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="pace adaptively from Config.REQUESTS_PER_SECOND up to --rps")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        recordings = args.recordings
+        if recordings is None:
+            recordings = tmp_path / "recordings"
+            write_synthetic_site(recordings, args.years, args.competitions, args.participants)
+
+        server = ReplayServer(recordings, latency=args.latency, latency_jitter=args.jitter,
+                              error_rate=args.error_rate, seed=0)
+        with server:
+            config = scrape_data.Config
+            config.SITE_URL = server.url
+            config.BASE_URL = f"{server.url}/?page=resultat"
+            config.YEARS_TO_SCRAPE = args.years
+            # Every output path of the scraper (journal, archive, Parquet, compacted
+            # and entity datasets, result store, metrics) lives under DATA_DIR
+            config.DATA_DIR = tmp_path / "data"
+            config.MAX_CONCURRENT_REQUESTS = args.workers
+            config.PARSE_WORKERS = args.parse_workers
+            scrape_data.http_client = HttpClient(
+                headers=config.REQUEST_HEADERS,
+                timeout=config.REQUEST_TIMEOUT,
+                rate_limiter=AdaptiveRateLimiter(
+                    min(config.REQUESTS_PER_SECOND, args.rps), config.MIN_REQUESTS_PER_SECOND, args.rps,
+                    burst=args.workers, slow_latency=config.SLOW_RESPONSE_SECONDS,
+                ) if args.adaptive else HostRateLimiter(args.rps, burst=args.workers),
+                max_retries=config.MAX_RETRIES,
+                backoff_factor=0.05,
+                pool_maxsize=args.workers,
+                archive=PageArchive(config.ARCHIVE_DIR),
+            )
+
+            accounting = StageAccounting()
+            instrument(accounting, parse_inline=args.parse_workers <= 0)
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            children_start = os.times()
+            scrape_data.main([])
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            children_end = os.times()
+            worker_cpu = (children_end.children_user - children_start.children_user
+                          + children_end.children_system - children_start.children_system)
+            accounting.parse_cpu["parse"] += worker_cpu
+
+        stats = scrape_data.get_http_client().stats.summary()
+        print()
+        print(f"Workers: {args.workers} fetch, {args.parse_workers} parse, "
+              f"server latency {args.latency}s (+{args.jitter}s), error rate {args.error_rate:.0%}")
+        print(f"{'stage':<10} {'calls':>7} {'requests':>9} {'MB':>8} {'wall s':>8} "
+              f"{'pages/s':>8} {'parse CPU s':>12} {'ms/page':>8}")
+        for stage in STAGES:
+            requests_made = accounting.requests[stage]
+            # The parse stage handles the pages fetched by the results stage
+            pages = accounting.requests["results"] if stage == "parse" else requests_made
+            elapsed = accounting.finished.get(stage, 0) - accounting.started.get(stage, 0)
+            print(f"{stage:<10} {accounting.calls[stage]:>7} {requests_made:>9} "
+                  f"{accounting.bytes[stage] / 1e6:>8.2f} {elapsed:>8.2f} "
+                  f"{requests_made / elapsed if elapsed else 0:>8.1f} {accounting.parse_cpu[stage]:>12.3f} "
+                  f"{1000 * accounting.parse_cpu[stage] / pages if pages else 0:>8.2f}")
+        competitions = accounting.calls["results"]
+        print(f"Total: {wall:.2f}s wall, {cpu:.2f}s CPU (+{worker_cpu:.2f}s in parse workers), {stats['requests']} requests "
+              f"({stats['retries']} retries), {stats['requests'] / wall:.1f} pages/s, "
+              f"{competitions / wall:.2f} competitions/s")
+        print(f"Server: {server.requests_served} responses, {server.errors_injected} injected errors, "
+              f"{server.not_found} not recorded")
+
+        # Rebuild the results offline from the pages archived above
+        scrape_data.get_http_client().archive.close()
+        start = time.perf_counter()
+        reparsed_path = reparse.reparse(tmp_path / "reparsed.json")
+        reparse_wall = time.perf_counter() - start
+        scraped = []
+        for results_file in sorted(config.DATA_DIR.glob(RESULTS_GLOB)):
+            with open(results_file, "r", encoding="utf-8") as f:
+                scraped.extend(json.load(f))
+        reparsed = []
+        if reparsed_path is not None:
+            with open(reparsed_path, "r", encoding="utf-8") as f:
+                reparsed = json.load(f)
+        identical = sorted(scraped, key=lambda c: c["url"]) == sorted(reparsed, key=lambda c: c["url"])
+        print(f"Reparse: {len(reparsed)} competitions rebuilt from the archive in {reparse_wall:.2f}s, "
+              + ("identical to the scraped results" if identical and scraped else "DIFFERENT from the scraped results"))
+        sys.exit(0 if identical and scraped else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,16 @@ class ProjectPaths:
     # Root paths
     ROOT = Path(__file__).parent.parent
     DATA = ROOT / "data"
+    # Partitioned Parquet dataset of flattened participant rows
+    PARTICIPANTS_DATASET = DATA / "participants"
 
     
     
+    # SQLite store of normalised competition results
+    RESULT_STORE = DATA / "snwk_results.sqlite"
+    # All results files merged into one deduplicated dataset (nw-compact)
+    COMPACTED_RESULTS = DATA / "compacted"
+    # Downloaded datasets, stored as compressed participant frames
+    DATASET_CACHE = DATA / ".dataset_cache"
+    # Dimension and fact tables with stable integer ids
+    ENTITY_TABLES = DATA / "entities"
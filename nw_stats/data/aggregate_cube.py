@@ -0,0 +1,360 @@
+"""
+Aggregate Cube
+==============
+
+Precomputes the dashboard's chart aggregates for every combination of the
+sidebar filters, so a filter change looks up a few rows instead of scanning
+the participants frame.
+
+The cube is grouped by ``typ`` x ``typ_av_sök`` x ``klass`` x ``domare`` x
+``hundras``, with every grouping set included: a dimension left out of a set
+holds ``ALL`` ("All" in the sidebar). Rows missing a dimension value (e.g.
+no ``hundras``) are grouped under ``MISSING`` in that dimension, so they
+still count in the cells that leave it at ``ALL``. Each measure is a table indexed by the
+five dimensions plus its own key:
+
+- ``starts``: number of starts
+- ``points`` / ``faults``: starts per ``poäng`` / ``fel`` value
+- ``time_categories``: starts per time category (``<30s`` ... ``>5min``)
+- ``time_points``: starts and summed points per ``TIME_BUCKET_SECONDS`` bucket
+- ``placement``: starts, summed placement and start position per start position
+
+All measures are sums, so rollups are computed from the finest grouping
+rather than from the rows again, and charts that rebin (time and start
+position groups) are derived exactly from the stored counts.
+
+Cells that filter on both ``domare`` and ``hundras`` (``DETAIL_DIMENSIONS``)
+are not stored. There is one per judge, breed and measure value, which would
+make them most of the cube: millions of rows for a few hundred thousand
+starts. Each holds only a few starts, and it is summed when asked for from
+the finest grouping, which is kept sorted by judge and breed so the cell's
+rows are one slice.
+
+Usage:
+    cube = build_cube(participants)
+    cell = cube.cell(typ="All", typ_av_sök="Inomhus", klass="NW1")
+    cube.points(cell)            # poäng -> count
+    cube.placement(cell)         # per start position group, as in the dashboard
+"""
+
+import itertools
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ["typ", "typ_av_sök", "klass", "domare", "hundras"]
+# Cells filtering on all of these are summed on demand instead of stored
+DETAIL_DIMENSIONS = ["domare", "hundras"]
+ALL = "All"
+MISSING = ""
+
+TIME_CATEGORY_BINS = [0, 30, 60, 120, 300, float("inf")]
+TIME_CATEGORY_LABELS = ["<30s", "30-60s", "1-2min", "2-5min", ">5min"]
+TIME_BUCKET_SECONDS = 5
+
+Cell = Tuple[str, str, str, str, str]
+
+
+def _with_all(column: pd.Series) -> pd.Categorical:
+    """The column as a categorical that also has the ``ALL`` category, missing values as ``MISSING``."""
+    values = column.astype("category") if column.dtype != "category" else column
+    values = values.cat.remove_unused_categories()
+    # groupby drops missing keys, which would leave these rows out of every cell
+    if values.isna().any():
+        if MISSING not in values.cat.categories:
+            values = values.cat.add_categories([MISSING])
+        values = values.fillna(MISSING)
+    if ALL not in values.cat.categories:
+        values = values.cat.add_categories([ALL])
+    return values.array
+
+
+def _rollup(rows: pd.DataFrame, keys: List[str], values: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Sum ``values`` over the grouping sets of the cube dimensions.
+
+    Returns:
+        The stored grouping sets (every set that does not keep all of
+        ``DETAIL_DIMENSIONS``), and the finest grouping sorted by
+        ``DETAIL_DIMENSIONS`` for the cells summed on demand
+    """
+    # Every rollup is a sum over a finer grouping, which is far smaller than the rows
+    base = rows.groupby(CUBE_DIMENSIONS + keys, observed=True, sort=False)[values].sum().reset_index()
+    sums = {tuple(CUBE_DIMENSIONS): base}
+    frames = []
+    # Coarser sets last, each summed from the smallest set with one more dimension
+    for size in range(len(CUBE_DIMENSIONS) - 1, -1, -1):
+        for group_by in itertools.combinations(CUBE_DIMENSIONS, size):
+            if set(DETAIL_DIMENSIONS) <= set(group_by):
+                continue
+            finer = [
+                tuple(dimension for dimension in CUBE_DIMENSIONS if dimension in group_by or dimension == extra)
+                for extra in CUBE_DIMENSIONS if extra not in group_by
+            ]
+            parent = min((sums[key] for key in finer if key in sums), key=len)
+            if group_by or keys:
+                frame = parent.groupby(list(group_by) + keys, observed=True, sort=False)[values].sum().reset_index()
+            else:
+                frame = parent[values].sum().to_frame().T
+            sums[group_by] = frame
+            frame = frame.assign(**{
+                dimension: pd.Categorical.from_codes(
+                    np.full(len(frame), base[dimension].cat.categories.get_loc(ALL)),
+                    categories=base[dimension].cat.categories,
+                )
+                for dimension in CUBE_DIMENSIONS if dimension not in group_by
+            })
+            frames.append(frame[CUBE_DIMENSIONS + keys + values])
+        # Sets two dimensions finer are no longer needed
+        for key in [key for key in sums if len(key) == size + 2]:
+            del sums[key]
+    table = pd.concat(frames, ignore_index=True).sort_values(CUBE_DIMENSIONS + keys, ignore_index=True)
+    detail = base.sort_values(DETAIL_DIMENSIONS, ignore_index=True, kind="stable")
+    # Keys and sums are whole numbers well within int32
+    int32 = {column: "int32" for column in keys + values}
+    return table.astype(int32), detail.astype(int32)
+
+
+class AggregateCube:
+    """
+    Chart aggregates for every sidebar filter combination, see the module docstring.
+
+    Args:
+        tables: Measure name -> table with the cube dimensions (categoricals
+            sharing their categories across tables), key and value columns
+            (the values starting with ``count``), sorted by dimensions and
+            key, as built by :func:`build_cube`
+        details: Measure name -> finest grouping of the measure, sorted by
+            ``DETAIL_DIMENSIONS``, for the cells not in ``tables``
+    """
+
+    def __init__(self, tables: Dict[str, pd.DataFrame], details: Dict[str, pd.DataFrame]):
+        first = next(iter(tables.values()))
+        categories = [first[dimension].cat.categories for dimension in CUBE_DIMENSIONS]
+        # Filter value -> category code, per dimension
+        self._codes = [{value: code for code, value in enumerate(values)} for values in categories]
+        self._radix = [len(values) for values in categories]
+        # The rows of a cell are contiguous in a sorted table, and cells are
+        # sorted by their codes; encode each cell as one integer so a lookup
+        # is a binary search and an array slice
+        self._cell_keys: Dict[str, np.ndarray] = {}
+        self._bounds: Dict[str, np.ndarray] = {}
+        self._columns: Dict[str, Dict[str, np.ndarray]] = {}
+        for measure, table in tables.items():
+            keys = self._encode([table[dimension].cat.codes.to_numpy("int64") for dimension in CUBE_DIMENSIONS])
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            self._cell_keys[measure] = keys[starts]
+            self._bounds[measure] = np.r_[starts, len(table)]
+            self._columns[measure] = {
+                column: table[column].to_numpy() for column in table.columns if column not in CUBE_DIMENSIONS
+            }
+        # Finest grouping per measure: (judge, breed) pair key, codes of the
+        # other dimensions, and the key and value columns
+        self._detail_index = [CUBE_DIMENSIONS.index(dimension) for dimension in DETAIL_DIMENSIONS]
+        self._detail_pairs: Dict[str, np.ndarray] = {}
+        self._detail_codes: Dict[str, Dict[int, np.ndarray]] = {}
+        self._detail_columns: Dict[str, Dict[str, np.ndarray]] = {}
+        for measure, detail in details.items():
+            codes = {i: detail[dimension].cat.codes.to_numpy() for i, dimension in enumerate(CUBE_DIMENSIONS)}
+            self._detail_pairs[measure] = self._pair_key([codes.pop(i).astype("int64") for i in self._detail_index])
+            self._detail_codes[measure] = codes
+            self._detail_columns[measure] = {
+                column: detail[column].to_numpy() for column in detail.columns if column not in CUBE_DIMENSIONS
+            }
+
+    def _encode(self, codes: Sequence):
+        key = 0
+        for dimension_codes, radix in zip(codes, self._radix):
+            key = key * radix + dimension_codes
+        return key
+
+    def _pair_key(self, codes: Sequence):
+        key = 0
+        for dimension_codes, i in zip(codes, self._detail_index):
+            key = key * self._radix[i] + dimension_codes
+        return key
+
+    @staticmethod
+    def cell(typ: str = ALL, typ_av_sök: str = ALL, klass: str = ALL, domare: str = ALL,
+             hundras: str = ALL) -> Cell:
+        """Key of a filter combination; ``ALL`` for an unfiltered dimension."""
+        return (str(typ), str(typ_av_sök), str(klass), str(domare), str(hundras))
+
+    def _summed(self, measure: str, cell: Cell, codes: List[int]) -> Dict[str, np.ndarray]:
+        """A cell filtering on every detail dimension, summed from the finest grouping."""
+        pairs = self._detail_pairs[measure]
+        pair = self._pair_key([codes[i] for i in self._detail_index])
+        start, end = np.searchsorted(pairs, pair, side="left"), np.searchsorted(pairs, pair, side="right")
+        selected = np.ones(end - start, dtype=bool)
+        for i, dimension_codes in self._detail_codes[measure].items():
+            if cell[i] != ALL:
+                selected &= dimension_codes[start:end] == codes[i]
+        columns = {column: values[start:end][selected] for column, values in self._detail_columns[measure].items()}
+        # Key columns come before the sums, which start with "count"
+        names = list(columns)
+        key_columns, sum_columns = names[:names.index("count")], names[names.index("count"):]
+        if key_columns:
+            # Sorted by key, as the stored cells are
+            keys, group = np.unique(columns[key_columns[0]], return_inverse=True)
+            found = {key_columns[0]: keys}
+        else:
+            group = np.zeros(len(columns["count"]), dtype="int64")
+            found = {}
+        groups = group.max() + 1 if len(group) else 0
+        for column in sum_columns:
+            values = columns[column]
+            found[column] = np.bincount(group, weights=values, minlength=groups).astype(values.dtype)
+        return found
+
+    def _lookup(self, measure: str, cell: Cell) -> Dict[str, np.ndarray]:
+        codes = [codes.get(value) for codes, value in zip(self._codes, cell)]
+        if None not in codes and all(cell[i] != ALL for i in self._detail_index):
+            return self._summed(measure, cell, codes)
+        start = end = 0
+        if None not in codes:
+            cell_keys = self._cell_keys[measure]
+            key = self._encode(codes)
+            position = np.searchsorted(cell_keys, key)
+            if position < len(cell_keys) and cell_keys[position] == key:
+                start, end = self._bounds[measure][position:position + 2]
+        # No starts with this combination gives empty slices
+        return {column: values[start:end] for column, values in self._columns[measure].items()}
+
+    def memory_usage(self) -> int:
+        """Bytes held by the cube's arrays."""
+        arrays = [values for columns in self._columns.values() for values in columns.values()]
+        arrays += list(self._cell_keys.values()) + list(self._bounds.values())
+        arrays += [values for columns in self._detail_columns.values() for values in columns.values()]
+        arrays += [values for codes in self._detail_codes.values() for values in codes.values()]
+        arrays += list(self._detail_pairs.values())
+        return int(sum(values.nbytes for values in arrays))
+
+    def starts(self, cell: Cell) -> int:
+        counts = self._lookup("starts", cell)["count"]
+        return int(counts[0]) if len(counts) else 0
+
+    def points(self, cell: Cell) -> pd.DataFrame:
+        """Columns ``poäng`` and ``count``."""
+        return pd.DataFrame(self._lookup("points", cell))
+
+    def faults(self, cell: Cell) -> pd.DataFrame:
+        """Columns ``fel`` and ``count``."""
+        return pd.DataFrame(self._lookup("faults", cell))
+
+    def time_categories(self, cell: Cell) -> pd.DataFrame:
+        """Columns ``tid_kategori`` (in ``TIME_CATEGORY_LABELS`` order) and ``count``."""
+        found = self._lookup("time_categories", cell)
+        counts = np.zeros(len(TIME_CATEGORY_LABELS), dtype="int64")
+        counts[found["tid_kategori"]] = found["count"]
+        return pd.DataFrame({"tid_kategori": TIME_CATEGORY_LABELS, "count": counts})
+
+    def time_points(self, cell: Cell, bins: int = 10, min_count: int = 5) -> pd.DataFrame:
+        """
+        Average points per time group.
+
+        The time range of the cell is split into ``bins`` groups of whole
+        ``TIME_BUCKET_SECONDS`` buckets. Buckets hold ``[start, end)``, so a
+        time on a group edge belongs to the group it starts.
+
+        Returns:
+            Columns ``tid_binned`` (label like ``"[30, 60)"``), ``mean`` and
+            ``count``, for groups with at least ``min_count`` starts
+        """
+        found = self._lookup("time_points", cell)
+        bucket = found["tid_bucket"]
+        if not len(bucket):
+            return pd.DataFrame({"tid_binned": [], "mean": [], "count": []})
+        low = bucket.min()
+        width = max(1, -(-(bucket.max() - low + 1) // bins))
+        group = (bucket - low) // width
+        counts = np.bincount(group, weights=found["count"])
+        points = np.bincount(group, weights=found["points_sum"])
+        keep = counts >= max(min_count, 1)
+        start = (low + np.flatnonzero(keep) * width) * TIME_BUCKET_SECONDS
+        return pd.DataFrame({
+            "tid_binned": [f"[{s}, {s + width * TIME_BUCKET_SECONDS})" for s in start],
+            "mean": points[keep] / counts[keep],
+            "count": counts[keep].astype("int64"),
+        })
+
+    def placement(self, cell: Cell, bins: int = 10, min_count: int = 5) -> pd.DataFrame:
+        """
+        Average placement per start position group, grouped as the dashboard always has.
+
+        Returns:
+            Columns ``start_binned`` (first start position of the group),
+            ``avg_placement``, ``count`` and ``avg_start_pos`` (rounded to one
+            decimal), for groups with at least ``min_count`` starts
+        """
+        found = self._lookup("placement", cell)
+        start_position = found["start_position"]
+        if not len(start_position):
+            return pd.DataFrame({"start_binned": [], "avg_placement": [], "count": [], "avg_start_pos": []})
+        bin_size = max(1, int(start_position.max() / bins))
+        start_binned, group = np.unique((start_position - 1) // bin_size * bin_size + 1, return_inverse=True)
+        counts = np.bincount(group, weights=found["count"])
+        placement = np.bincount(group, weights=found["placement_sum"])
+        start_sum = np.bincount(group, weights=found["start_sum"])
+        keep = counts >= min_count
+        return pd.DataFrame({
+            "start_binned": start_binned[keep].astype(int),
+            "avg_placement": np.round(placement[keep] / counts[keep], 1),
+            "count": counts[keep].astype("int64"),
+            "avg_start_pos": np.round(start_sum[keep] / counts[keep], 1),
+        })
+
+
+def build_cube(participants: pd.DataFrame) -> AggregateCube:
+    """
+    Compute every measure for every grouping set of the participants frame.
+
+    Args:
+        participants: Frame from :func:`nw_stats.data.flatten.create_participants_dataframe`
+
+    Returns:
+        The cube
+    """
+    frame = pd.DataFrame({dimension: _with_all(participants[dimension]) for dimension in CUBE_DIMENSIONS})
+    points = participants["poäng"].astype("float64")
+    time = participants["tid"].astype("float64")
+    start_position = participants["start_position"].astype("float64")
+    placement = participants["placering"].astype("float64")
+    frame["count"] = 1
+
+    rollups = {"starts": _rollup(frame, [], ["count"])}
+    for measure, column in (("points", "poäng"), ("faults", "fel")):
+        scored = participants[column].notna().to_numpy()
+        rollups[measure] = _rollup(
+            frame.loc[scored].assign(**{column: participants[column][scored].astype("int64")}), [column], ["count"]
+        )
+
+    # Category positions in TIME_CATEGORY_LABELS
+    categories = pd.cut(time, bins=TIME_CATEGORY_BINS, labels=False)
+    rollups["time_categories"] = _rollup(
+        frame.assign(tid_kategori=categories).dropna(subset=["tid_kategori"]).astype({"tid_kategori": "int64"}),
+        ["tid_kategori"], ["count"],
+    )
+
+    timed = time.notna() & points.notna()
+    rollups["time_points"] = _rollup(
+        frame.loc[timed].assign(
+            tid_bucket=(time[timed] // TIME_BUCKET_SECONDS).astype("int64"),
+            points_sum=points[timed],
+        ),
+        ["tid_bucket"], ["count", "points_sum"],
+    )
+
+    placed = start_position.notna() & placement.notna()
+    rollups["placement"] = _rollup(
+        frame.loc[placed].assign(
+            start_position=start_position[placed].astype("int64"),
+            placement_sum=placement[placed],
+            start_sum=start_position[placed],
+        ),
+        ["start_position"], ["count", "placement_sum", "start_sum"],
+    )
+    return AggregateCube(
+        {measure: table for measure, (table, _) in rollups.items()},
+        {measure: detail for measure, (_, detail) in rollups.items()},
+    )
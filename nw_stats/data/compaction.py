@@ -0,0 +1,277 @@
+"""
+Results Compaction
+==================
+
+Merges the timestamped ``snwk_competition_results_*.json`` files into one
+dataset with a single record per competition, keyed by its ``arr=`` id, so
+readers open one file instead of globbing and merging snapshots.
+
+The dataset is a directory holding a JSONL data file and a manifest:
+
+- Records are only ever appended to the data file; a competition that is
+  merged again (e.g. from a re-parse) gets a new record that supersedes the
+  old one
+- ``manifest.json`` lists the merged input files (size and mtime, so a
+  changed input is merged again), the valid length of the data file and the
+  offset of every competition's live record
+- The manifest is replaced atomically after the appended records are synced
+  to disk, so a crash mid-append leaves readers on the previous state; the
+  unreferenced tail is cut off by the next compaction
+- When superseded records make up more than half the file, live records are
+  rewritten to a new data file generation and the manifest is switched to it
+
+Each run therefore appends only the competitions of new input files.
+
+Usage:
+    nw-compact                      # merge new results files in data/
+    nw-compact --rewrite            # also drop superseded records
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from nw_stats.config import ProjectPaths
+from nw_stats.data.results_stream import iter_competitions
+from nw_stats.data_collection.competition_index import RESULTS_GLOB, extract_competition_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACTED_DIR = ProjectPaths.COMPACTED_RESULTS
+MANIFEST_FILENAME = "manifest.json"
+DATA_FILE_PATTERN = "competitions-{:06d}.jsonl"
+MANIFEST_VERSION = 1
+# Rewrite once superseded records outnumber live ones
+MAX_DEAD_FRACTION = 0.5
+
+
+class CompactionSummary(NamedTuple):
+    """Outcome of one :func:`compact` call."""
+    inputs_merged: List[str]
+    records_appended: int
+    competitions: int
+    rewritten: bool
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _competition_key(competition: Dict) -> Optional[str]:
+    url = competition.get("url", "")
+    return extract_competition_id(url) or url or None
+
+
+class CompactedResults:
+    """
+    Deduplicated, append-only competition results dataset.
+
+    Args:
+        directory: Dataset directory
+    """
+
+    def __init__(self, directory: Path = DEFAULT_COMPACTED_DIR):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / MANIFEST_FILENAME
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported manifest version in {self.manifest_path}")
+            return manifest
+        return {
+            "version": MANIFEST_VERSION,
+            "generation": 1,
+            "data_file": DATA_FILE_PATTERN.format(1),
+            "bytes": 0,
+            "records": 0,
+            "competitions": {},
+            "inputs": {},
+            "updated_at": None,
+        }
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    @property
+    def data_path(self) -> Path:
+        return self.directory / self.manifest["data_file"]
+
+    def __len__(self) -> int:
+        """Number of competitions in the dataset."""
+        return len(self.manifest["competitions"])
+
+    @staticmethod
+    def _input_state(path: Path) -> Dict:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def pending_inputs(self, input_files: List[Path]) -> List[Path]:
+        """Input files not merged yet, or changed since they were merged."""
+        pending = []
+        for path in input_files:
+            merged = self.manifest["inputs"].get(path.name)
+            state = self._input_state(path)
+            if merged is None or (merged["size"], merged["mtime"]) != (state["size"], state["mtime"]):
+                pending.append(path)
+        return pending
+
+    def merge(self, input_files: List[Path]) -> CompactionSummary:
+        """
+        Append the competitions of new or changed input files.
+
+        Inputs are merged in the given order; a competition in a later input
+        supersedes the record from an earlier one.
+
+        Args:
+            input_files: Results files, oldest first
+
+        Returns:
+            What was merged
+        """
+        pending = self.pending_inputs(input_files)
+        if not pending:
+            return CompactionSummary([], 0, len(self), False)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        competitions = self.manifest["competitions"]
+        offset = self.manifest["bytes"]
+        appended = 0
+        merged_at = datetime.now().isoformat(timespec="seconds")
+        with open(self.data_path, "ab") as f:
+            # Drop anything a crashed compaction appended after the manifest was written
+            f.truncate(offset)
+            for path in pending:
+                count = 0
+                for competition in iter_competitions(path):
+                    key = _competition_key(competition)
+                    if key is None:
+                        continue
+                    line = (json.dumps(competition, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    competitions[key] = offset
+                    offset += len(line)
+                    count += 1
+                self.manifest["inputs"][path.name] = {
+                    **self._input_state(path),
+                    "competitions": count,
+                    "merged_at": merged_at,
+                }
+                appended += count
+                logger.info(f"Merged {count} competitions from {path.name}")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.manifest["bytes"] = offset
+        self.manifest["records"] += appended
+        self._save_manifest()
+        return CompactionSummary([path.name for path in pending], appended, len(self), False)
+
+    def _save_manifest(self) -> None:
+        self.manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        _write_atomic(self.manifest_path, json.dumps(self.manifest, ensure_ascii=False))
+
+    def dead_fraction(self) -> float:
+        """Share of records in the data file that have been superseded."""
+        records = self.manifest["records"]
+        return (records - len(self)) / records if records else 0.0
+
+    def rewrite(self) -> None:
+        """Copy the live records to a new data file generation and drop the old one."""
+        old_path = self.data_path
+        generation = self.manifest["generation"] + 1
+        new_name = DATA_FILE_PATTERN.format(generation)
+        competitions = {}
+        offset = 0
+        with open(self.directory / new_name, "wb") as f:
+            for key, line in self._iter_live_lines():
+                f.write(line)
+                competitions[key] = offset
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.manifest.update({
+            "generation": generation,
+            "data_file": new_name,
+            "bytes": offset,
+            "records": len(competitions),
+            "competitions": competitions,
+        })
+        self._save_manifest()
+        old_path.unlink(missing_ok=True)
+        logger.info(f"Rewrote {len(competitions)} live competitions to {new_name}")
+
+    def _iter_live_lines(self) -> Iterator:
+        live = {offset: key for key, offset in self.manifest["competitions"].items()}
+        if not live:
+            return
+        with open(self.data_path, "rb") as f:
+            offset = 0
+            limit = self.manifest["bytes"]
+            while offset < limit:
+                line = f.readline()
+                if offset in live:
+                    yield live[offset], line
+                offset += len(line)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Yield every competition once (its latest record), in data file order."""
+        for _, line in self._iter_live_lines():
+            yield json.loads(line)
+
+
+def compact(data_dir: Path = ProjectPaths.DATA, compacted_dir: Optional[Path] = None,
+            rewrite: bool = False) -> CompactionSummary:
+    """
+    Merge new results files of a data directory into the compacted dataset.
+
+    Args:
+        data_dir: Directory with ``snwk_competition_results_*.json`` files
+        compacted_dir: Dataset directory, defaults to ``data_dir/compacted``
+        rewrite: Rewrite the data file even if few records are superseded
+
+    Returns:
+        What was merged
+    """
+    dataset = CompactedResults(compacted_dir or Path(data_dir) / DEFAULT_COMPACTED_DIR.name)
+    input_files = [Path(path) for path in sorted(glob.glob(str(Path(data_dir) / RESULTS_GLOB)))]
+    summary = dataset.merge(input_files)
+    if dataset.exists() and (rewrite or dataset.dead_fraction() > MAX_DEAD_FRACTION):
+        dataset.rewrite()
+        summary = summary._replace(rewritten=True)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Merge results files into one deduplicated dataset.")
+    parser.add_argument("--data-dir", type=Path, default=ProjectPaths.DATA,
+                        help="directory with snwk_competition_results_*.json files")
+    parser.add_argument("--output", type=Path, help="dataset directory (default: DATA_DIR/compacted)")
+    parser.add_argument("--rewrite", action="store_true", help="drop superseded records")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    summary = compact(args.data_dir, args.output, rewrite=args.rewrite)
+    logger.info(
+        f"Merged {len(summary.inputs_merged)} new results files ({summary.records_appended} records); "
+        f"dataset holds {summary.competitions} competitions"
+        + (", rewritten" if summary.rewritten else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
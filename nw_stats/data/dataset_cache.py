@@ -0,0 +1,318 @@
+"""
+Dataset Download Cache
+======================
+
+Downloads the published results file (a GitHub Releases asset) once and keeps
+the flattened participants frame in a local cache, so cold starts of the
+dashboard read a compressed file from disk instead of fetching and parsing the
+whole JSON again.
+
+- The download is streamed to a ``.part`` file in fixed-size chunks; an
+  interrupted download is resumed with an HTTP ``Range`` request
+- The finished file is checked against a SHA-256 checksum, given explicitly
+  or read from a ``<asset>.sha256`` file published next to the asset
+- The participants frame is stored as zstd-compressed Parquet (gzipped JSON
+  without ``pyarrow``), next to a small JSON file recording the source URL,
+  checksum and size; the downloaded JSON is removed afterwards
+
+Usage:
+    python -m nw_stats.data.dataset_cache fetch URL [--sha256 HEX]
+    python -m nw_stats.data.dataset_cache checksum data/snwk_competition_results_*.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlsplit
+
+import pandas as pd
+import requests
+
+from nw_stats.config import ProjectPaths
+from nw_stats.data.results_stream import load_participants
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ProjectPaths.DATASET_CACHE
+# Bytes of an interrupted read are lost, so keep network chunks small
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_ATTEMPTS = 5
+CHECKSUM_SUFFIX = ".sha256"
+CACHE_VERSION = 1
+
+
+class ChecksumError(ValueError):
+    """The downloaded file does not match its published checksum."""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_checksum_file(path: Path) -> Path:
+    """
+    Write ``<path>.sha256`` in ``sha256sum`` format, to publish next to the asset.
+
+    Returns:
+        Path of the checksum file
+    """
+    path = Path(path)
+    checksum_path = path.with_name(path.name + CHECKSUM_SUFFIX)
+    checksum_path.write_text(f"{file_sha256(path)}  {path.name}\n", encoding="utf-8")
+    return checksum_path
+
+
+def fetch_published_checksum(url: str, session: Optional[requests.Session] = None) -> Optional[str]:
+    """
+    Read the SHA-256 published as ``<url>.sha256``.
+
+    Returns:
+        Lower-case hex digest, or None when no checksum file is published
+    """
+    session = session or requests.Session()
+    try:
+        response = session.get(url + CHECKSUM_SUFFIX, timeout=DOWNLOAD_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch checksum for {url}: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+    fields = response.text.split()
+    return fields[0].lower() if fields else None
+
+
+def download(url: str, path: Path, sha256: Optional[str] = None, session: Optional[requests.Session] = None,
+             chunk_bytes: int = DOWNLOAD_CHUNK_BYTES, attempts: int = DOWNLOAD_ATTEMPTS) -> str:
+    """
+    Download ``url`` to ``path``, resuming a previous partial download.
+
+    Bytes are written to ``<path>.part`` and the file is moved into place only
+    once it is complete and matches ``sha256``. A broken connection is resumed
+    with a ``Range`` request from the bytes already on disk; a server that
+    ignores ``Range`` sends the whole file again.
+
+    Args:
+        url: File to download
+        path: Destination path
+        sha256: Expected hex digest; not checked when None
+        session: Session to download with
+        chunk_bytes: Bytes written at a time
+        attempts: Connections tried before giving up
+
+    Returns:
+        Hex SHA-256 of the downloaded file
+
+    Raises:
+        ChecksumError: The complete file does not match ``sha256``
+        requests.RequestException: Every attempt failed
+    """
+    session = session or requests.Session()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = path.with_name(path.name + ".part")
+    restarted = False
+
+    attempt = 0
+    while True:
+        attempt += 1
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 416:
+                    # Nothing left to send: the partial file is already complete
+                    logger.info(f"{part_path.name} already complete ({offset} bytes)")
+                else:
+                    response.raise_for_status()
+                    if offset and response.status_code == 206:
+                        logger.info(f"Resuming {url} at byte {offset}")
+                        mode = "ab"
+                    else:
+                        mode = "wb"
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_bytes):
+                            f.write(chunk)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt >= attempts:
+                raise
+            logger.warning(f"Download of {url} interrupted ({e}), resuming")
+            continue
+
+        digest = file_sha256(part_path)
+        if sha256 is None or digest == sha256.lower():
+            os.replace(part_path, path)
+            return digest
+        # A resumed file can mix two versions of the asset; start over once
+        part_path.unlink()
+        if restarted or not offset:
+            raise ChecksumError(f"{url}: expected sha256 {sha256}, got {digest}")
+        logger.warning(f"Checksum mismatch after resuming {url}, downloading again")
+        restarted = True
+
+
+class DatasetCache:
+    """
+    Local cache of participant frames built from downloaded results files.
+
+    Args:
+        directory: Cache directory
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def _asset_name(url: str) -> str:
+        return Path(unquote(urlsplit(url).path)).name or "dataset"
+
+    def _cache_path(self, url: str, suffix: str) -> Path:
+        name = self._asset_name(url)
+        stem = name[:-len(".json")] if name.endswith(".json") else name
+        return self.directory / f"{stem}{suffix}"
+
+    def _meta_path(self, url: str) -> Path:
+        return self._cache_path(url, ".meta.json")
+
+    def _read_meta(self, url: str) -> Optional[Dict]:
+        meta_path = self._meta_path(url)
+        if not meta_path.exists():
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != CACHE_VERSION or meta.get("url") != url:
+            return None
+        if not (self.directory / meta["file"]).exists():
+            return None
+        return meta
+
+    def is_cached(self, url: str, sha256: Optional[str] = None) -> bool:
+        """Whether ``url`` is cached (and, when given, with this checksum)."""
+        meta = self._read_meta(url)
+        return meta is not None and (sha256 is None or meta["sha256"] == sha256.lower())
+
+    def load(self, url: str) -> pd.DataFrame:
+        """
+        Read the cached participants frame of ``url``.
+
+        Raises:
+            FileNotFoundError: ``url`` is not cached
+        """
+        meta = self._read_meta(url)
+        if meta is None:
+            raise FileNotFoundError(f"{url} is not cached in {self.directory}")
+        path = self.directory / meta["file"]
+        if meta["format"] == "parquet":
+            # The pandas metadata restores the categorical and Int16 columns
+            return pq.read_table(path).to_pandas()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return load_participants(f)
+
+    def _store(self, url: str, json_path: Path, sha256: str) -> Dict:
+        if pa is not None:
+            participants = load_participants(json_path)
+            path = self._cache_path(url, ".parquet")
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            table = pa.Table.from_pandas(participants, preserve_index=False)
+            pq.write_table(table, tmp_path, compression="zstd")
+            cache_format = "parquet"
+        else:
+            path = self._cache_path(url, ".json.gz")
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            with open(json_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK_BYTES)
+            cache_format = "json.gz"
+        os.replace(tmp_path, path)
+
+        meta = {
+            "version": CACHE_VERSION,
+            "url": url,
+            "sha256": sha256,
+            "source_bytes": json_path.stat().st_size,
+            "file": path.name,
+            "format": cache_format,
+            "cached_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        meta_path = self._meta_path(url)
+        tmp_meta = meta_path.with_name(f".{meta_path.name}.tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_meta, meta_path)
+        return meta
+
+    def fetch(self, url: str, sha256: Optional[str] = None,
+              session: Optional[requests.Session] = None) -> pd.DataFrame:
+        """
+        Return the participants frame of ``url``, downloading it if it is not cached.
+
+        Args:
+            url: Results file (JSON array or JSONL) to download
+            sha256: Expected checksum; read from ``<url>.sha256`` when None
+            session: Session to download with
+
+        Returns:
+            The participants DataFrame
+
+        Raises:
+            ChecksumError: The download does not match the checksum
+        """
+        if self.is_cached(url, sha256):
+            try:
+                return self.load(url)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cache for {url}: {e}")
+
+        session = session or requests.Session()
+        if sha256 is None:
+            sha256 = fetch_published_checksum(url, session)
+            if sha256 is None:
+                logger.warning(f"No checksum published for {url}, download is not verified")
+
+        json_path = self.directory / self._asset_name(url)
+        digest = download(url, json_path, sha256, session)
+        meta = self._store(url, json_path, digest)
+        json_path.unlink()
+        logger.info(f"Cached {url} as {meta['file']} ({meta['source_bytes']} bytes downloaded)")
+        return self.load(url)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Download and cache the published results dataset.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    fetch = subparsers.add_parser("fetch", help="download a results file into the cache")
+    fetch.add_argument("url")
+    fetch.add_argument("--sha256", help="expected checksum (default: read URL.sha256)")
+    fetch.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    checksum = subparsers.add_parser("checksum", help="write FILE.sha256 files to publish with the assets")
+    checksum.add_argument("files", type=Path, nargs="+")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "checksum":
+        for path in args.files:
+            logger.info(f"Wrote {write_checksum_file(path)}")
+    else:
+        participants = DatasetCache(args.cache_dir).fetch(args.url, args.sha256)
+        logger.info(f"{len(participants)} participant rows cached in {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
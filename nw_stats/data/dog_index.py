@@ -0,0 +1,170 @@
+"""
+Dog Index
+=========
+
+Per-dog lookups for the dashboard's "Statistik per Hund" section. The row
+positions of every dog (``stamtavlenamn``) are grouped once, newest
+competition first, and the points of each dog are summed per competition
+type, class and search. A dog's profile then costs time proportional to
+that dog's results instead of a scan, a ``groupby`` and a sort of the frame.
+
+The index keeps the caller's frame, not a copy, and addresses its rows by
+position. New results are indexed with :meth:`DogIndex.extend`, given the
+caller's frame with the new rows at the end, which only touches the new
+rows and their dogs. :meth:`DogIndex.append` concatenates the new rows
+itself and so copies the whole frame.
+
+Usage:
+    dogs = DogIndex(participants)
+    dogs.recent("Springer Nova's Nemo Of Deye", 10)            # newest starts
+    dogs.search_averages("Springer Nova's Nemo Of Deye", klass="NW3")
+    dogs.extend(participants_with_new_rows)                     # new rows at the end
+    dogs.append(new_participants)                               # copies the frame
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from nw_stats.data.aggregate_cube import ALL
+from nw_stats.data.flatten import concat_participant_frames
+
+POSITION_DTYPE = "int64"
+
+# (typ, klass, typ_av_sök) -> [points sum, starts with points]
+SearchStats = Dict[Tuple[str, str, str], List[float]]
+
+
+def _date_keys(dates: pd.Series) -> np.ndarray:
+    """``YYYY-MM-DD`` dates as ``YYYYMMDD`` integers, 0 where missing or malformed."""
+    digits = dates.astype(str).str.replace("-", "", regex=False)
+    return pd.to_numeric(digits, errors="coerce").fillna(0).to_numpy(dtype="int64")
+
+
+class DogIndex:
+    """
+    Row positions and search statistics per dog of a participants frame.
+
+    Args:
+        participants: Participants DataFrame, kept without copying; its rows
+            are addressed by position, so only add rows at the end, through
+            :meth:`extend` or :meth:`append`
+    """
+
+    def __init__(self, participants: pd.DataFrame):
+        self.participants = participants
+        self._rows: Dict[str, np.ndarray] = {}
+        self._dates: Dict[str, np.ndarray] = {}
+        self._stats: Dict[str, SearchStats] = {}
+        self._index_rows(self.participants, 0)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, dog: str) -> bool:
+        return dog in self._rows
+
+    def dogs(self) -> List[str]:
+        return list(self._rows)
+
+    def _index_rows(self, rows: pd.DataFrame, offset: int) -> None:
+        codes, names = pd.factorize(rows["stamtavlenamn"].astype(str))
+        dates = _date_keys(rows["datum"])
+        positions = np.arange(offset, offset + len(rows), dtype=POSITION_DTYPE)
+        # Grouped by dog, newest first, in row order within a date
+        order = np.lexsort((positions, -dates, codes))
+        bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(names)))]
+        for code, name in enumerate(names):
+            group = order[bounds[code]:bounds[code + 1]]
+            new_rows, new_dates = positions[group], dates[group]
+            if name in self._rows:
+                new_rows = np.r_[self._rows[name], new_rows]
+                new_dates = np.r_[self._dates[name], new_dates]
+                merged = np.lexsort((new_rows, -new_dates))
+                new_rows, new_dates = new_rows[merged], new_dates[merged]
+            self._rows[name] = new_rows
+            self._dates[name] = new_dates
+
+        points = rows.assign(_scored=rows["poäng"].notna())
+        sums = points.groupby(["stamtavlenamn", "typ", "klass", "typ_av_sök"], observed=True, sort=False).agg(
+            points_sum=("poäng", "sum"), scored=("_scored", "sum")
+        )
+        for (dog, typ, klass, search), points_sum, scored in zip(
+            sums.index, sums["points_sum"].to_numpy(dtype="float64"), sums["scored"].to_numpy()
+        ):
+            stats = self._stats.setdefault(str(dog), {}).setdefault((str(typ), str(klass), str(search)), [0.0, 0])
+            stats[0] += points_sum
+            stats[1] += int(scored)
+
+    def extend(self, participants: pd.DataFrame) -> None:
+        """
+        Switch to ``participants``, the indexed frame with new rows at the end, and index the new rows.
+
+        Costs time proportional to the new rows and the starts of their dogs;
+        the frame is neither copied nor rescanned.
+
+        Args:
+            participants: Frame starting with the rows already indexed, in the
+                same order (e.g. newly scraped competitions appended to it)
+        """
+        offset = len(self.participants)
+        if len(participants) < offset:
+            raise ValueError(f"Expected at least the {offset} indexed rows, got {len(participants)}")
+        self.participants = participants
+        self._index_rows(participants.iloc[offset:], offset)
+
+    def append(self, new_participants: pd.DataFrame) -> None:
+        """
+        Add new rows (e.g. newly scraped competitions) to the frame and the index.
+
+        The frame is concatenated with ``new_participants``, which copies it
+        and so costs time proportional to the whole frame; use :meth:`extend`
+        when the combined frame already exists. Only the dogs in
+        ``new_participants`` are re-indexed.
+        """
+        self.extend(concat_participant_frames([self.participants, new_participants]))
+
+    def rows(self, dog: str, typ: str = ALL, klass: str = ALL) -> np.ndarray:
+        """
+        Row positions of a dog's starts, newest competition first.
+
+        Args:
+            dog: Registered name (``stamtavlenamn``)
+            typ: Competition type, or ``ALL``
+            klass: Class, or ``ALL``
+        """
+        rows = self._rows.get(dog)
+        if rows is None:
+            return np.empty(0, dtype=POSITION_DTYPE)
+        for column, value in (("typ", typ), ("klass", klass)):
+            if value != ALL and len(rows):
+                rows = rows[(self.participants[column].iloc[rows] == value).to_numpy()]
+        return rows
+
+    def recent(self, dog: str, count: int = 10, typ: str = ALL, klass: str = ALL,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The dog's ``count`` newest starts, optionally only some columns."""
+        frame = self.participants if columns is None else self.participants[columns]
+        return frame.take(self.rows(dog, typ, klass)[:count])
+
+    def search_averages(self, dog: str, typ: str = ALL, klass: str = ALL) -> pd.DataFrame:
+        """
+        Average points per search type from the cached sums.
+
+        Returns:
+            Columns ``typ_av_sök`` (sorted) and ``poäng``; NaN for searches
+            started without points
+        """
+        totals: Dict[str, List[float]] = {}
+        for (stat_typ, stat_klass, search), (points_sum, scored) in self._stats.get(dog, {}).items():
+            if typ != ALL and stat_typ != typ or klass != ALL and stat_klass != klass:
+                continue
+            total = totals.setdefault(search, [0.0, 0])
+            total[0] += points_sum
+            total[1] += scored
+        searches = sorted(totals)
+        return pd.DataFrame({
+            "typ_av_sök": searches,
+            "poäng": [totals[s][0] / totals[s][1] if totals[s][1] else np.nan for s in searches],
+        })
@@ -0,0 +1,446 @@
+"""
+Entity Tables
+=============
+
+Splits the flattened participants into dimension tables with stable integer
+ids (competitions, dogs, handlers, judges and clubs) and a fact table of
+starts that refers to them. Every name is stored once instead of once per
+row, and joins and ``groupby`` run on integer keys.
+
+Tables (all ids ``int32``, nullable ``Int32`` where a value can be missing):
+
+- ``competitions``: ``competition_id``, ``arr`` (the site's competition id),
+  ``datum``, ``klass``, ``typ``, ``plats``, ``arrangör_id``, ``anordnare_id``
+- ``dogs``: ``dog_id``, ``stamtavlenamn``, ``hund_namn``, ``hundras``; a dog
+  is identified by its registered name, call name and breed are taken from
+  its latest start
+- ``handlers``, ``judges``, ``clubs``: id and name (``förare``, ``domare``,
+  ``namn``); clubs are both organisers (``arrangör``) and hosts (``anordnare``)
+- ``result_sets``: ``result_set_id``, ``competition_id``, ``typ_av_sök``
+- ``result_set_judges``: ``result_set_id``, ``position``, ``judge_id``
+- ``participants``: ``result_set_id``, ``competition_id``, ``dog_id``,
+  ``handler_id`` and the ``start_position``, ``placering``, ``poäng``,
+  ``fel`` and ``tid`` of the start
+
+Ids come from an :class:`EntityRegistry` that is saved with the tables and
+only ever appended to, so an entity keeps its id when the tables are rebuilt
+from more data. Result set ids are assigned per build.
+
+Requires the optional ``pyarrow`` dependency to read and write the tables
+(``pip install nw_stats[parquet]``).
+
+Usage:
+    python -m nw_stats.data.entities build              # from the compacted dataset
+    python -m nw_stats.data.entities build results.json --output entities/
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from nw_stats.config import ProjectPaths
+from nw_stats.data.flatten import INTEGER_COLUMNS, PARTICIPANT_COLUMNS, create_participants_dataframe, \
+    optimize_dtypes
+from nw_stats.data.results_stream import DEFAULT_CHUNK_ROWS, iter_competition_batches, iter_competitions
+from nw_stats.data_collection.competition_index import extract_competition_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENTITY_DIR = ProjectPaths.ENTITY_TABLES
+REGISTRY_FILENAME = "registry.json"
+REGISTRY_VERSION = 1
+DIMENSIONS = ["competition", "dog", "handler", "judge", "club"]
+ID_DTYPE = "int32"
+NULLABLE_ID_DTYPE = "Int32"
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("pyarrow is required for the entity tables: pip install nw_stats[parquet]")
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+class EntityRegistry:
+    """
+    Append-only mapping from entity keys (names, competition ids) to integer ids.
+
+    The id of a key is its position in the dimension's key list, so ids never
+    change once assigned.
+
+    Args:
+        path: JSON file to load from and save to; None keeps the registry in memory
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self._keys: Dict[str, List[str]] = {dimension: [] for dimension in DIMENSIONS}
+        if self.path is not None and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("version") != REGISTRY_VERSION:
+                raise ValueError(f"Unsupported registry version in {self.path}")
+            self._keys.update(saved["dimensions"])
+        self._ids = {dimension: {key: i for i, key in enumerate(keys)} for dimension, keys in self._keys.items()}
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._keys.values())
+
+    def keys(self, dimension: str) -> List[str]:
+        """Keys of a dimension, indexed by id."""
+        return self._keys[dimension]
+
+    def intern(self, dimension: str, keys: Sequence) -> pd.api.extensions.ExtensionArray:
+        """
+        Look up the ids of ``keys``, assigning new ids to unseen keys.
+
+        Only distinct keys are looked up, so the cost depends on the number of
+        distinct values rather than their count.
+
+        Args:
+            dimension: One of ``DIMENSIONS``
+            keys: Entity keys; None and ``''`` have no entity
+
+        Returns:
+            Nullable ``Int32`` ids, NA where there is no key
+        """
+        ids = self._ids[dimension]
+        known = self._keys[dimension]
+        codes, uniques = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=True)
+        unique_ids = np.empty(len(uniques) + 1, dtype=ID_DTYPE)
+        # The last slot is selected by the missing-value code -1
+        unique_ids[-1] = -1
+        for i, key in enumerate(uniques):
+            if key == "":
+                unique_ids[i] = -1
+                continue
+            key = str(key)
+            entity_id = ids.get(key)
+            if entity_id is None:
+                entity_id = ids[key] = len(known)
+                known.append(key)
+            unique_ids[i] = entity_id
+        result = unique_ids[codes]
+        entity_ids = pd.array(result, dtype=NULLABLE_ID_DTYPE)
+        entity_ids[result < 0] = pd.NA
+        return entity_ids
+
+    def save(self, path: Optional[Path] = None) -> None:
+        """Write the registry atomically to ``path`` (default: the path it was loaded from)."""
+        path = Path(path) if path is not None else self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": REGISTRY_VERSION, "dimensions": self._keys}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class EntityTables(NamedTuple):
+    """Dimension, bridge and fact tables, see the module docstring."""
+    competitions: pd.DataFrame
+    dogs: pd.DataFrame
+    handlers: pd.DataFrame
+    judges: pd.DataFrame
+    clubs: pd.DataFrame
+    result_sets: pd.DataFrame
+    result_set_judges: pd.DataFrame
+    participants: pd.DataFrame
+
+
+def _ids(values: pd.api.extensions.ExtensionArray) -> np.ndarray:
+    return np.asarray(values, dtype=ID_DTYPE)
+
+
+def _name_table(registry: EntityRegistry, dimension: str, ids: Iterable, column: str) -> pd.DataFrame:
+    used = np.unique(np.asarray(list(ids), dtype="int64"))
+    keys = registry.keys(dimension)
+    return pd.DataFrame({
+        f"{dimension}_id": used.astype(ID_DTYPE),
+        column: pd.Series([keys[i] for i in used], dtype=str),
+    })
+
+
+def build_entity_tables(competitions: Iterable[Dict], registry: Optional[EntityRegistry] = None,
+                        chunk_rows: int = DEFAULT_CHUNK_ROWS) -> EntityTables:
+    """
+    Build the entity tables from a stream of competitions.
+
+    Competitions are flattened in chunks like
+    :func:`nw_stats.data.results_stream.participants_from_competitions`.
+
+    Args:
+        competitions: Competition dictionaries, each competition once (e.g.
+            from :class:`nw_stats.data.compaction.CompactedResults`)
+        registry: Registry assigning the ids; new entities are added to it
+        chunk_rows: Participant rows flattened at a time
+
+    Returns:
+        The tables
+
+    Raises:
+        ValueError: A competition occurs more than once
+    """
+    registry = registry if registry is not None else EntityRegistry()
+    competition_columns: Dict[str, List] = {
+        column: [] for column in ["arr", "datum", "klass", "typ", "plats", "arrangör", "anordnare"]
+    }
+    set_competitions: List[int] = []
+    set_searches: List[str] = []
+    judge_sets: List[int] = []
+    judge_positions: List[int] = []
+    judge_names: List[str] = []
+    fact_frames: List[pd.DataFrame] = []
+    dog_frames: List[pd.DataFrame] = []
+    competition_ids: List[int] = []
+
+    for batch in iter_competition_batches(competitions, chunk_rows):
+        keys = [extract_competition_id(comp.get("url", "")) or comp.get("url", "") for comp in batch]
+        batch_competition_ids = _ids(registry.intern("competition", keys))
+        competition_ids.extend(batch_competition_ids)
+        set_lengths = []
+        for comp, competition_id, key in zip(batch, batch_competition_ids, keys):
+            competition_columns["arr"].append(key)
+            for column in ["datum", "klass", "typ", "plats", "arrangör", "anordnare"]:
+                competition_columns[column].append(comp.get(column, ""))
+            for result_set in comp.get("resultat", []):
+                result_set_id = len(set_competitions)
+                set_competitions.append(competition_id)
+                set_searches.append(result_set.get("sök", ""))
+                set_lengths.append(len(result_set.get("tabell", [])))
+                for position, judge in enumerate(result_set.get("domare", [])):
+                    judge_sets.append(result_set_id)
+                    judge_positions.append(position)
+                    judge_names.append(judge)
+
+        flat = create_participants_dataframe(batch)
+        first_set = len(set_competitions) - len(set_lengths)
+        set_ids = np.repeat(np.arange(first_set, len(set_competitions), dtype=ID_DTYPE), set_lengths)
+        dog_ids = registry.intern("dog", flat["stamtavlenamn"])
+        fact = pd.DataFrame({
+            "result_set_id": set_ids,
+            "competition_id": np.asarray(set_competitions, dtype=ID_DTYPE)[set_ids],
+            "dog_id": dog_ids,
+            "handler_id": registry.intern("handler", flat["förare"]),
+        })
+        for column in INTEGER_COLUMNS + ["tid"]:
+            fact[column] = flat[column].to_numpy() if column == "tid" else flat[column].array
+        fact_frames.append(fact)
+        dog_frames.append(pd.DataFrame({
+            "dog_id": dog_ids,
+            "hund_namn": flat["hund_namn"].astype(str),
+            "hundras": flat["hundras"].astype(str),
+            "datum": flat["datum"].astype(str),
+        }))
+
+    if len(set(competition_ids)) != len(competition_ids):
+        raise ValueError("Competitions occur more than once; merge the results files with nw-compact first")
+
+    competitions_frame = pd.DataFrame({
+        "competition_id": np.asarray(competition_ids, dtype=ID_DTYPE),
+        "arr": pd.Series(competition_columns["arr"], dtype=str),
+    })
+    for column in ["datum", "klass", "typ", "plats"]:
+        competitions_frame[column] = pd.Series(competition_columns[column], dtype=object).fillna("").astype("category")
+    for column in ["arrangör", "anordnare"]:
+        competitions_frame[f"{column}_id"] = registry.intern("club", competition_columns[column])
+
+    participants = pd.concat(fact_frames, ignore_index=True) if fact_frames else _empty_facts()
+    dogs = pd.concat(dog_frames, ignore_index=True) if dog_frames else \
+        pd.DataFrame({"dog_id": pd.array([], dtype=NULLABLE_ID_DTYPE), "hund_namn": [], "hundras": [], "datum": []})
+    # Results files list competitions newest first, so order by date to keep each dog's latest start
+    dogs = dogs.dropna(subset=["dog_id"]).sort_values("datum", kind="stable")
+    dogs = dogs.drop_duplicates("dog_id", keep="last").sort_values("dog_id")
+    dog_keys = registry.keys("dog")
+    dogs = pd.DataFrame({
+        "dog_id": dogs["dog_id"].to_numpy(dtype=ID_DTYPE),
+        "stamtavlenamn": pd.Series([dog_keys[i] for i in dogs["dog_id"]], dtype=str),
+        "hund_namn": dogs["hund_namn"].to_numpy(dtype=object),
+        "hundras": pd.Categorical(dogs["hundras"].to_numpy(dtype=object)),
+    })
+
+    club_ids = pd.concat([competitions_frame["arrangör_id"], competitions_frame["anordnare_id"]]).dropna()
+    judge_ids = _ids(registry.intern("judge", judge_names))
+    return EntityTables(
+        competitions=competitions_frame,
+        dogs=dogs,
+        handlers=_name_table(registry, "handler", participants["handler_id"].dropna(), "förare"),
+        judges=_name_table(registry, "judge", judge_ids, "domare"),
+        clubs=_name_table(registry, "club", club_ids, "namn"),
+        result_sets=pd.DataFrame({
+            "result_set_id": np.arange(len(set_competitions), dtype=ID_DTYPE),
+            "competition_id": np.asarray(set_competitions, dtype=ID_DTYPE),
+            "typ_av_sök": pd.Series(set_searches, dtype=object).fillna("").astype("category"),
+        }),
+        result_set_judges=pd.DataFrame({
+            "result_set_id": np.asarray(judge_sets, dtype=ID_DTYPE),
+            "position": np.asarray(judge_positions, dtype="int8"),
+            "judge_id": judge_ids,
+        }),
+        participants=participants,
+    )
+
+
+def _empty_facts() -> pd.DataFrame:
+    return pd.DataFrame({
+        "result_set_id": np.array([], dtype=ID_DTYPE),
+        "competition_id": np.array([], dtype=ID_DTYPE),
+        "dog_id": pd.array([], dtype=NULLABLE_ID_DTYPE),
+        "handler_id": pd.array([], dtype=NULLABLE_ID_DTYPE),
+        **{column: create_participants_dataframe([])[column].array for column in INTEGER_COLUMNS + ["tid"]},
+    })
+
+
+def _lookup(table: pd.DataFrame, id_column: str, column: str, ids) -> np.ndarray:
+    """Values of ``column`` for each id in ``ids`` (``''`` where the id is NA or unknown)."""
+    values = pd.Series(table[column].to_numpy(dtype=object), index=table[id_column].to_numpy())
+    return values.reindex(pd.array(ids, dtype=NULLABLE_ID_DTYPE)).fillna("").to_numpy(dtype=object)
+
+
+def participants_frame(tables: EntityTables) -> pd.DataFrame:
+    """
+    Join the tables back into the flat participants frame.
+
+    Returns:
+        DataFrame typed like :func:`nw_stats.data.flatten.create_participants_dataframe`;
+        ``hund_namn`` and ``hundras`` come from the dog table
+    """
+    facts = tables.participants
+    competitions = tables.competitions
+    judges = tables.result_set_judges.sort_values(["result_set_id", "position"])
+    judges = judges.assign(domare=_lookup(tables.judges, "judge_id", "domare", judges["judge_id"]))
+    set_judges = judges.groupby("result_set_id")["domare"].agg(", ".join)
+    result_sets = tables.result_sets.set_index("result_set_id")
+    result_sets["domare"] = set_judges.reindex(result_sets.index).fillna("")
+
+    competition_ids = facts["competition_id"]
+    columns = {
+        "klass": _lookup(competitions, "competition_id", "klass", competition_ids),
+        "datum": _lookup(competitions, "competition_id", "datum", competition_ids),
+        "plats": _lookup(competitions, "competition_id", "plats", competition_ids),
+        "typ": _lookup(competitions, "competition_id", "typ", competition_ids),
+    }
+    for column in ["arrangör", "anordnare"]:
+        club_ids = pd.Series(competitions[f"{column}_id"].array, index=competitions["competition_id"].to_numpy())
+        columns[column] = _lookup(tables.clubs, "club_id", "namn", club_ids.reindex(competition_ids.to_numpy()))
+    set_ids = facts["result_set_id"].to_numpy()
+    columns["typ_av_sök"] = result_sets["typ_av_sök"].astype(object).reindex(set_ids).fillna("").to_numpy()
+    columns["domare"] = result_sets["domare"].reindex(set_ids).to_numpy(dtype=object)
+    columns["förare"] = _lookup(tables.handlers, "handler_id", "förare", facts["handler_id"])
+    for column in ["hund_namn", "stamtavlenamn", "hundras"]:
+        columns[column] = _lookup(tables.dogs, "dog_id", column, facts["dog_id"])
+
+    data = {}
+    for column in PARTICIPANT_COLUMNS:
+        if column in columns:
+            data[column] = pd.Series(columns[column], dtype=object).astype(str)
+        else:
+            data[column] = facts[column].reset_index(drop=True)
+    return optimize_dtypes(pd.DataFrame(data, columns=PARTICIPANT_COLUMNS))
+
+
+def memory_usage(tables: EntityTables) -> pd.Series:
+    """Deep memory use in bytes of each table."""
+    return pd.Series({name: int(table.memory_usage(deep=True).sum()) for name, table in tables._asdict().items()})
+
+
+def write_entity_tables(tables: EntityTables, registry: EntityRegistry,
+                        directory: Path = DEFAULT_ENTITY_DIR) -> None:
+    """
+    Write every table as ``<name>.parquet`` and the registry as ``registry.json``.
+
+    Each file is replaced atomically; the registry is written last so it
+    always covers the ids in the tables.
+    """
+    _require_pyarrow()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, table in tables._asdict().items():
+        path = directory / f"{name}.parquet"
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        pq.write_table(pa.Table.from_pandas(table, preserve_index=False), tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    registry.save(directory / REGISTRY_FILENAME)
+
+
+def read_entity_tables(directory: Path = DEFAULT_ENTITY_DIR,
+                       tables: Optional[Sequence[str]] = None) -> EntityTables:
+    """
+    Read the tables written by :func:`write_entity_tables`.
+
+    Args:
+        directory: Directory of the tables
+        tables: Names of the tables to read; the others are empty frames
+    """
+    _require_pyarrow()
+    names = EntityTables._fields if tables is None else tables
+    return EntityTables(**{
+        name: pq.read_table(Path(directory) / f"{name}.parquet").to_pandas() if name in names else pd.DataFrame()
+        for name in EntityTables._fields
+    })
+
+
+def entity_tables_exist(directory: Path = DEFAULT_ENTITY_DIR) -> bool:
+    return (Path(directory) / REGISTRY_FILENAME).exists()
+
+
+def build_entities(competitions: Iterable[Dict], directory: Path = DEFAULT_ENTITY_DIR) -> EntityTables:
+    """
+    Rebuild the tables in ``directory``, keeping the ids of its registry.
+
+    Args:
+        competitions: Competition dictionaries, each competition once
+        directory: Directory of the tables
+
+    Returns:
+        The tables written
+    """
+    _require_pyarrow()
+    registry = EntityRegistry(Path(directory) / REGISTRY_FILENAME)
+    tables = build_entity_tables(competitions, registry)
+    write_entity_tables(tables, registry, directory)
+    return tables
+
+
+def main(argv: Optional[List[str]] = None):
+    from nw_stats.data import compaction
+
+    parser = argparse.ArgumentParser(description="Build the entity and fact tables.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="rebuild the tables, keeping existing ids")
+    build.add_argument("files", type=Path, nargs="*",
+                       help="results files with distinct competitions (default: the compacted dataset)")
+    build.add_argument("--output", type=Path, default=DEFAULT_ENTITY_DIR)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.files:
+        competitions = itertools.chain.from_iterable(iter_competitions(path) for path in args.files)
+    else:
+        compaction.compact(ProjectPaths.DATA)
+        competitions = iter(compaction.CompactedResults())
+    tables = build_entities(competitions, args.output)
+    logger.info(
+        f"Wrote {len(tables.participants)} starts, {len(tables.competitions)} competitions, "
+        f"{len(tables.dogs)} dogs, {len(tables.handlers)} handlers, {len(tables.judges)} judges "
+        f"and {len(tables.clubs)} clubs to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
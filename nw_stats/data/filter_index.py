@@ -0,0 +1,148 @@
+"""
+Filter Index
+============
+
+Selects participant rows by column values without scanning or copying the
+frame. For each filterable column the row positions of every value are
+computed once (one stable argsort per column), so a filter is a lookup of
+one position array per column and an intersection of the smallest ones.
+
+Filters take a value, a list of values (any of them) or ``ALL``/None (no
+filter). Only the selected rows are ever materialised.
+
+Usage:
+    index = FilterIndex(participants)
+    rows = index.select(typ_av_sök="Inomhus", klass=["NW2", "NW3"], hundras=ALL)
+    nw3 = index.take(klass="NW3")            # DataFrame of the matching rows
+    index.values("domare")                   # values in order of first appearance
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from nw_stats.data.aggregate_cube import ALL
+
+FILTER_COLUMNS = ["typ", "typ_av_sök", "klass", "domare", "hundras", "stamtavlenamn", "förare"]
+POSITION_DTYPE = "int32"
+
+FilterValue = Union[None, str, Sequence[str]]
+
+
+class _ColumnIndex:
+    """Row positions of each value of one column, grouped by value."""
+
+    def __init__(self, column: pd.Series):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = column.cat.codes.to_numpy()
+            categories = column.cat.categories
+        else:
+            codes, categories = pd.factorize(column, use_na_sentinel=True)
+        # Missing values get their own group after the real values
+        codes = np.where(codes < 0, len(categories), codes)
+        self.positions = np.argsort(codes, kind="stable").astype(POSITION_DTYPE)
+        counts = np.bincount(codes, minlength=len(categories) + 1)
+        self.offsets = np.r_[0, np.cumsum(counts)]
+        present = counts[:len(categories)] > 0
+        self.codes: Dict[str, int] = {
+            str(value): code for code, value in enumerate(categories) if present[code]
+        }
+        # Values ordered by the row they first appear in
+        first_rows = self.positions[self.offsets[:-2][present]]
+        self.values_in_order: List[str] = [
+            str(value) for _, value in sorted(zip(first_rows, np.asarray(categories)[present]))
+        ]
+
+    def rows(self, value: str) -> np.ndarray:
+        code = self.codes.get(str(value))
+        if code is None:
+            return np.empty(0, dtype=POSITION_DTYPE)
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+
+class FilterIndex:
+    """
+    Per-value row position arrays of a participants frame.
+
+    The frame must not be modified while the index is used.
+
+    Args:
+        participants: Participants DataFrame
+        columns: Columns to index, defaults to the ``FILTER_COLUMNS`` present
+    """
+
+    def __init__(self, participants: pd.DataFrame, columns: Optional[Iterable[str]] = None):
+        self.participants = participants
+        columns = [c for c in FILTER_COLUMNS if c in participants.columns] if columns is None else list(columns)
+        self._columns = {column: _ColumnIndex(participants[column]) for column in columns}
+
+    def __len__(self) -> int:
+        return len(self.participants)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def values(self, column: str) -> List[str]:
+        """Distinct values of an indexed column, in order of first appearance."""
+        return list(self._columns[column].values_in_order)
+
+    def rows(self, column: str, value: FilterValue) -> Optional[np.ndarray]:
+        """
+        Sorted row positions where ``column`` has ``value``.
+
+        Args:
+            column: Indexed column
+            value: A value, a list of values (any of them), or ``ALL``/None
+
+        Returns:
+            Row positions, or None for no filter
+        """
+        if value is None or (isinstance(value, str) and value == ALL):
+            return None
+        index = self._columns[column]
+        if isinstance(value, str) or not isinstance(value, Iterable):
+            return index.rows(value)
+        # Each value's positions are disjoint from the others', so distinct values give unique rows
+        parts = [index.rows(v) for v in dict.fromkeys(value)]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=POSITION_DTYPE)
+
+    def select(self, **filters: FilterValue) -> np.ndarray:
+        """
+        Row positions matching every filter.
+
+        Args:
+            **filters: Indexed column -> value, list of values or ``ALL``/None
+
+        Returns:
+            Sorted ``int32`` row positions; every row when nothing is filtered
+        """
+        selections = [rows for column, value in filters.items()
+                      if (rows := self.rows(column, value)) is not None]
+        if not selections:
+            return np.arange(len(self.participants), dtype=POSITION_DTYPE)
+        selections.sort(key=len)
+        selected = selections[0]
+        for rows in selections[1:]:
+            if not len(selected):
+                break
+            # Sorted and unique, so membership is a binary search of the smaller array
+            found = np.searchsorted(rows, selected)
+            found[found == len(rows)] = 0
+            selected = selected[rows[found] == selected] if len(rows) else rows
+        return selected
+
+    def count(self, **filters: FilterValue) -> int:
+        return len(self.select(**filters))
+
+    def take(self, columns: Optional[List[str]] = None, **filters: FilterValue) -> pd.DataFrame:
+        """
+        The matching rows (and optionally only some columns) as a new DataFrame.
+
+        Only the selected rows are copied; the original index is kept.
+        """
+        frame = self.participants if columns is None else self.participants[columns]
+        return frame.take(self.select(**filters))
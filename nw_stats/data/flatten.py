@@ -0,0 +1,344 @@
+"""
+Participant Flattening
+======================
+
+Turns the nested competition results written by the scraper (competition ->
+result set per search -> participant table) into one flat row per
+participant, the shape every analysis starts from.
+
+The DataFrame is built column by column: competition and result set fields
+are repeated once per participant table instead of once per row, no
+per-row dictionaries are created, and result times are parsed once per
+distinct value. Columns get compact types (see :func:`memory_report`):
+
+- Low-cardinality text (class, type, search, judges, breed, organisers,
+  place, date) is ``category``; ``''`` where the value is missing
+- Names (handler, dog) are strings, ``''`` where missing
+- ``start_position``, ``placering``, ``poäng`` and ``fel`` are nullable ``Int16``
+- ``tid`` is ``float64`` seconds, NaN where missing or unparseable
+
+Group by categorical columns with ``observed=True`` so only values present
+in the (filtered) frame form groups.
+"""
+
+import logging
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+# Output columns, in order
+PARTICIPANT_COLUMNS = [
+    "klass", "datum", "plats", "typ", "arrangör", "anordnare", "typ_av_sök", "domare",
+    "förare", "hund_namn", "stamtavlenamn", "hundras", "start_position", "placering",
+    "poäng", "fel", "tid",
+]
+
+# Output column -> key in the competition dictionary
+COMPETITION_FIELDS = {
+    "klass": "klass",
+    "datum": "datum",
+    "plats": "plats",
+    "typ": "typ",
+    "arrangör": "arrangör",
+    "anordnare": "anordnare",
+}
+
+# Output column -> key in the scraper's participant dictionary
+PARTICIPANT_FIELDS = {
+    "förare": "handler",
+    "hund_namn": "dog_call_name",
+    "stamtavlenamn": "dog_full_name",
+    "hundras": "dog_breed",
+    "start_position": "start_number",
+    "placering": "placement",
+    "poäng": "points",
+    "fel": "faults",
+    "tid": "time",
+}
+
+CATEGORY_COLUMNS = ["klass", "datum", "plats", "typ", "arrangör", "anordnare", "typ_av_sök", "domare", "hundras"]
+INTEGER_COLUMNS = ["start_position", "placering", "poäng", "fel"]
+INTEGER_DTYPE = "Int16"
+
+
+def convert_time_to_seconds(time_str) -> Optional[float]:
+    """
+    Convert a result time (``MM:SS,ss``, ``HH:MM:SS,ss`` or seconds) to seconds.
+
+    Returns:
+        Seconds as a float, or None for empty or unparseable values
+    """
+    if pd.isna(time_str) or time_str == '':
+        return None
+    try:
+        time_str = str(time_str).replace(',', '.')
+        if ':' in time_str:
+            parts = time_str.split(':')
+            if len(parts) == 2:
+                minutes = float(parts[0])
+                seconds = float(parts[1])
+                return minutes * 60 + seconds
+            elif len(parts) == 3:
+                hours = float(parts[0])
+                minutes = float(parts[1])
+                seconds = float(parts[2])
+                return hours * 3600 + minutes * 60 + seconds
+        else:
+            return float(time_str)
+    except (TypeError, ValueError):
+        return None
+
+
+class TimeParseResult(NamedTuple):
+    """Seconds parsed from a column of result times."""
+    seconds: np.ndarray
+    missing: int
+    unparseable: int
+    examples: List[str]
+
+
+def parse_times(times: Sequence) -> TimeParseResult:
+    """
+    Convert a column of result times to seconds with array operations.
+
+    Accepts ``MM:SS,ss``, ``HH:MM:SS,ss`` and plain seconds, with ``,`` or
+    ``.`` as decimal separator. Only distinct values are parsed, so the cost
+    depends on the number of distinct times rather than the number of rows.
+
+    Args:
+        times: Result times; None, NaN and ``''`` count as missing
+
+    Returns:
+        ``float64`` seconds (NaN where missing or unparseable), the number of
+        missing and unparseable values, and up to five unparseable examples
+    """
+    codes, uniques = pd.factorize(pd.Series(times, dtype=object), use_na_sentinel=True)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip().str.replace(",", ".", regex=False)
+    empty = (text == "").to_numpy()
+
+    values = np.full(len(text), np.nan)
+    if len(text):
+        parts = text.str.split(":", expand=True)
+        part_count = text.str.count(":").to_numpy() + 1
+        numeric = np.column_stack([
+            pd.to_numeric(parts[column], errors="coerce").to_numpy(dtype="float64")
+            for column in parts.columns[:3]
+        ])
+        if numeric.shape[1] < 3:
+            numeric = np.pad(numeric, ((0, 0), (0, 3 - numeric.shape[1])), constant_values=np.nan)
+        # More than three parts stays NaN
+        values = np.where(part_count == 1, numeric[:, 0], values)
+        values = np.where(part_count == 2, numeric[:, 0] * 60 + numeric[:, 1], values)
+        values = np.where(part_count == 3, (numeric[:, 0] * 60 + numeric[:, 1]) * 60 + numeric[:, 2], values)
+        # Same rounding as the scraper's time_seconds, so both sources give equal values
+        values = np.round(values, 3)
+
+    # Append NaN so the missing-value code -1 selects it
+    seconds = np.append(values, np.nan)[codes]
+    bad = ~empty & np.isnan(values)
+    bad_rows = bad[codes] & (codes >= 0)
+    return TimeParseResult(
+        seconds=seconds,
+        missing=int((codes < 0).sum() + empty[codes][codes >= 0].sum()),
+        unparseable=int(bad_rows.sum()),
+        examples=[str(value) for value in uniques[bad][:5]],
+    )
+
+
+def times_to_seconds(times: Sequence) -> np.ndarray:
+    """
+    Convert a column of result times to seconds, see :func:`parse_times`.
+
+    Returns:
+        ``float64`` array of seconds, NaN where a time is missing or unparseable
+    """
+    return parse_times(times).seconds
+
+
+def iter_participant_rows(competitions_data: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Yield one flat row per participant and search.
+
+    Row-by-row counterpart of :func:`create_participants_dataframe` for
+    consumers that stream rows; values are untyped as stored by the scraper,
+    with times converted to seconds.
+
+    Args:
+        competitions_data: Competition dictionaries as saved by the scraper
+
+    Yields:
+        Dictionaries with the keys in ``PARTICIPANT_COLUMNS``
+    """
+    for comp in competitions_data:
+        comp_fields = {column: comp.get(key, '') for column, key in COMPETITION_FIELDS.items()}
+
+        for result_set in comp.get('resultat', []):
+            judges = result_set.get('domare', [])
+            set_fields = {
+                'typ_av_sök': result_set.get('sök', ''),
+                'domare': ', '.join(judges) if judges else '',
+            }
+
+            for participant in result_set.get('tabell', []):
+                row = {**comp_fields, **set_fields}
+                for column, key in PARTICIPANT_FIELDS.items():
+                    row[column] = participant.get(key, '')
+                row['tid'] = convert_time_to_seconds(row['tid'])
+                yield row
+
+
+def build_participant_columns(competitions_data: Iterable[Dict]) -> Dict[str, List]:
+    """
+    Collect the raw values of every output column.
+
+    Args:
+        competitions_data: Competition dictionaries as saved by the scraper
+
+    Returns:
+        Dictionary of equally long lists keyed by ``PARTICIPANT_COLUMNS`` plus
+        ``time_seconds`` (as stored by the scraper, if it did); missing
+        participant values are None, times are still strings
+    """
+    columns: Dict[str, List] = {column: [] for column in PARTICIPANT_COLUMNS}
+    time_seconds: List[Optional[float]] = []
+    for comp in competitions_data:
+        comp_values = [(columns[column], comp.get(key, '')) for column, key in COMPETITION_FIELDS.items()]
+
+        for result_set in comp.get('resultat', []):
+            table = result_set.get('tabell', [])
+            if not table:
+                continue
+            count = len(table)
+            judges = result_set.get('domare', [])
+
+            for values, value in comp_values:
+                values.extend([value] * count)
+            columns['typ_av_sök'].extend([result_set.get('sök', '')] * count)
+            columns['domare'].extend([', '.join(judges) if judges else ''] * count)
+            for column, key in PARTICIPANT_FIELDS.items():
+                columns[column].extend([participant.get(key) for participant in table])
+            time_seconds.extend([participant.get('time_seconds') for participant in table])
+    columns['time_seconds'] = time_seconds
+    return columns
+
+
+def _to_integers(values: List) -> pd.api.extensions.ExtensionArray:
+    try:
+        return pd.array(values, dtype=INTEGER_DTYPE)
+    except (TypeError, ValueError):
+        # Older files may hold numbers as strings; anything non-numeric becomes null
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype(INTEGER_DTYPE).array
+
+
+def _tid_column(times: List, stored_seconds: List[Optional[float]]) -> np.ndarray:
+    seconds = np.array(stored_seconds, dtype="float64")
+    # Files written with STORE_TIME_SECONDS need no parsing at all
+    unparsed = np.isnan(seconds)
+    if unparsed.any():
+        result = parse_times([time for time, todo in zip(times, unparsed) if todo])
+        seconds[unparsed] = result.seconds
+        if result.unparseable:
+            logger.warning(
+                f"{result.unparseable} of {len(times)} result times could not be parsed "
+                f"and are NaN, e.g. {result.examples}"
+            )
+    return seconds
+
+
+def create_participants_dataframe(competitions_data: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Flatten competitions into a participants DataFrame.
+
+    Args:
+        competitions_data: Competition dictionaries as saved by the scraper
+
+    Returns:
+        DataFrame with the columns in ``PARTICIPANT_COLUMNS``, typed as
+        described in the module docstring
+    """
+    columns = build_participant_columns(competitions_data)
+    data = {}
+    for column in PARTICIPANT_COLUMNS:
+        values = columns[column]
+        if column in INTEGER_COLUMNS:
+            data[column] = _to_integers(values)
+        elif column == "tid":
+            data[column] = _tid_column(values, columns["time_seconds"])
+        else:
+            text = pd.Series(values, dtype=object).fillna('')
+            data[column] = text.astype("category" if column in CATEGORY_COLUMNS else str)
+    return pd.DataFrame(data, columns=PARTICIPANT_COLUMNS)
+
+
+def optimize_dtypes(participants: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give a participants frame from another source (e.g. Parquet) the compact types.
+
+    Columns not in ``PARTICIPANT_COLUMNS`` are left alone.
+
+    Args:
+        participants: Frame with some or all of the participant columns
+
+    Returns:
+        The same frame, converted in place
+    """
+    for column in participants.columns:
+        if column in CATEGORY_COLUMNS:
+            participants[column] = participants[column].fillna('').astype(str).astype("category")
+        elif column in INTEGER_COLUMNS:
+            participants[column] = participants[column].astype(INTEGER_DTYPE)
+        elif column == "tid":
+            participants[column] = participants[column].astype("float64")
+    return participants
+
+
+def concat_participant_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate participant frames, keeping categorical columns categorical.
+
+    ``pd.concat`` turns categoricals with different categories into object
+    columns; here their categories are unioned (and sorted, as ``astype``
+    does) instead.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    data = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            data[column] = pd.Series(union_categoricals(parts, sort_categories=True))
+        else:
+            data[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(data, columns=frames[0].columns)
+
+
+def memory_report(frame: pd.DataFrame, baseline: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Memory usage per column, including the contents of strings.
+
+    Args:
+        frame: Frame to measure
+        baseline: Optional frame with the same columns to compare against,
+            e.g. the same data with object columns
+
+    Returns:
+        DataFrame indexed by column (plus a ``total`` row) with ``dtype``,
+        ``bytes`` and the number of ``distinct`` values, and with a baseline
+        ``baseline_bytes`` and ``ratio`` (baseline / bytes)
+    """
+    usage = frame.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype": frame.dtypes.astype(str),
+        "bytes": usage,
+        "distinct": frame.nunique(dropna=False),
+    })
+    report.loc["total"] = ["", int(usage.sum()), np.nan]
+    if baseline is not None:
+        baseline_usage = baseline.memory_usage(deep=True, index=False).reindex(frame.columns)
+        report["baseline_bytes"] = list(baseline_usage) + [baseline_usage.sum()]
+        report["ratio"] = report["baseline_bytes"] / report["bytes"]
+    return report
@@ -0,0 +1,131 @@
+"""
+Histogram Binning
+=================
+
+Computes histogram bars on the server, so the dashboard sends Plotly a few
+bars instead of every value to bin in the browser. The bins are chosen the
+way Plotly's automatic histogram binning chooses them for ``nbins``: a
+"nice" bin size (1, 2 or 5 times a power of ten) above ``range / nbins``,
+edges on multiples of it, shifted by half a unit for integer data so each
+integer sits inside a bin. The bars therefore look the same as with
+``px.histogram(..., nbins=nbins)``.
+
+Values can be given with counts (e.g. ``poäng`` -> count from the aggregate
+cube), which bins them as if each value were repeated ``count`` times.
+
+Usage:
+    bins = histogram_bins(points["poäng"], points["count"], nbins=10)
+    fig = histogram_figure(bins, title="Poängdistribution", label="Poäng", y_label="Antal Sök")
+"""
+
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+NICE_STEPS = [2, 5, 10]
+
+
+def _nice_size(rough_size: float) -> float:
+    """The next step of 2, 5 or 10 times a power of ten above ``rough_size``."""
+    base = 10 ** math.floor(math.log10(rough_size))
+    return base * next((step for step in NICE_STEPS if step > rough_size / base), NICE_STEPS[-1])
+
+
+def _shift_start(start: float, size: float, values: np.ndarray, counts: np.ndarray) -> float:
+    """Move the first edge off the data, as Plotly does, so values don't fall on bin edges."""
+    low, high = values.min(), values.max()
+
+    def near_edge(v):
+        return (1 + (v - start) * 100 / size) % 100 < 2
+
+    if np.all(values % 1 == 0):
+        if size < 1:
+            return low - 0.5 * size
+        start -= 0.5
+        return start + size if start + size < low else start
+    total = counts.sum()
+    if counts[near_edge(values + size / 2)].sum() < total * 0.1:
+        if counts[near_edge(values)].sum() > total * 0.3 or near_edge(low) or near_edge(high):
+            shift = size / 2
+            start += shift if start + shift < low else -shift
+    return start
+
+
+def histogram_bins(values: Sequence, counts: Optional[Sequence] = None, nbins: int = 10) -> pd.DataFrame:
+    """
+    Histogram of ``values`` (each weighted by ``counts``) with Plotly's automatic bins.
+
+    Args:
+        values: Numeric values; missing values are ignored
+        counts: How many times each value occurs, defaults to once
+        nbins: Maximum number of bins, as Plotly's ``nbins``
+
+    Returns:
+        One row per bin: ``start`` and ``end`` edges, ``center``, ``width``
+        and ``count``; empty without values
+    """
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    counts = np.ones(len(values)) if counts is None else np.asarray(counts, dtype="float64")
+    keep = ~np.isnan(values) & (counts > 0)
+    values, counts = values[keep], counts[keep]
+    if not len(values):
+        return pd.DataFrame({"start": [], "end": [], "center": [], "width": [], "count": []})
+
+    low, high = values.min(), values.max()
+    size = _nice_size((high - low) / nbins) if high > low else 1.0
+    # First edge from a slightly widened range, then one bin further down before shifting
+    start = math.ceil((low - (high - low) * 1e-4) / size) * size - size
+    start = _shift_start(start, size, values, counts)
+    bin_count = 1 + int((high - start) // size)
+    edges = start + size * np.arange(bin_count + 1)
+    # Bins include their start edge, the last one also its end edge
+    bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bin_count - 1)
+    totals = np.bincount(bins, weights=counts, minlength=bin_count).astype("int64")
+    # Empty bins at either end are left out, as Plotly does
+    filled = np.flatnonzero(totals)
+    kept = slice(filled[0], filled[-1] + 1)
+    return pd.DataFrame({
+        "start": edges[:-1][kept],
+        "end": edges[1:][kept],
+        "center": edges[:-1][kept] + size / 2,
+        "width": size,
+        "count": totals[kept],
+    })
+
+
+def histogram_figure(bins: pd.DataFrame, title: str, label: str, y_label: str = "count"):
+    """
+    Plotly bar chart of :func:`histogram_bins` drawn like a ``px.histogram``.
+
+    The bars are labelled by the whole numbers they hold (e.g. ``0-19``),
+    which fits integer data such as ``poäng`` and ``fel``.
+
+    Args:
+        bins: Bins from :func:`histogram_bins`
+        title: Chart title
+        label: x axis title
+        y_label: y axis title
+
+    Returns:
+        ``plotly.graph_objects.Figure``
+    """
+    # Only figures need plotly; the binning works without it
+    try:
+        import plotly.graph_objects as go
+    except ImportError:
+        raise ImportError("plotly is required for histogram figures: pip install nw_stats[dashboard]")
+    lows = np.ceil(bins["start"].to_numpy()).astype(int)
+    highs = np.ceil(bins["end"].to_numpy()).astype(int) - 1
+    ranges = [f"{low}" if low == high else f"{low}-{high}" for low, high in zip(lows, highs)]
+    fig = go.Figure(go.Bar(
+        x=bins["center"],
+        y=bins["count"],
+        width=bins["width"],
+        customdata=ranges,
+        hovertemplate=f"{label}=%{{customdata}}<br>{y_label}=%{{y}}<extra></extra>",
+    ))
+    # Histogram bars touch
+    fig.update_layout(title=title, xaxis_title=label, yaxis_title=y_label, bargap=0)
+    return fig
@@ -0,0 +1,313 @@
+"""
+Partitioned Participants Dataset
+================================
+
+Flattened participant rows stored as Parquet, partitioned by competition year,
+class and type (``year=2025/klass=NW3/typ=TSM/``). Readers ask only for the
+columns and partitions they need, so looking at one class in one year reads a
+small fraction of the data and skips flattening the JSON entirely.
+
+Every row also stores its ``competition_id`` (the ``arr=`` id, as in the
+compacted dataset and the result store). Writing a competition that is
+already in the dataset replaces its rows, so re-adding results (a resumed
+scraper run, ``build`` over files already added) never duplicates starts.
+
+Requires the optional ``pyarrow`` dependency (``pip install nw_stats[parquet]``).
+
+Usage:
+    python -m nw_stats.data.parquet_store build                 # from data/snwk_competition_results_*.json
+    python -m nw_stats.data.parquet_store build results.json --overwrite
+"""
+
+import argparse
+import glob
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Union
+
+import numpy as np
+import pandas as pd
+
+from nw_stats.config import ProjectPaths
+from nw_stats.data.flatten import (
+    INTEGER_COLUMNS, PARTICIPANT_COLUMNS, create_participants_dataframe, optimize_dtypes,
+)
+from nw_stats.data.results_stream import iter_competition_batches, iter_competitions
+from nw_stats.data_collection.competition_index import extract_competition_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pc = None
+    ds = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET_DIR = ProjectPaths.PARTICIPANTS_DATASET
+PARTITION_COLUMNS = ["year", "klass", "typ"]
+FLOAT_COLUMNS = ["tid"]
+KEY_COLUMN = "competition_id"
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet dataset: pip install nw_stats[parquet]")
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+def _schema() -> "pa.Schema":
+    fields = []
+    for column in PARTICIPANT_COLUMNS:
+        if column in INTEGER_COLUMNS:
+            fields.append((column, pa.int32()))
+        elif column in FLOAT_COLUMNS:
+            fields.append((column, pa.float64()))
+        else:
+            fields.append((column, pa.string()))
+    fields.append((KEY_COLUMN, pa.string()))
+    fields.append(("year", pa.int16()))
+    return pa.schema(fields)
+
+
+def _partitioning() -> "ds.Partitioning":
+    return ds.partitioning(
+        pa.schema([("year", pa.int16()), ("klass", pa.string()), ("typ", pa.string())]),
+        flavor="hive",
+    )
+
+
+def to_dataset_frame(participants: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give a flattened participants frame the dataset's column types.
+
+    Numeric columns become nullable integers/floats (empty strings become
+    null) and the partition column ``year`` is derived from ``datum``.
+    """
+    frame = participants.copy()
+    for column in INTEGER_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int32")
+    for column in FLOAT_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+    for column in PARTICIPANT_COLUMNS:
+        if column not in INTEGER_COLUMNS and column not in FLOAT_COLUMNS:
+            frame[column] = frame[column].fillna("").astype(str)
+    frame["year"] = pd.to_numeric(frame["datum"].str[:4], errors="coerce").fillna(0).astype("int16")
+    # Missing partition values are stored as null (hive default partition)
+    for column in ("klass", "typ"):
+        frame[column] = frame[column].replace("", None)
+    return frame
+
+
+def _competition_key(competition: Dict) -> Optional[str]:
+    url = competition.get("url", "")
+    return extract_competition_id(url) or url or None
+
+
+def _remove_competitions(dataset_dir: Path, keys: Set[str], keep_prefix: str) -> int:
+    """
+    Remove the rows of competitions ``keys`` from every file not named ``keep_prefix*``.
+
+    Returns:
+        Number of rows removed
+    """
+    if not keys:
+        return 0
+    removed = 0
+    value_set = pa.array(sorted(keys), type=pa.string())
+    for path in sorted(Path(dataset_dir).rglob("*.parquet")):
+        if path.name.startswith(keep_prefix):
+            continue
+        if KEY_COLUMN not in pq.read_schema(path).names:
+            logger.warning(f"{path} has no {KEY_COLUMN} column and cannot be deduplicated; "
+                           f"rebuild the dataset with build --overwrite")
+            continue
+        # Only the key column is read to find the files to rewrite
+        matches = pc.is_in(pq.read_table(path, columns=[KEY_COLUMN])[KEY_COLUMN], value_set=value_set)
+        matched = pc.sum(matches).as_py() or 0
+        if not matched:
+            continue
+        removed += matched
+        table = pq.read_table(path)
+        if matched == len(table):
+            path.unlink()
+            continue
+        kept = table.filter(pc.invert(pc.is_in(table[KEY_COLUMN], value_set=value_set)))
+        tmp_path = path.with_name(path.name + ".tmp")
+        pq.write_table(kept, tmp_path)
+        os.replace(tmp_path, path)
+    return removed
+
+
+def write_participants(competitions_data: Iterable[Dict], dataset_dir: Path = DEFAULT_DATASET_DIR) -> int:
+    """
+    Flatten competitions and add them to the dataset, replacing earlier rows of the same competitions.
+
+    The new rows go to new files in the affected partitions. Afterwards the
+    rows of the same competitions are removed from older files, so it is safe
+    to call with results that were added before. The competitions are
+    flattened and written in chunks, so a stream from
+    :func:`iter_competitions` is never loaded whole; a competition repeated
+    within one call is written once.
+
+    Args:
+        competitions_data: Competition dictionaries as saved by the scraper
+        dataset_dir: Root directory of the dataset
+
+    Returns:
+        Number of participant rows written
+    """
+    _require_pyarrow()
+    schema = _schema()
+    prefix = f"part-{uuid.uuid4().hex[:12]}-"
+    written: Set[str] = set()
+    rows = 0
+
+    def record_batches():
+        nonlocal rows
+        for batch in iter_competition_batches(competitions_data):
+            competitions, keys = [], []
+            for competition in batch:
+                key = _competition_key(competition)
+                if key is not None and key in written:
+                    continue
+                written.add(key)
+                competitions.append(competition)
+                keys.append(key)
+            frame = create_participants_dataframe(competitions)
+            if frame.empty:
+                continue
+            counts = [
+                sum(len(result_set.get("tabell", [])) for result_set in competition.get("resultat", []))
+                for competition in competitions
+            ]
+            frame = to_dataset_frame(frame)
+            frame[KEY_COLUMN] = np.repeat(np.array(keys, dtype=object), counts)
+            rows += len(frame)
+            yield pa.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False)
+
+    ds.write_dataset(
+        record_batches(),
+        str(dataset_dir),
+        schema=schema,
+        format="parquet",
+        partitioning=_partitioning(),
+        basename_template=prefix + "{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    replaced = _remove_competitions(dataset_dir, written - {None}, prefix)
+    if replaced:
+        logger.info(f"Replaced {replaced} earlier participant rows of re-added competitions in {dataset_dir}")
+    return rows
+
+
+def _filter(years: Optional[Sequence[int]], klass: Optional[Sequence[str]], typ: Optional[Sequence[str]]):
+    expression = None
+    for column, values in (("year", years), ("klass", klass), ("typ", typ)):
+        if values is None:
+            continue
+        if isinstance(values, (str, int)):
+            values = [values]
+        condition = ds.field(column).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_participants(
+    columns: Optional[List[str]] = None,
+    years: Union[None, int, Sequence[int]] = None,
+    klass: Union[None, str, Sequence[str]] = None,
+    typ: Union[None, str, Sequence[str]] = None,
+    dataset_dir: Path = DEFAULT_DATASET_DIR,
+) -> pd.DataFrame:
+    """
+    Read participant rows from the dataset.
+
+    Only the requested columns are read, and partitions excluded by
+    ``years``/``klass``/``typ`` are never opened.
+
+    Args:
+        columns: Columns to return, defaults to ``PARTICIPANT_COLUMNS``
+        years: Competition year(s) to include
+        klass: Class(es) to include, e.g. ``"NW3"``
+        typ: Competition type(s) to include, e.g. ``"TSM"``
+        dataset_dir: Root directory of the dataset
+
+    Returns:
+        DataFrame with the requested columns, typed like
+        :func:`nw_stats.data.flatten.create_participants_dataframe`
+    """
+    _require_pyarrow()
+    # The full schema lets files written before competition_id existed be read too
+    dataset = ds.dataset(str(dataset_dir), schema=_schema(), format="parquet", partitioning=_partitioning())
+    table = dataset.to_table(
+        columns=list(columns) if columns is not None else PARTICIPANT_COLUMNS,
+        filter=_filter(years, klass, typ),
+    )
+    return optimize_dtypes(table.to_pandas())
+
+
+def dataset_exists(dataset_dir: Path = DEFAULT_DATASET_DIR) -> bool:
+    return Path(dataset_dir).is_dir() and any(Path(dataset_dir).rglob("*.parquet"))
+
+
+def dataset_is_keyed(dataset_dir: Path = DEFAULT_DATASET_DIR) -> bool:
+    """Whether every file of the dataset has the ``competition_id`` column that re-adding replaces by."""
+    _require_pyarrow()
+    return all(KEY_COLUMN in pq.read_schema(path).names for path in Path(dataset_dir).rglob("*.parquet"))
+
+
+def build_dataset(result_files: List[Path], dataset_dir: Path = DEFAULT_DATASET_DIR,
+                  overwrite: bool = False) -> int:
+    """
+    Build the dataset from scraper results files.
+
+    Args:
+        result_files: ``snwk_competition_results_*.json`` files
+        dataset_dir: Root directory of the dataset
+        overwrite: Remove an existing dataset first
+
+    Returns:
+        Number of participant rows written
+    """
+    _require_pyarrow()
+    if overwrite and Path(dataset_dir).exists():
+        shutil.rmtree(dataset_dir)
+    total = 0
+    for result_file in result_files:
+        rows = write_participants(iter_competitions(result_file), dataset_dir)
+        logger.info(f"Added {rows} participant rows from {result_file}")
+        total += rows
+    return total
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintain the partitioned Parquet participants dataset.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="add results files to the dataset")
+    build.add_argument("files", type=Path, nargs="*",
+                       help="results files (default: data/snwk_competition_results_*.json)")
+    build.add_argument("--dataset", type=Path, default=DEFAULT_DATASET_DIR)
+    build.add_argument("--overwrite", action="store_true", help="replace the existing dataset")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    files = args.files or [
+        Path(path) for path in sorted(glob.glob(str(ProjectPaths.DATA / "snwk_competition_results_*.json")))
+    ]
+    rows = build_dataset(files, args.dataset, overwrite=args.overwrite)
+    logger.info(f"Wrote {rows} participant rows to {args.dataset}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Result Store
+============
+
+Embedded SQLite database of all competition results, normalised into
+competitions, result sets (one per search), judges and participants, with
+indexes on dog, handler, judge, date and class. Lookups such as "every start
+of a dog" or "average points per search type for one judge" are answered by
+an indexed query instead of loading and scanning the whole dataset.
+
+The scraper adds new results after every run. Adding a competition that is
+already stored (same ``arr=`` id) replaces it, so files can be re-added safely.
+
+Usage:
+    python -m nw_stats.data.result_store build                  # from data/snwk_competition_results_*.json
+    python -m nw_stats.data.result_store build results.json --overwrite
+    python -m nw_stats.data.result_store summary --group-by search --judge "Maria Dahlén"
+"""
+
+import argparse
+import glob
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from nw_stats.config import ProjectPaths
+from nw_stats.data.flatten import INTEGER_COLUMNS, PARTICIPANT_COLUMNS, optimize_dtypes
+from nw_stats.data.results_stream import iter_competitions
+from nw_stats.data_collection.competition_index import extract_competition_id
+from nw_stats.data_collection.parsers import parse_time_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = ProjectPaths.RESULT_STORE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS competitions (
+    id INTEGER PRIMARY KEY,
+    arr TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    datum TEXT,
+    year INTEGER,
+    plats TEXT,
+    typ TEXT,
+    klass TEXT,
+    arrangor TEXT,
+    anordnare TEXT
+);
+CREATE TABLE IF NOT EXISTS result_sets (
+    id INTEGER PRIMARY KEY,
+    competition_id INTEGER NOT NULL REFERENCES competitions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    search_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS result_set_judges (
+    result_set_id INTEGER NOT NULL REFERENCES result_sets (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    judge TEXT NOT NULL,
+    PRIMARY KEY (result_set_id, position)
+);
+CREATE TABLE IF NOT EXISTS participants (
+    id INTEGER PRIMARY KEY,
+    result_set_id INTEGER NOT NULL REFERENCES result_sets (id) ON DELETE CASCADE,
+    placement INTEGER,
+    start_number INTEGER,
+    points INTEGER,
+    faults INTEGER,
+    time TEXT,
+    time_seconds REAL,
+    handler TEXT,
+    dog_call_name TEXT,
+    dog_full_name TEXT,
+    dog_breed TEXT
+);
+CREATE INDEX IF NOT EXISTS competitions_datum ON competitions (datum);
+CREATE INDEX IF NOT EXISTS competitions_klass ON competitions (klass, typ);
+CREATE INDEX IF NOT EXISTS result_sets_competition ON result_sets (competition_id);
+CREATE INDEX IF NOT EXISTS result_set_judges_judge ON result_set_judges (judge);
+CREATE INDEX IF NOT EXISTS participants_result_set ON participants (result_set_id);
+CREATE INDEX IF NOT EXISTS participants_dog ON participants (dog_full_name);
+CREATE INDEX IF NOT EXISTS participants_handler ON participants (handler);
+"""
+
+# Filter keyword -> column; every filter accepts one value or a sequence of values
+FILTER_COLUMNS = {
+    "dog": "p.dog_full_name",
+    "dog_name": "p.dog_call_name",
+    "handler": "p.handler",
+    "breed": "p.dog_breed",
+    "klass": "c.klass",
+    "typ": "c.typ",
+    "plats": "c.plats",
+    "year": "c.year",
+    "search": "rs.search_type",
+}
+
+# summary() group_by -> column
+GROUP_COLUMNS = {
+    **FILTER_COLUMNS,
+    "judge": "j.judge",
+    "datum": "c.datum",
+}
+
+FilterValue = Union[None, str, int, Sequence[Union[str, int]]]
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _time_seconds(participant: Dict) -> Optional[float]:
+    if "time_seconds" in participant:
+        return participant["time_seconds"]
+    time_value = participant.get("time")
+    return parse_time_seconds(time_value) if time_value else None
+
+
+class ResultStore:
+    """
+    SQLite store of competition results with a small query API.
+
+    Args:
+        path: Database file; created with its schema if missing
+    """
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of stored competitions."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM competitions").fetchone()[0]
+
+    def add_competitions(self, competitions: Iterable[Dict]) -> int:
+        """
+        Add or replace competitions, in one transaction.
+
+        Args:
+            competitions: Competition dictionaries as saved by the scraper
+
+        Returns:
+            Number of participant rows written
+        """
+        rows = 0
+        with self._lock, self._db:
+            for competition in competitions:
+                rows += self._add_competition(competition)
+        return rows
+
+    def _add_competition(self, competition: Dict) -> int:
+        url = competition.get("url", "")
+        arr = extract_competition_id(url) or url
+        datum = competition.get("datum") or None
+        # Replacing cascades to the competition's result sets, judges and participants
+        self._db.execute("DELETE FROM competitions WHERE arr = ?", (arr,))
+        competition_id = self._db.execute(
+            "INSERT INTO competitions (arr, url, datum, year, plats, typ, klass, arrangor, anordnare) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                arr, url, datum, _int_or_none(datum[:4]) if datum else None,
+                competition.get("plats"), competition.get("typ"), competition.get("klass"),
+                competition.get("arrangör"), competition.get("anordnare"),
+            ),
+        ).lastrowid
+
+        rows = 0
+        for position, result_set in enumerate(competition.get("resultat", [])):
+            result_set_id = self._db.execute(
+                "INSERT INTO result_sets (competition_id, position, search_type) VALUES (?, ?, ?)",
+                (competition_id, position, result_set.get("sök", "")),
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO result_set_judges (result_set_id, position, judge) VALUES (?, ?, ?)",
+                [(result_set_id, i, judge) for i, judge in enumerate(result_set.get("domare", []))],
+            )
+            table = result_set.get("tabell", [])
+            self._db.executemany(
+                "INSERT INTO participants (result_set_id, placement, start_number, points, faults, time, "
+                "time_seconds, handler, dog_call_name, dog_full_name, dog_breed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        result_set_id,
+                        _int_or_none(participant.get("placement")),
+                        _int_or_none(participant.get("start_number")),
+                        _int_or_none(participant.get("points")),
+                        _int_or_none(participant.get("faults")),
+                        participant.get("time"),
+                        _time_seconds(participant),
+                        participant.get("handler"),
+                        participant.get("dog_call_name"),
+                        participant.get("dog_full_name"),
+                        participant.get("dog_breed"),
+                    )
+                    for participant in table
+                ],
+            )
+            rows += len(table)
+        return rows
+
+    @staticmethod
+    def _where(filters: Dict[str, FilterValue], judge: FilterValue, date_from: Optional[str],
+               date_to: Optional[str]) -> Tuple[str, List]:
+        conditions = []
+        params: List = []
+        for name, value in filters.items():
+            if name not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown filter {name!r}, expected one of {sorted(FILTER_COLUMNS)}")
+            if value is None:
+                continue
+            values = [value] if isinstance(value, (str, int)) else list(value)
+            conditions.append(f"{FILTER_COLUMNS[name]} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if judge is not None:
+            judges = [judge] if isinstance(judge, str) else list(judge)
+            conditions.append(
+                "EXISTS (SELECT 1 FROM result_set_judges jf WHERE jf.result_set_id = rs.id "
+                f"AND jf.judge IN ({', '.join('?' * len(judges))}))"
+            )
+            params.extend(judges)
+        if date_from is not None:
+            conditions.append("c.datum >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("c.datum <= ?")
+            params.append(date_to)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def participants(self, judge: FilterValue = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, limit: Optional[int] = None,
+                     **filters: FilterValue) -> pd.DataFrame:
+        """
+        Participant rows matching the filters, newest first.
+
+        Args:
+            judge: Judge name(s); matches result sets judged by any of them
+            date_from: First competition date (``YYYY-MM-DD``), inclusive
+            date_to: Last competition date, inclusive
+            limit: Maximum number of rows
+            **filters: Column filters, see ``FILTER_COLUMNS``, e.g. ``dog="..."``
+                or ``klass=["NW2", "NW3"]``
+
+        Returns:
+            DataFrame with the columns and types of
+            :func:`nw_stats.data.flatten.create_participants_dataframe`
+        """
+        where, params = self._where(filters, judge, date_from, date_to)
+        query = f"""
+            SELECT
+                c.klass, c.datum, c.plats, c.typ, c.arrangor, c.anordnare, rs.search_type,
+                (SELECT group_concat(judge, ', ') FROM
+                    (SELECT judge FROM result_set_judges WHERE result_set_id = rs.id ORDER BY position)),
+                p.handler, p.dog_call_name, p.dog_full_name, p.dog_breed, p.start_number,
+                p.placement, p.points, p.faults, p.time_seconds
+            FROM participants p
+            JOIN result_sets rs ON rs.id = p.result_set_id
+            JOIN competitions c ON c.id = rs.competition_id
+            {where}
+            ORDER BY c.datum DESC, c.id, rs.position, p.id
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        frame = pd.DataFrame([tuple(row) for row in rows], columns=PARTICIPANT_COLUMNS)
+        for column in PARTICIPANT_COLUMNS:
+            if column not in INTEGER_COLUMNS and column != "tid":
+                frame[column] = frame[column].fillna("")
+        return optimize_dtypes(frame)
+
+    def summary(self, group_by: str, judge: FilterValue = None, date_from: Optional[str] = None,
+                date_to: Optional[str] = None, min_starts: int = 1,
+                **filters: FilterValue) -> pd.DataFrame:
+        """
+        Aggregate participant results per group.
+
+        Args:
+            group_by: Grouping key, see ``GROUP_COLUMNS`` (e.g. ``"search"``,
+                ``"judge"``, ``"dog"``, ``"year"``)
+            judge: Judge name(s) to filter on
+            date_from: First competition date, inclusive
+            date_to: Last competition date, inclusive
+            min_starts: Leave out groups with fewer starts
+            **filters: Column filters as for :meth:`participants`
+
+        Returns:
+            DataFrame with the group, ``starts``, ``mean_points``,
+            ``mean_faults``, ``mean_time`` and ``best_placement``, ordered by
+            number of starts
+        """
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Unknown group_by {group_by!r}, expected one of {sorted(GROUP_COLUMNS)}")
+        where, params = self._where(filters, judge, date_from, date_to)
+        judge_join = "JOIN result_set_judges j ON j.result_set_id = rs.id" if group_by == "judge" else ""
+        query = f"""
+            SELECT {GROUP_COLUMNS[group_by]} AS "{group_by}", COUNT(*) AS starts,
+                   AVG(p.points) AS mean_points, AVG(p.faults) AS mean_faults,
+                   AVG(p.time_seconds) AS mean_time, MIN(p.placement) AS best_placement
+            FROM participants p
+            JOIN result_sets rs ON rs.id = p.result_set_id
+            JOIN competitions c ON c.id = rs.competition_id
+            {judge_join}
+            {where}
+            GROUP BY 1
+            HAVING COUNT(*) >= ?
+            ORDER BY starts DESC, 1
+        """
+        with self._lock:
+            rows = self._db.execute(query, params + [min_starts]).fetchall()
+        return pd.DataFrame(
+            [tuple(row) for row in rows],
+            columns=[group_by, "starts", "mean_points", "mean_faults", "mean_time", "best_placement"],
+        )
+
+    def competitions(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     **filters: FilterValue) -> pd.DataFrame:
+        """
+        Stored competitions matching competition-level filters (``klass``, ``typ``, ``plats``, ``year``).
+
+        Returns:
+            DataFrame with one row per competition, newest first
+        """
+        where, params = self._where(filters, None, date_from, date_to)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT c.arr, c.url, c.datum, c.plats, c.typ, c.klass, c.arrangor AS \"arrangör\", "
+                f"c.anordnare FROM competitions c{where} ORDER BY c.datum DESC, c.arr",
+                params,
+            ).fetchall()
+        columns = ["arr", "url", "datum", "plats", "typ", "klass", "arrangör", "anordnare"]
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+    def competition_ids(self) -> List[str]:
+        """``arr`` ids of every stored competition."""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT arr FROM competitions")]
+
+
+def build_store(result_files: List[Path], store_path: Path = DEFAULT_STORE_PATH,
+                overwrite: bool = False) -> int:
+    """
+    Add scraper results files to the store.
+
+    Args:
+        result_files: ``snwk_competition_results_*.json`` files
+        store_path: Database file
+        overwrite: Delete an existing database first
+
+    Returns:
+        Number of participant rows written
+    """
+    if overwrite:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{store_path}{suffix}").unlink(missing_ok=True)
+    total = 0
+    with ResultStore(store_path) as store:
+        for result_file in result_files:
+            rows = store.add_competitions(iter_competitions(result_file))
+            logger.info(f"Added {rows} participant rows from {result_file}")
+            total += rows
+    return total
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintain and query the SQLite result store.")
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="add results files to the store")
+    build.add_argument("files", type=Path, nargs="*",
+                       help="results files (default: data/snwk_competition_results_*.json)")
+    build.add_argument("--overwrite", action="store_true", help="replace the existing store")
+    summary = subparsers.add_parser("summary", help="aggregate results per group")
+    summary.add_argument("--group-by", default="search", choices=sorted(GROUP_COLUMNS))
+    summary.add_argument("--judge")
+    summary.add_argument("--min-starts", type=int, default=1)
+    for name in FILTER_COLUMNS:
+        summary.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "build":
+        files = args.files or [
+            Path(path) for path in sorted(glob.glob(str(ProjectPaths.DATA / "snwk_competition_results_*.json")))
+        ]
+        rows = build_store(files, args.store, overwrite=args.overwrite)
+        logger.info(f"Wrote {rows} participant rows to {args.store}")
+    else:
+        filters = {name: getattr(args, name) for name in FILTER_COLUMNS}
+        if filters["year"] is not None:
+            filters["year"] = int(filters["year"])
+        with ResultStore(args.store) as store:
+            result = store.summary(args.group_by, judge=args.judge, min_starts=args.min_starts, **filters)
+        with pd.option_context("display.max_rows", None, "display.width", 120):
+            print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
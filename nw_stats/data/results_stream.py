@@ -0,0 +1,173 @@
+"""
+Streaming Results Reader
+========================
+
+Reads competition results files one competition at a time instead of loading
+the whole nested structure with ``json.load``. Both formats the project
+writes are accepted and detected from the first character:
+
+- JSON arrays (``snwk_competition_results_*.json``, written by the scraper)
+- JSONL, one competition per line (e.g. the scrape journal)
+
+Participant DataFrames are built from the stream in chunks of competitions,
+so the nested JSON is never held in memory all at once and peak memory stays
+close to the size of the final frame.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Union
+
+import pandas as pd
+
+from nw_stats.data.flatten import concat_participant_frames, create_participants_dataframe, iter_participant_rows
+
+Source = Union[str, Path, IO[str]]
+
+READ_CHUNK_CHARS = 1 << 20
+DEFAULT_CHUNK_ROWS = 5_000
+
+# Whitespace, and in an array the separating commas
+_WHITESPACE_RE = re.compile(r"\s*")
+_ARRAY_GAP_RE = re.compile(r"[\s,]*")
+
+
+def _iter_json_values(f: IO[str], chunk_chars: int) -> Iterator:
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_chars)
+    pos = _WHITESPACE_RE.match(buffer).end()
+    in_array = buffer[pos:pos + 1] == "["
+    if in_array:
+        pos += 1
+    gap_re = _ARRAY_GAP_RE if in_array else _WHITESPACE_RE
+    eof = False
+
+    while True:
+        pos = gap_re.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                if in_array:
+                    raise ValueError("Unterminated JSON array")
+                return
+            buffer = f.read(chunk_chars)
+            pos = 0
+            eof = not buffer
+            continue
+        if in_array and buffer[pos] == "]":
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The value continues past the buffer; read at least as much again
+            more = f.read(max(chunk_chars, len(buffer) - pos))
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield value
+        pos = end
+        if pos > chunk_chars:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def iter_competitions(source: Source, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[Dict]:
+    """
+    Yield competitions from a JSON array or JSONL results file.
+
+    Args:
+        source: Path of the results file, or an open text file
+        chunk_chars: Characters read at a time
+
+    Yields:
+        Competition dictionaries, in file order
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from _iter_json_values(f, chunk_chars)
+    else:
+        yield from _iter_json_values(source, chunk_chars)
+
+
+def iter_rows(source: Source) -> Iterator[Dict]:
+    """
+    Yield flat participant rows from a results file, see :func:`iter_participant_rows`.
+
+    Args:
+        source: Path of the results file, or an open text file
+    """
+    return iter_participant_rows(iter_competitions(source))
+
+
+def iter_competition_batches(competitions: Iterable[Dict],
+                             chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[Dict]]:
+    """
+    Group competitions into batches of roughly ``chunk_rows`` participant rows.
+
+    Args:
+        competitions: Competition dictionaries
+        chunk_rows: Participant rows per batch; a batch holds at least one competition
+
+    Yields:
+        Lists of competitions
+    """
+    batch: List[Dict] = []
+    rows = 0
+    for competition in competitions:
+        batch.append(competition)
+        rows += sum(len(result_set.get("tabell", [])) for result_set in competition.get("resultat", []))
+        if rows >= chunk_rows:
+            yield batch
+            batch = []
+            rows = 0
+    if batch:
+        yield batch
+
+
+def iter_participant_frames(competitions: Iterable[Dict],
+                            chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Flatten a stream of competitions into participant DataFrames of about ``chunk_rows`` rows.
+
+    Args:
+        competitions: Competition dictionaries, e.g. from :func:`iter_competitions`
+        chunk_rows: Participant rows per frame
+    """
+    for batch in iter_competition_batches(competitions, chunk_rows):
+        yield create_participants_dataframe(batch)
+
+
+def participants_from_competitions(competitions: Iterable[Dict],
+                                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Build the participants DataFrame of a competition stream in chunks.
+
+    Args:
+        competitions: Competition dictionaries, e.g. from :func:`iter_competitions`
+        chunk_rows: Participant rows flattened at a time
+
+    Returns:
+        DataFrame equal to ``create_participants_dataframe(list(competitions))``
+    """
+    frames = list(iter_participant_frames(competitions, chunk_rows))
+    if not frames:
+        return create_participants_dataframe([])
+    return concat_participant_frames(frames)
+
+
+def load_participants(source: Source, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Build the participants DataFrame of a results file without loading it whole.
+
+    Args:
+        source: Path of the results file, or an open text file
+        chunk_rows: Participant rows flattened at a time
+
+    Returns:
+        DataFrame equal to ``create_participants_dataframe(json.load(...))``
+    """
+    return participants_from_competitions(iter_competitions(source), chunk_rows)
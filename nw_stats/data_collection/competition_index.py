@@ -0,0 +1,133 @@
+"""
+Collected Competition Index
+===========================
+
+Persistent index of the competition ids (the ``arr=`` URL parameter) that have
+already been collected. It is stored as a small sidecar JSON file next to the
+result files and updated every time results are saved, so finding new
+competitions is a set lookup and startup does not have to parse the whole
+dataset history.
+"""
+
+import glob
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from nw_stats.data.results_stream import iter_competitions
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "snwk_competition_index.json"
+RESULTS_GLOB = "snwk_competition_results_*.json"
+
+
+def extract_competition_id(url: str) -> Optional[str]:
+    """
+    Extract the competition identifier from a competition or result URL.
+
+    Args:
+        url: URL containing an ``arr=`` query parameter
+
+    Returns:
+        The ``arr`` value, or None if the URL has none
+    """
+    if "arr=" not in url:
+        return None
+    return url.split("arr=")[1].split("&")[0]
+
+
+class CompetitionIndex:
+    """
+    Maps collected competition ids to the results file they were saved in.
+
+    Args:
+        data_dir: Directory holding the result files and the index
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.path = self.data_dir / INDEX_FILENAME
+        self.competitions: Dict[str, str] = {}
+        self.indexed_files: Set[str] = set()
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "CompetitionIndex":
+        """
+        Load the index, scanning only result files it has not seen before.
+
+        On the first run this scans every existing results file once; later
+        runs only read files that were added outside of the scraper.
+        """
+        index = cls(data_dir)
+        if index.path.exists():
+            try:
+                with open(index.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                index.competitions = stored.get("competitions", {})
+                index.indexed_files = set(stored.get("indexed_files", []))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Could not read competition index {index.path}, rebuilding: {e}")
+
+        unindexed = [
+            Path(path) for path in sorted(glob.glob(str(index.data_dir / RESULTS_GLOB)))
+            if Path(path).name not in index.indexed_files
+        ]
+        for result_file in unindexed:
+            index._scan_results_file(result_file)
+        if unindexed:
+            logger.info(f"Indexed {len(unindexed)} result files not yet in {index.path.name}")
+            index.save()
+
+        logger.info(f"Found {len(index.competitions)} existing competitions in index")
+        return index
+
+    def _scan_results_file(self, result_file: Path) -> None:
+        # Streamed one competition at a time; only the URLs are kept
+        urls = []
+        try:
+            for result in iter_competitions(result_file):
+                if "url" in result:
+                    urls.append(result["url"])
+        except Exception as e:
+            logger.warning(f"Error reading existing results file {result_file}: {e}")
+            return
+        self.add(urls, result_file.name)
+
+    @property
+    def ids(self) -> Set[str]:
+        return set(self.competitions)
+
+    def __contains__(self, competition_id: str) -> bool:
+        return competition_id in self.competitions
+
+    def __len__(self) -> int:
+        return len(self.competitions)
+
+    def add(self, urls: Iterable[str], results_file: str) -> None:
+        """
+        Record competitions saved to ``results_file``.
+
+        Args:
+            urls: Result URLs of the saved competitions
+            results_file: Name of the results file they were written to
+        """
+        for url in urls:
+            competition_id = extract_competition_id(url)
+            if competition_id is not None:
+                self.competitions.setdefault(competition_id, results_file)
+        self.indexed_files.add(Path(results_file).name)
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        self.data_dir.mkdir(exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"competitions": self.competitions, "indexed_files": sorted(self.indexed_files)},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,84 @@
+"""
+Bounded Concurrent Execution
+============================
+
+Helpers for running I/O-bound scraper work on a bounded thread pool, and
+CPU-bound parsing on a process pool, while keeping results in input order so
+concurrent runs produce exactly the same output as the sequential path.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+S = TypeVar("S")
+
+
+def ordered_map(func: Callable[[T], R], items: Iterable[T], max_workers: int) -> Iterator[R]:
+    """
+    Apply ``func`` to every item using at most ``max_workers`` threads.
+
+    Unlike ``Executor.map`` only ``2 * max_workers`` items are in flight at any
+    time, so long inputs do not queue thousands of futures up front.
+
+    Args:
+        func: Function to call for each item
+        items: Input items
+        max_workers: Maximum number of concurrent calls; 1 runs sequentially
+
+    Yields:
+        Results in the same order as ``items``
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Deque = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def pipelined_map(fetch: Callable[[T], R], parse: Callable[[R], S], items: Iterable[T],
+                  fetch_workers: int, parse_workers: int, max_pending: int) -> Iterator[S]:
+    """
+    Two-stage pipeline: I/O-bound ``fetch`` on threads, CPU-bound ``parse`` on processes.
+
+    Fetching continues while earlier items are being parsed, and parsing runs
+    on all cores instead of sharing one with the network code. Memory stays
+    bounded: at most ``2 * fetch_workers`` items are being fetched and at most
+    ``max_pending`` fetched items wait for or are in parsing.
+
+    Args:
+        fetch: Function run on a thread pool for each item
+        parse: Picklable top-level function run on a process pool for each fetch result
+        items: Input items
+        fetch_workers: Number of fetch threads
+        parse_workers: Number of parse processes; 0 parses in the calling thread
+        max_pending: Maximum number of fetched items queued for parsing
+
+    Yields:
+        Parse results in the same order as ``items``
+    """
+    fetched = ordered_map(fetch, items, fetch_workers)
+    if parse_workers <= 0:
+        for payload in fetched:
+            yield parse(payload)
+        return
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        pending: Deque = deque()
+        for payload in fetched:
+            pending.append(executor.submit(parse, payload))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,270 @@
+"""
+Shared HTTP Client
+==================
+
+One pooled ``requests.Session`` used by every scraper request. It provides:
+
+- Connection pooling and keep-alive, so pages reuse TCP+TLS connections
+- Retries with exponential backoff and full jitter on 5xx, 429 and timeouts
+- Per-host rate limiting through a shared :class:`HostRateLimiter`, which
+  receives latency and status feedback so adaptive limiters can pace themselves
+- Per-request latency accounting, optionally broken down by scrape stage
+- Optional on-disk response caching with conditional revalidation
+- Optional archiving of every successful page for offline re-parsing
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nw_stats.data_collection.metrics import RunMetrics
+from nw_stats.data_collection.page_archive import PageArchive
+from nw_stats.data_collection.rate_limit import HostRateLimiter
+from nw_stats.data_collection.response_cache import ResponseCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class RequestStats:
+    """Thread-safe counters and latencies for all requests sent by a client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.latencies: List[float] = []
+
+    def record(self, latency: float, num_bytes: int = 0, failed: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += num_bytes
+            self.latencies.append(latency)
+            if failed:
+                self.failures += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def summary(self) -> Dict:
+        """
+        Summarise the recorded requests.
+
+        Returns:
+            Dictionary with request counts, bytes and latency percentiles in seconds
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            summary = {
+                "requests": self.requests,
+                "failures": self.failures,
+                "retries": self.retries,
+                "bytes_received": self.bytes_received,
+            }
+        if latencies:
+            summary.update({
+                "latency_mean": sum(latencies) / len(latencies),
+                "latency_p50": latencies[len(latencies) // 2],
+                "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "latency_max": latencies[-1],
+            })
+        return summary
+
+
+class HttpClient:
+    """
+    Pooled HTTP session with retries, backoff and rate limiting.
+
+    Args:
+        headers: Default headers sent with every request
+        timeout: Per-request timeout in seconds
+        rate_limiter: Optional limiter consulted before every attempt
+        max_retries: Number of retries after the first attempt
+        backoff_factor: Base delay in seconds; attempt ``n`` waits up to ``backoff_factor * 2**n``
+        backoff_max: Upper bound for a single backoff delay in seconds
+        pool_maxsize: Number of keep-alive connections kept per host
+        cache: Optional response cache consulted before hitting the network
+        archive: Optional page archive receiving every successful response
+        metrics: Optional run metrics receiving per-attempt latency, retries and rate limit waits
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict] = None,
+        timeout: float = 30,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 1.0,
+        backoff_max: float = 30.0,
+        pool_maxsize: int = 10,
+        cache: Optional[ResponseCache] = None,
+        archive: Optional[PageArchive] = None,
+        metrics: Optional[RunMetrics] = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.stats = RequestStats()
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        # Retries are handled here rather than by urllib3 so every attempt is
+        # rate limited and shows up in the latency accounting.
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _record(self, latency: float, num_bytes: int = 0, failed: bool = False) -> None:
+        self.stats.record(latency, num_bytes, failed)
+        if self.metrics is not None:
+            self.metrics.record_request(latency, num_bytes, failed)
+
+    def _record_retry(self, delay: float) -> None:
+        self.stats.record_retry()
+        if self.metrics is not None:
+            self.metrics.record_retry(delay)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        retry_after = response.headers.get("Retry-After", "")
+        return float(retry_after) if retry_after.isdigit() else None
+
+    def _backoff_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = self._retry_after(response)
+            if retry_after is not None:
+                return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request, serving it from the response cache when possible.
+
+        Fresh cache entries are returned without a request. Stale entries are
+        revalidated with a conditional request and reused on 304 Not Modified.
+        Successful responses are added to the page archive, if configured.
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            **kwargs: Passed on to ``requests.Session.request``
+
+        Returns:
+            The final response, see :meth:`send`
+        """
+        response = self._cached_request(method, url, **kwargs)
+        if self.archive is not None and response.status_code == 200:
+            self.archive.add(method, url, kwargs.get("data"), response)
+        return response
+
+    def _cached_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if self.cache is None:
+            return self.send(method, url, **kwargs)
+
+        key = cache_key(method, url, kwargs.get("data"))
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry.is_fresh(self.cache.ttl_seconds):
+                self.cache.record("hit")
+                return entry.to_response()
+            validators = entry.validators()
+            if validators:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **validators}
+
+        response = self.send(method, url, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.refresh(key)
+            self.cache.record("revalidated")
+            return entry.to_response()
+
+        self.cache.record("miss")
+        if response.status_code == 200:
+            self.cache.put(key, response)
+        return response
+
+    def send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request over the network, retrying transient failures.
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            **kwargs: Passed on to ``requests.Session.request``
+
+        Returns:
+            The final response. Non-retryable error statuses are returned as-is
+            so callers can decide via ``raise_for_status``.
+
+        Raises:
+            requests.RequestException: If the last attempt fails with a network error
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire(url)
+                if self.metrics is not None and waited:
+                    self.metrics.record_rate_limit_wait(waited)
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                latency = time.perf_counter() - start
+                self._record(latency, failed=True)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.record(url, latency, None)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+                self._record_retry(delay)
+                time.sleep(delay)
+                continue
+
+            latency = time.perf_counter() - start
+            retryable = response.status_code in RETRY_STATUS_CODES
+            self._record(latency, len(response.content), failed=retryable)
+            if self.rate_limiter is not None:
+                self.rate_limiter.record(url, latency, response.status_code, self._retry_after(response))
+
+            if retryable and attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, response)
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+                self._record_retry(delay)
+                time.sleep(delay)
+                continue
+
+            return response
+
+        # Unreachable: the loop either returns or raises on the last attempt
+        raise requests.RequestException(f"{method} {url} failed after {self.max_retries} retries")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.archive is not None:
+            self.archive.close()
@@ -0,0 +1,216 @@
+"""
+Scrape Run Journal
+==================
+
+Checkpointing for long scrape runs. Every extracted subpage listing and every
+parsed competition is appended to a JSONL journal as soon as it is done, and a
+small checkpoint file records the run's stage and the competitions to process.
+An interrupted run can then be resumed without refetching finished work, and
+nothing but the journal's file handles is kept in memory.
+
+At the end of a run the journals are compacted into the usual JSON files.
+"""
+
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STAGE_SUBPAGES = "subpages"
+STAGE_RESULTS = "results"
+
+# Bytes read at a time when looking for the last complete line
+_TAIL_BLOCK_BYTES = 64 * 1024
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict]:
+    """
+    Yield records from a JSONL file, skipping a truncated final line.
+
+    Args:
+        path: File to read; a missing file yields nothing
+    """
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line can be partial after a crash mid-write
+                logger.warning(f"Skipping unreadable line {line_number} in {path}")
+
+
+def truncate_partial_line(path: Path) -> int:
+    """
+    Cut a JSONL file back to its last complete line.
+
+    A crash mid-write leaves a partial final record; appending to it would
+    glue the next record onto it and make both unreadable.
+
+    Args:
+        path: File to repair; a missing file is left alone
+
+    Returns:
+        Number of bytes removed
+    """
+    if not path.exists():
+        return 0
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - _TAIL_BLOCK_BYTES)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+    if end < size:
+        logger.warning(f"Removed a partial last line ({size - end} bytes) from {path}")
+    return size - end
+
+
+def write_json_array(items: Iterable, path: Path) -> int:
+    """
+    Stream items into a JSON array file.
+
+    The output is byte-identical to ``json.dump(list(items), f, indent=2,
+    ensure_ascii=False)`` without holding the whole list in memory.
+
+    Returns:
+        Number of items written
+    """
+    count = 0
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for item in items:
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "]")
+    os.replace(tmp_path, path)
+    return count
+
+
+class ScrapeJournal:
+    """
+    Append-only journal and checkpoint for one scrape run.
+
+    Args:
+        run_dir: Directory holding the checkpoint and journal files
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = Path(run_dir)
+        self.checkpoint_path = self.run_dir / "checkpoint.json"
+        self.subpages_path = self.run_dir / "subpages.jsonl"
+        self.results_path = self.run_dir / "results.jsonl"
+        # Journals checked for a partial last line since this object was created
+        self._repaired: Set[Path] = set()
+
+    def exists(self) -> bool:
+        return self.checkpoint_path.exists()
+
+    def load_checkpoint(self) -> Dict:
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_checkpoint(self, checkpoint: Dict) -> None:
+        tmp_path = self.checkpoint_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def start(self, competitions: List[Dict]) -> None:
+        """
+        Begin a new run, discarding any previous journal.
+
+        Args:
+            competitions: The new competitions this run will process
+        """
+        self.clear()
+        self._repaired.clear()
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self._write_checkpoint({
+            "stage": STAGE_SUBPAGES,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "competitions": competitions,
+        })
+
+    def set_stage(self, stage: str) -> None:
+        checkpoint = self.load_checkpoint()
+        checkpoint["stage"] = stage
+        self._write_checkpoint(checkpoint)
+
+    def output_path(self, name: str, make_path: Callable[[], Path]) -> Path:
+        """
+        The file this run saves ``name`` to, recorded in the checkpoint.
+
+        The path is made by ``make_path`` the first time and reused after, so
+        a resumed run rewrites the same file instead of saving a second copy.
+
+        Args:
+            name: Output name, e.g. ``"results"``
+            make_path: Builds the path, e.g. a timestamped file name
+        """
+        checkpoint = self.load_checkpoint()
+        outputs = checkpoint.setdefault("outputs", {})
+        if name not in outputs:
+            outputs[name] = str(make_path())
+            self._write_checkpoint(checkpoint)
+        return Path(outputs[name])
+
+    def _append(self, path: Path, record: Dict) -> None:
+        if path not in self._repaired:
+            # An interrupted run may have stopped mid-line
+            truncate_partial_line(path)
+            self._repaired.add(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+    def append_subpages(self, subpage_data: Dict) -> None:
+        self._append(self.subpages_path, subpage_data)
+
+    def iter_subpages(self) -> Iterator[Dict]:
+        return iter_jsonl(self.subpages_path)
+
+    def completed_subpage_urls(self) -> Set[str]:
+        """Competition URLs whose subpages have already been extracted."""
+        return {record["main_url"] for record in self.iter_subpages()}
+
+    def append_result(self, main_url: str, result: Optional[Dict]) -> None:
+        """
+        Record a finished competition.
+
+        Args:
+            main_url: Competition URL the result was parsed from
+            result: Parsed results, or None if the competition yielded nothing
+        """
+        self._append(self.results_path, {"main_url": main_url, "result": result})
+
+    def iter_results(self) -> Iterator[Dict]:
+        """Yield the parsed competitions recorded so far, skipping empty ones."""
+        for record in iter_jsonl(self.results_path):
+            if record["result"]:
+                yield record["result"]
+
+    def completed_result_urls(self) -> Set[str]:
+        """Competition URLs whose results have already been parsed."""
+        return {record["main_url"] for record in iter_jsonl(self.results_path)}
+
+    def clear(self) -> None:
+        if self.run_dir.exists():
+            shutil.rmtree(self.run_dir)
@@ -0,0 +1,173 @@
+"""
+Listing Watermarks
+==================
+
+Per-year record of what the yearly competition listing looked like the last
+time a scrape completed: number of competitions, newest competition date and
+a hash of the listed links. It is stored as a sidecar JSON file next to the
+competition index.
+
+Watermarks let routine runs skip work:
+
+- Past years (older than a configurable horizon) are not requested at all,
+  apart from an occasional recheck
+- A listing identical to its watermark only contributes the competitions that
+  were still unresolved after the last run, instead of every competition
+
+Watermarks are only written after a successful run, so an interrupted or
+failed run never marks a listing as done.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Container, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WATERMARKS_FILENAME = "snwk_listing_watermarks.json"
+LISTING_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def listing_fingerprint(competitions: List[Dict]) -> Dict:
+    """
+    Summarise a yearly listing.
+
+    The hash covers the listed links and their texts, not the raw response,
+    so markup changes that do not change the listing do not count as changes.
+
+    Args:
+        competitions: Competitions returned by ``fetch_competitions_for_year``
+
+    Returns:
+        Dictionary with ``count``, ``newest_date`` and ``sha256``
+    """
+    digest = hashlib.sha256()
+    dates = []
+    for competition in competitions:
+        digest.update(f"{competition['url']}\t{competition['text']}\n".encode("utf-8"))
+        dates.extend(LISTING_DATE_RE.findall(competition["text"]))
+    return {
+        "count": len(competitions),
+        "newest_date": max(dates) if dates else None,
+        "sha256": digest.hexdigest(),
+    }
+
+
+class ListingWatermarks:
+    """
+    Watermarks of the yearly listings, keyed by year and competition type.
+
+    Args:
+        data_dir: Directory holding the watermark file
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.path = self.data_dir / WATERMARKS_FILENAME
+        self.listings: Dict[str, Dict] = {}
+        self._observed: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, data_dir: Path) -> "ListingWatermarks":
+        watermarks = cls(data_dir)
+        if watermarks.path.exists():
+            try:
+                with open(watermarks.path, "r", encoding="utf-8") as f:
+                    watermarks.listings = json.load(f)["listings"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable listing watermarks {watermarks.path}: {e}")
+        return watermarks
+
+    @staticmethod
+    def key(year: int, competition_type: str) -> str:
+        return f"{year}/{competition_type}"
+
+    def is_frozen(self, year: int, competition_type: str, horizon_years: int, recheck_days: float,
+                  now: Optional[datetime] = None) -> bool:
+        """
+        Whether a listing can be skipped without requesting it.
+
+        Args:
+            year: Listing year
+            competition_type: Listing competition type
+            horizon_years: Years within this many years of the current one are always fetched
+            recheck_days: Frozen listings are fetched again after this many days
+
+        Returns:
+            True for a past year with a watermark checked within ``recheck_days``
+        """
+        now = now or datetime.now()
+        watermark = self.listings.get(self.key(year, competition_type))
+        if watermark is None or year >= now.year - horizon_years:
+            return False
+        checked_at = datetime.fromisoformat(watermark["checked_at"])
+        return now - checked_at < timedelta(days=recheck_days)
+
+    def observe(self, year: int, competition_type: str, competitions: List[Dict]) -> List[Dict]:
+        """
+        Compare a freshly fetched listing with its watermark.
+
+        The new fingerprint is kept in memory until :meth:`commit`.
+
+        Args:
+            year: Listing year
+            competition_type: Listing competition type
+            competitions: Competitions in the listing
+
+        Returns:
+            The competitions worth checking for new results: all of them if the
+            listing changed, otherwise only those unresolved after the last run
+        """
+        # An empty listing is indistinguishable from a failed fetch
+        if not competitions:
+            return competitions
+
+        key = self.key(year, competition_type)
+        fingerprint = listing_fingerprint(competitions)
+        self._observed[key] = {"fingerprint": fingerprint, "urls": [c["url"] for c in competitions]}
+
+        watermark = self.listings.get(key)
+        if watermark is None or watermark["sha256"] != fingerprint["sha256"]:
+            if watermark is not None:
+                logger.info(
+                    f"Listing {key} changed: {watermark['count']} -> {fingerprint['count']} competitions, "
+                    f"newest {fingerprint['newest_date']}"
+                )
+            return competitions
+
+        unresolved = set(watermark.get("unresolved", []))
+        logger.info(
+            f"Listing {key} unchanged since {watermark['checked_at']} "
+            f"({len(unresolved)} unresolved competitions to retry)"
+        )
+        return [c for c in competitions if c["url"] in unresolved]
+
+    def commit(self, collected_ids: Container[str], id_from_url) -> None:
+        """
+        Store the listings observed in this run and write the file atomically.
+
+        Args:
+            collected_ids: Ids of every competition with saved results
+            id_from_url: Function mapping a competition URL to its id
+        """
+        if not self._observed:
+            return
+        checked_at = datetime.now().isoformat(timespec="seconds")
+        for key, observed in self._observed.items():
+            self.listings[key] = {
+                **observed["fingerprint"],
+                "checked_at": checked_at,
+                "unresolved": [url for url in observed["urls"] if id_from_url(url) not in collected_ids],
+            }
+        self._observed = {}
+
+        self.data_dir.mkdir(exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"listings": self.listings}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,275 @@
+"""
+Scrape Run Metrics
+==================
+
+Per-stage timers, counters and histograms for one scraper run, written as a
+JSON report and optionally as a Prometheus textfile (for node_exporter's
+textfile collector), so run duration and regressions can be tracked over time.
+
+Stages run one after another in ``main()``, so requests are attributed to
+the stage that is current when they are sent. Result parsing overlaps the
+result fetch stage and reports its own CPU time instead of wall time.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with Prometheus semantics.
+
+    Args:
+        buckets: Ascending upper bounds; an implicit ``+Inf`` bucket is added
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[int]:
+        """Counts of observations ``<=`` each bound, ending with ``+Inf``."""
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def to_dict(self) -> Dict:
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(bounds, self.cumulative())),
+        }
+
+
+class StageMetrics:
+    """Timers and counters of one scraper stage."""
+
+    def __init__(self):
+        self.wall_seconds = 0.0
+        self.requests = 0
+        self.failed_requests = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.rate_limit_wait_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.pages_parsed = 0
+        self.counters: Dict[str, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.parse_time_per_page = Histogram(PARSE_BUCKETS)
+
+    def to_dict(self) -> Dict:
+        summary = {
+            "wall_seconds": self.wall_seconds,
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "rate_limit_wait_seconds": self.rate_limit_wait_seconds,
+            "backoff_seconds": self.backoff_seconds,
+            "counters": dict(self.counters),
+        }
+        if self.latency.count:
+            summary["request_latency_seconds"] = self.latency.to_dict()
+        if self.pages_parsed:
+            summary.update({
+                "parse_seconds": self.parse_seconds,
+                "pages_parsed": self.pages_parsed,
+                "parse_seconds_per_page": self.parse_seconds / self.pages_parsed,
+                "parse_time_per_page_seconds": self.parse_time_per_page.to_dict(),
+            })
+        return summary
+
+
+class RunMetrics:
+    """
+    Thread-safe metrics of a scraper run.
+
+    Request-level events are recorded by :class:`HttpClient` and attributed
+    to the current stage; ``main()`` marks stages with :meth:`stage`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.finished_at: Optional[datetime] = None
+        self.duration_seconds: Optional[float] = None
+        self.status = "running"
+        self.current_stage = "other"
+        self.stages: Dict[str, StageMetrics] = {}
+        # Free-form end-of-run summaries, e.g. of the response cache
+        self.summaries: Dict[str, Dict] = {}
+
+    def _stage(self, name: Optional[str] = None) -> StageMetrics:
+        name = name or self.current_stage
+        if name not in self.stages:
+            self.stages[name] = StageMetrics()
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """Time a stage and attribute requests sent meanwhile to it."""
+        with self._lock:
+            previous = self.current_stage
+            self.current_stage = name
+            stage = self._stage(name)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            with self._lock:
+                stage.wall_seconds += time.perf_counter() - start
+                self.current_stage = previous
+
+    def record_request(self, latency: float, num_bytes: int = 0, failed: bool = False) -> None:
+        with self._lock:
+            stage = self._stage()
+            stage.requests += 1
+            stage.bytes_received += num_bytes
+            stage.latency.observe(latency)
+            if failed:
+                stage.failed_requests += 1
+
+    def record_retry(self, backoff_seconds: float) -> None:
+        with self._lock:
+            stage = self._stage()
+            stage.retries += 1
+            stage.backoff_seconds += backoff_seconds
+
+    def record_rate_limit_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._stage().rate_limit_wait_seconds += seconds
+
+    def record_parse(self, page_seconds: List[float], stage: str = "parse") -> None:
+        """Record the CPU time spent parsing each of a competition's pages."""
+        with self._lock:
+            parse_stage = self._stage(stage)
+            for seconds in page_seconds:
+                parse_stage.parse_seconds += seconds
+                parse_stage.pages_parsed += 1
+                parse_stage.parse_time_per_page.observe(seconds)
+
+    def count(self, name: str, value: int = 1, stage: Optional[str] = None) -> None:
+        """Add to a named counter of a stage (the current one by default)."""
+        with self._lock:
+            counters = self._stage(stage).counters
+            counters[name] = counters.get(name, 0) + value
+
+    def finish(self, status: str) -> None:
+        """Mark the run as ``completed``, ``interrupted`` or ``failed``."""
+        self.status = status
+        self.finished_at = datetime.now()
+        self.duration_seconds = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = {name: stage.to_dict() for name, stage in self.stages.items()}
+        totals = {
+            key: sum(stage[key] for stage in stages.values())
+            for key in ("requests", "failed_requests", "retries", "bytes_received",
+                        "rate_limit_wait_seconds", "backoff_seconds")
+        }
+        return {
+            "status": self.status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+            "duration_seconds": self.duration_seconds,
+            "totals": totals,
+            "stages": stages,
+            **self.summaries,
+        }
+
+    def write_json(self, path: Path) -> None:
+        """Write the JSON report atomically."""
+        _write_atomic(Path(path), json.dumps(self.to_dict(), indent=2, ensure_ascii=False) + "\n")
+
+    def to_prometheus(self, prefix: str = "nw_scrape") -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        report = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_run_duration_seconds Duration of the last scraper run.",
+            f"# TYPE {prefix}_run_duration_seconds gauge",
+            f"{prefix}_run_duration_seconds {report['duration_seconds'] or 0}",
+            f"# HELP {prefix}_run_success Whether the last scraper run completed.",
+            f"# TYPE {prefix}_run_success gauge",
+            f"{prefix}_run_success {int(report['status'] == 'completed')}",
+            f"# HELP {prefix}_last_run_timestamp_seconds Start time of the last scraper run.",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {self.started_at.timestamp():.0f}",
+        ]
+
+        gauges = [
+            ("stage_duration_seconds", "wall_seconds", "Wall time spent in each stage."),
+            ("requests", "requests", "Requests sent per stage, including retries."),
+            ("failed_requests", "failed_requests", "Failed request attempts per stage."),
+            ("retries", "retries", "Retried requests per stage."),
+            ("received_bytes", "bytes_received", "Response bytes received per stage."),
+            ("rate_limit_wait_seconds", "rate_limit_wait_seconds", "Time spent waiting for the rate limiter."),
+            ("backoff_seconds", "backoff_seconds", "Time spent in retry backoff."),
+            ("parse_seconds", "parse_seconds", "CPU time spent parsing pages."),
+            ("pages_parsed", "pages_parsed", "Pages parsed."),
+        ]
+        for name, key, help_text in gauges:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for stage, values in report["stages"].items():
+                if key in values:
+                    lines.append(f'{prefix}_{name}{{stage="{stage}"}} {values[key]}')
+
+        histograms = [
+            ("request_latency_seconds", "request_latency_seconds", "Request latency per stage."),
+            ("parse_time_per_page_seconds", "parse_time_per_page_seconds", "Parse CPU time per page."),
+        ]
+        for name, key, help_text in histograms:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for stage, values in report["stages"].items():
+                if key not in values:
+                    continue
+                histogram = values[key]
+                for bound, count in histogram["buckets"].items():
+                    lines.append(f'{prefix}_{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_{name}_sum{{stage="{stage}"}} {histogram["sum"]}')
+                lines.append(f'{prefix}_{name}_count{{stage="{stage}"}} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """Write a Prometheus textfile atomically, as the textfile collector requires."""
+        _write_atomic(Path(path), self.to_prometheus())
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,234 @@
+"""
+Raw Page Archive
+================
+
+Append-only, compressed archive of every page the scraper fetches, so the
+dataset can be rebuilt with a fixed parser without scraping SNWK again.
+
+- Pages are zlib-compressed one by one and appended to segment files
+- A SQLite index maps request key and fetch time to segment and offset, so
+  any single page can be read back without scanning a segment
+- A page identical to the latest archived version of the same request is not
+  stored again, so re-scrapes and cache hits cost nothing
+- Records are never rewritten; each fetch of a changed page adds a version
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from nw_stats.data_collection.response_cache import RequestBody, cache_key, encode_body
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.sqlite"
+SEGMENT_PATTERN = "segment-{:06d}.z"
+COMPRESSION_LEVEL = 6
+
+
+class ArchivedPage(NamedTuple):
+    """One archived version of a page."""
+    method: str
+    url: str
+    body: str
+    fetched_at: float
+    content: bytes
+    encoding: Optional[str]
+    content_type: Optional[str]
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a ``requests.Response`` carrying the archived page."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.url
+        if self.content_type:
+            response.headers = CaseInsensitiveDict({"Content-Type": self.content_type})
+        response.encoding = self.encoding
+        response._content = self.content
+        return response
+
+
+class PageArchive:
+    """
+    Append-only store of raw page bodies.
+
+    Args:
+        directory: Directory holding the segments and the index
+        segment_max_bytes: Size at which a new segment file is started
+    """
+
+    def __init__(self, directory: Path, segment_max_bytes: int = 256 * 1024 ** 2):
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.pages_added = 0
+        self.bytes_added = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.directory / INDEX_FILENAME), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                encoding TEXT,
+                content_type TEXT
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_key ON pages (key, fetched_at)")
+        self._db.commit()
+
+        row = self._db.execute("SELECT MAX(segment) FROM pages").fetchone()
+        self._segment = row[0] or 1
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / SEGMENT_PATTERN.format(segment)
+
+    def _latest_row(self, key: str, as_of: Optional[float] = None) -> Optional[Tuple]:
+        query = (
+            "SELECT method, url, body, fetched_at, segment, offset, length, sha256, encoding, content_type "
+            "FROM pages WHERE key = ?"
+        )
+        params: Tuple = (key,)
+        if as_of is not None:
+            query += " AND fetched_at <= ?"
+            params += (as_of,)
+        return self._db.execute(query + " ORDER BY fetched_at DESC, id DESC LIMIT 1", params).fetchone()
+
+    def _is_latest(self, key: str, digest: str) -> bool:
+        latest = self._latest_row(key)
+        return latest is not None and latest[7] == digest
+
+    def add(self, method: str, url: str, body: RequestBody, response: requests.Response) -> bool:
+        """
+        Archive a successful response unless it equals the latest archived version.
+
+        Args:
+            method: HTTP method of the request
+            url: Requested URL
+            body: Request body (form data for POST requests)
+            response: Response to archive
+
+        Returns:
+            True if a new record was appended
+        """
+        key = cache_key(method, url, body)
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            if self._is_latest(key, digest):
+                return False
+
+        record = zlib.compress(content, COMPRESSION_LEVEL)
+        with self._lock:
+            # Another thread may have archived the same page meanwhile
+            if self._is_latest(key, digest):
+                return False
+            path = self._segment_path(self._segment)
+            if path.exists() and path.stat().st_size + len(record) > self.segment_max_bytes:
+                self._segment += 1
+                path = self._segment_path(self._segment)
+            # The record is on disk before the index points at it; a crash in
+            # between only leaves unreferenced bytes at the end of a segment
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            self._db.execute(
+                "INSERT INTO pages (key, method, url, body, fetched_at, segment, offset, length, size, "
+                "sha256, encoding, content_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, method.upper(), url, encode_body(body).decode("utf-8"), time.time(),
+                    self._segment, offset, len(record), len(content), digest,
+                    response.encoding, response.headers.get("Content-Type"),
+                ),
+            )
+            self._db.commit()
+            self.pages_added += 1
+            self.bytes_added += len(record)
+        return True
+
+    def _read(self, segment: int, offset: int, length: int) -> bytes:
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return zlib.decompress(f.read(length))
+
+    def get(self, method: str, url: str, body: RequestBody = None,
+            as_of: Optional[float] = None) -> Optional[ArchivedPage]:
+        """
+        Return the latest archived version of a request.
+
+        Args:
+            method: HTTP method
+            url: Requested URL
+            body: Request body
+            as_of: Only consider versions fetched at or before this Unix time
+
+        Returns:
+            The archived page, or None if the request was never archived
+        """
+        with self._lock:
+            row = self._latest_row(cache_key(method, url, body), as_of)
+        if row is None:
+            return None
+        method, url, body, fetched_at, segment, offset, length, _, encoding, content_type = row
+        return ArchivedPage(method, url, body, fetched_at, self._read(segment, offset, length),
+                            encoding, content_type)
+
+    def contains(self, method: str, url: str, body: RequestBody = None, as_of: Optional[float] = None) -> bool:
+        """Whether any version of a request (fetched by ``as_of``, if given) is archived."""
+        with self._lock:
+            return self._latest_row(cache_key(method, url, body), as_of) is not None
+
+    def iter_requests(self, method: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """Yield every distinct archived ``(method, url, body)``, optionally for one method."""
+        query = "SELECT DISTINCT method, url, body FROM pages"
+        params: Tuple = ()
+        if method is not None:
+            query += " WHERE method = ?"
+            params = (method.upper(),)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY url, body", params).fetchall()
+        yield from rows
+
+    def summary(self) -> Dict:
+        """
+        Summarise the archive.
+
+        Returns:
+            Dictionary with record counts and raw/compressed sizes, plus what this
+            instance appended
+        """
+        with self._lock:
+            records, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length), 0) FROM pages"
+            ).fetchone()
+            return {
+                "records": records,
+                "raw_bytes": raw,
+                "stored_bytes": stored,
+                "pages_added": self.pages_added,
+                "bytes_added": self.bytes_added,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,587 @@
+"""
+SNWK Result Page Parsers
+========================
+
+Pure parsing functions for SNWK result pages, independent of fetching.
+
+- Precompiled patterns for every field
+- Single-pass tokenizer for the ``Label: value`` participant fields
+- Result pages are read with lxml directly when it is installed; otherwise
+  BeautifulSoup's ``html.parser`` builds one soup restricted by a
+  ``SoupStrainer`` to the elements results are read from
+
+Both backends only extract the text the parser needs (headers, judge text and
+participant texts); all interpretation happens on those strings, so the two
+backends cannot drift apart.
+"""
+
+import logging
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+
+def _default_html_parser() -> str:
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+HTML_PARSER = _default_html_parser()
+
+
+
+class ResultPageStrainer(SoupStrainer):
+    """
+    Keeps the headers, paragraphs and result list of a result page, and the judge div if asked to.
+
+    A ``SoupStrainer`` matches a name *and* attributes, so "h2, p, ul or
+    div.domardiv" needs its own check of the tag being created. It is read
+    from the raw class attribute, which may hold other classes too.
+
+    Args:
+        judge_div: Whether to keep the ``domardiv`` div (only used on total pages)
+    """
+
+    TAGS = ("h2", "p", "ul")
+
+    def __init__(self, judge_div: bool):
+        super().__init__(list(self.TAGS) + ["div"])
+        self.judge_div = judge_div
+
+    def _keeps(self, name, attrs) -> bool:
+        if name == "div":
+            classes = (attrs or {}).get("class") or ""
+            return self.judge_div and "domardiv" in (classes.split() if isinstance(classes, str) else classes)
+        return name in self.TAGS
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        # beautifulsoup4 >= 4.13
+        return self._keeps(name, attrs)
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        # beautifulsoup4 < 4.13, which only calls this while parsing here
+        return markup_name if self._keeps(markup_name, markup_attrs) else None
+
+
+# Result pages are read from their headers, judge paragraphs and the result
+# list; the judge div is only needed on "total" pages.
+RESULT_PAGE_STRAINER = ResultPageStrainer(judge_div=False)
+RESULT_PAGE_WITH_JUDGE_DIV_STRAINER = ResultPageStrainer(judge_div=True)
+
+DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+DATE_FALLBACK_RE = re.compile(r'\d{2,4}[-/]\d{1,2}[-/]\d{2,4}')
+CLASS_RE = re.compile(r'^(NW[123]|ELIT)$')
+DOMARE_RE = re.compile("Domare")
+DOMARE_PARAGRAPH_RE = re.compile(r"Domare\s*[^:]*:\s*(.*)")
+JUDGE_RE = re.compile(
+    r"Domare\s*\d*\s*:\s*([A-ZÅÄÖ][\w\-\s]+?)(?=\s*(?:Domare\s*\d*\s*:|$))",
+    re.IGNORECASE,
+)
+
+# Participant fields. Labels never overlap each other (the "Total" variants
+# differ in case from the plain ones), so one scan finds every occurrence.
+PARTICIPANT_LABEL_RE = re.compile(
+    r"(Placering|Totalpoäng|Poäng|Totalfel|Fel|Totaltid|Tid|Startnr|Förare|Hund|Ras):"
+)
+_INT_VALUE_RE = re.compile(r"\s*(\d+)")
+_TIME_VALUE_RE = re.compile(r"\s*([\d:,]+)")
+_TEXT_VALUE_RE = re.compile(r"\s*([^\n\r]+)")
+_LABEL_VALUES = {
+    "Placering": _INT_VALUE_RE,
+    "Totalpoäng": _INT_VALUE_RE,
+    "Poäng": _INT_VALUE_RE,
+    "Totalfel": _INT_VALUE_RE,
+    "Fel": _INT_VALUE_RE,
+    "Totaltid": _TIME_VALUE_RE,
+    "Tid": _TIME_VALUE_RE,
+    "Startnr": _INT_VALUE_RE,
+    "Förare": _TEXT_VALUE_RE,
+    "Hund": _TEXT_VALUE_RE,
+    "Ras": _TEXT_VALUE_RE,
+}
+
+COMPETITION_TYPES = ['TEM', 'TSM']
+NON_LOCATION_TOKENS = ['TEM', 'TSM', 'NW1', 'NW2', 'NW3', 'ELIT', 'Arrangör:', 'Anordnare:']
+
+
+class PageText(NamedTuple):
+    """The parts of a result page that results are read from."""
+
+    h2_texts: List[str]
+    judge_div_text: Optional[str]
+    judge_paragraph_text: Optional[str]
+    # (full text, texts of <strong> tags) per <li> of the first <ul>; None without a list
+    participants: Optional[List[Tuple[str, List[str]]]]
+
+
+def make_soup(html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parse HTML with the configured tree builder."""
+    return BeautifulSoup(html, HTML_PARSER, parse_only=parse_only)
+
+
+def _soup_page_text(html: str, need_judge_div: bool) -> PageText:
+    # One pass over the page, also for the judge div
+    soup = make_soup(html, RESULT_PAGE_WITH_JUDGE_DIV_STRAINER if need_judge_div else RESULT_PAGE_STRAINER)
+
+    judge_div_text = None
+    if need_judge_div:
+        ref_div = soup.find("div", class_="domardiv")
+        judge_div_text = ref_div.get_text() if ref_div else None
+
+    p = soup.find("p", string=DOMARE_RE)
+    results_list = soup.find("ul")
+    participants = None
+    if results_list:
+        participants = [
+            (li.get_text(), [strong.get_text() for strong in li.find_all("strong")])
+            for li in results_list.find_all("li")
+        ]
+
+    return PageText(
+        h2_texts=[h2.text for h2 in soup.find_all("h2")],
+        judge_div_text=judge_div_text,
+        judge_paragraph_text=p.get_text() if p else None,
+        participants=participants,
+    )
+
+
+def _lxml_string(element) -> Optional[str]:
+    """Equivalent of BeautifulSoup's ``Tag.string`` for an lxml element."""
+    children = list(element)
+    if element.text:
+        return None if children else element.text
+    if len(children) != 1 or children[0].tail:
+        return None
+    child = children[0]
+    if not isinstance(child.tag, str):
+        # Comments and processing instructions are strings in BeautifulSoup
+        return child.text
+    return _lxml_string(child)
+
+
+def _lxml_page_text(html: str, need_judge_div: bool) -> PageText:
+    from lxml import etree, html as lxml_html
+
+    try:
+        root = lxml_html.fromstring(html)
+    except etree.ParserError:
+        # Empty document
+        return PageText([], None, None, None)
+
+    judge_div_text = None
+    if need_judge_div:
+        for div in root.iter("div"):
+            if "domardiv" in (div.get("class") or "").split():
+                judge_div_text = div.text_content()
+                break
+
+    judge_paragraph_text = None
+    for p in root.iter("p"):
+        string = _lxml_string(p)
+        if string is not None and DOMARE_RE.search(string):
+            judge_paragraph_text = p.text_content()
+            break
+
+    results_list = next(root.iter("ul"), None)
+    participants = None
+    if results_list is not None:
+        participants = [
+            (li.text_content(), [strong.text_content() for strong in li.iter("strong")])
+            for li in results_list.iterdescendants("li")
+        ]
+
+    return PageText(
+        h2_texts=[h2.text_content() for h2 in root.iter("h2")],
+        judge_div_text=judge_div_text,
+        judge_paragraph_text=judge_paragraph_text,
+        participants=participants,
+    )
+
+
+def extract_page_text(html: str, need_judge_div: bool = True) -> PageText:
+    """
+    Extract the text of the elements results are read from.
+
+    Args:
+        html: Page HTML
+        need_judge_div: Whether to look for the judge div (only used on total pages)
+    """
+    if HTML_PARSER == "lxml":
+        return _lxml_page_text(html, need_judge_div)
+    return _soup_page_text(html, need_judge_div)
+
+
+def tokenize_participant_fields(text: str) -> Dict[str, str]:
+    """
+    Read all ``Label: value`` fields from a participant's text in one pass.
+
+    Each label keeps the value of its first occurrence that is followed by a
+    valid value, matching what a separate ``re.search`` per label would find.
+
+    Args:
+        text: Full text of a participant's ``<li>``
+
+    Returns:
+        Mapping from label to raw (unstripped) value
+    """
+    fields: Dict[str, str] = {}
+    for label_match in PARTICIPANT_LABEL_RE.finditer(text):
+        label = label_match.group(1)
+        if label in fields:
+            continue
+        value_match = _LABEL_VALUES[label].match(text, label_match.end())
+        if value_match:
+            fields[label] = value_match.group(1)
+    return fields
+
+
+def parse_participant(participant_text: str, strong_texts: List[str]) -> Dict:
+    """
+    Parse one participant ``<li>`` of a result list.
+
+    Args:
+        participant_text: Full text of the ``<li>``
+        strong_texts: Texts of the ``<strong>`` tags inside it
+
+    Returns:
+        Dictionary with placement, dog_call_name, points, faults, time,
+        start_number, handler, dog_full_name and dog_breed where present
+    """
+    participant_results = {}
+    fields = tokenize_participant_fields(participant_text)
+
+    if "Placering" in fields:
+        participant_results["placement"] = int(fields["Placering"])
+
+    # Look for pattern like "Name Surname & DogName"
+    for strong_text in strong_texts:
+        strong_text = strong_text.strip()
+        if "&" in strong_text and "Placering" not in strong_text and "Totalpoäng" not in strong_text:
+            if " & " in strong_text:
+                handler, dog = strong_text.split(" & ", 1)
+                participant_results["dog_call_name"] = dog.strip()
+            break
+
+    # Totals take precedence over per-search values
+    points = fields.get("Totalpoäng", fields.get("Poäng"))
+    if points is not None:
+        participant_results["points"] = int(points)
+
+    faults = fields.get("Totalfel", fields.get("Fel"))
+    if faults is not None:
+        participant_results["faults"] = int(faults)
+
+    time_value = fields.get("Totaltid", fields.get("Tid"))
+    if time_value is not None:
+        participant_results["time"] = time_value.strip()
+
+    if "Startnr" in fields:
+        participant_results["start_number"] = int(fields["Startnr"])
+    if "Förare" in fields:
+        participant_results["handler"] = fields["Förare"].strip()
+    if "Hund" in fields:
+        participant_results["dog_full_name"] = fields["Hund"].strip()
+    if "Ras" in fields:
+        participant_results["dog_breed"] = fields["Ras"].strip()
+
+    return participant_results
+
+
+def parse_time_seconds(time_value: str) -> Optional[float]:
+    """
+    Convert a result time (``MM:SS,ss`` or ``HH:MM:SS,ss``) to seconds.
+
+    Returns:
+        Seconds, or None if the value is not a time
+    """
+    parts = time_value.strip().replace(",", ".").split(":")
+    if len(parts) not in (2, 3):
+        return None
+    try:
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+    return round(seconds, 3)
+
+
+def parse_judge_div(judge_text: str) -> List[str]:
+    """Extract judge names from the text of the ``domardiv`` of a total page."""
+    text_list = judge_text.split()
+
+    # Handle different formats
+    if len(text_list) == 4:  # Simple format: "Domare Förnamn Efternamn"
+        return [f"{text_list[-2]} {text_list[-1]}"]
+    if len(text_list) == 8:  # Two refs, simple format
+        return [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}"]
+    if len(text_list) == 12:  # Three refs, simple format
+        return [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}", f"{text_list[-2]} {text_list[-1]}"]
+    if len(text_list) == 9:  # Two refs with numbered format: "Domare 1: Name Name Domare 2: Name Name"
+        return [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}"]
+    if len(text_list) == 13:  # Three refs with numbered format
+        return [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}", f"{text_list[10]} {text_list[11]}"]
+
+    # Try to extract judge names using regex for more flexible parsing
+    matches = JUDGE_RE.findall(judge_text)
+    if matches:
+        return [match.strip() for match in matches]
+
+    logger.warning(f"Unexpected domardiv format with {len(text_list)} elements: {text_list}")
+    logger.warning(f"Raw text: '{judge_text}'")
+    return ["okänd"]
+
+
+def parse_result_page(html: str, page_type: str, competition_type: str,
+                      search_type: str = "") -> Tuple[Optional[Dict], str]:
+    """
+    Parse one result subpage (TOT, M1, M2, ...) of a competition.
+
+    Args:
+        html: Page HTML
+        page_type: Text of the subpage's button, e.g. "Visa total"
+        competition_type: Competition type from the metadata (TEM/TSM)
+        search_type: Search type carried over from earlier subpages
+
+    Returns:
+        Tuple of the result dict (None if the page has no result list) and the
+        search type to carry over to the next subpage
+    """
+    result_dict = {}
+    is_total = page_type.split()[-1] == "total"
+    page = extract_page_text(html, need_judge_div=is_total)
+
+    # Add what type of search with validation
+    if competition_type == "TEM":
+        if not search_type and is_total:
+            result_dict['sök'] = "total"
+
+            if page.h2_texts:
+                extracted_search_type = page.h2_texts[-1].split()[-1]
+                # Validate and clean the search type
+                if extracted_search_type and extracted_search_type not in ['', 'total']:
+                    search_type = extracted_search_type
+
+        elif search_type and search_type.strip():  # Ensure search_type is not empty
+            result_dict['sök'] = search_type
+
+    elif competition_type == "TSM":
+        raw_search_type = page_type.split()[-1].removesuffix("sök")
+
+        # Clean and standardize search type names
+        if raw_search_type == "Behållar":
+            search_type = "Behållare"
+        elif raw_search_type == "Fordons":
+            search_type = "Fordon"
+        elif raw_search_type and raw_search_type.strip():  # Not empty
+            search_type = raw_search_type
+        else:
+            search_type = ""
+
+        # Only add if search_type is valid and not empty
+        if search_type and search_type.strip():
+            result_dict['sök'] = search_type
+
+    # Add referee information
+    if is_total:
+        if page.judge_div_text is not None:
+            result_dict['domare'] = parse_judge_div(page.judge_div_text)
+        else:
+            # No domardiv found, set as unknown
+            result_dict['domare'] = ["okänd"]
+    else:
+        if page.judge_paragraph_text is not None:
+            match = DOMARE_PARAGRAPH_RE.search(page.judge_paragraph_text)
+            if match:
+                result_dict['domare'] = [match.group(1).strip()]
+            else:
+                # Found "Domare" paragraph but couldn't parse it
+                logger.warning(f"Found Domare paragraph but couldn't parse: {page.judge_paragraph_text}")
+                result_dict['domare'] = ["okänd"]
+        else:
+            # No Domare paragraph found, set as unknown
+            result_dict['domare'] = ["okänd"]
+
+    # Add results for this branch
+    if page.participants is None:
+        return None, search_type
+
+    result_dict['tabell'] = [parse_participant(text, strong_texts) for text, strong_texts in page.participants]
+    return result_dict, search_type
+
+
+def parse_competition_metadata(info_text: str) -> Dict:
+    """
+    Parse date, location, type, class, organizer and coordinator from the
+    competition's listing text.
+
+    Returns:
+        Dictionary with datum, plats, typ, klass, arrangör and anordnare;
+        fields that cannot be found are empty strings
+    """
+    info_text_list = info_text.split()
+
+    # Initialize with safe defaults
+    metadata = {
+        'datum': "",
+        'plats': "",
+        'typ': "",
+        'klass': "",
+        'arrangör': "",
+        'anordnare': ""
+    }
+
+    if not info_text_list:
+        return metadata
+
+    try:
+        # Extract date (first element that looks like a date)
+        for item in info_text_list:
+            if DATE_RE.match(item):
+                metadata['datum'] = item
+                break
+        else:
+            # Fallback: use first element if it looks like a date format
+            if DATE_FALLBACK_RE.match(info_text_list[0]):
+                metadata['datum'] = info_text_list[0]
+
+        # Extract location (second element, with validation)
+        if len(info_text_list) > 1:
+            # Skip invalid location values
+            potential_location = info_text_list[1]
+            if potential_location not in NON_LOCATION_TOKENS:
+                metadata['plats'] = potential_location
+
+        # Extract competition type (look for TEM, TSM, etc.)
+        for item in info_text_list:
+            if item in COMPETITION_TYPES:
+                metadata['typ'] = item
+                break
+        else:
+            # Fallback: check position 3 but validate it's actually a competition type
+            if len(info_text_list) > 3:
+                potential_typ = info_text_list[3]
+                # Only accept known competition types, reject invalid values like "-"
+                if potential_typ in ['TEM', 'TSM', 'Utomhus', 'Inomhus']:
+                    metadata['typ'] = potential_typ
+
+        # Extract class (look for NW1, NW2, NW3, ELIT, etc.)
+        for item in info_text_list:
+            if CLASS_RE.match(item):
+                metadata['klass'] = item
+                break
+        else:
+            # Fallback: check position 5 but validate it's actually a class
+            if len(info_text_list) > 5:
+                potential_klass = info_text_list[5]
+                # Only accept known class values, reject invalid values like "Arrangör" and "Inomhus"
+                if CLASS_RE.match(potential_klass):
+                    metadata['klass'] = potential_klass
+
+        # Extract organizer (between 'Arrangör:' and 'Anordnare:')
+        try:
+            start_arr = info_text_list.index('Arrangör:') + 1
+            try:
+                end_arr = info_text_list.index('Anordnare:')
+                metadata['arrangör'] = " ".join(info_text_list[start_arr:end_arr])
+            except ValueError:
+                # No 'Anordnare:' found, take up to 5 words after 'Arrangör:'
+                metadata['arrangör'] = " ".join(info_text_list[start_arr:start_arr+5])
+        except ValueError:
+            # No 'Arrangör:' found
+            pass
+
+        # Extract coordinator (everything after 'Anordnare:')
+        try:
+            start_anor = info_text_list.index('Anordnare:') + 1
+            metadata['anordnare'] = " ".join(info_text_list[start_anor:])
+        except ValueError:
+            # No 'Anordnare:' found
+            pass
+
+    except Exception as e:
+        logger.warning(f"Failed to parse metadata for competition. Error: {e}")
+        logger.warning(f"Text was: {info_text}")
+
+    return metadata
+
+
+def build_competition_results(comp_dict: Dict, pages_html: List[str],
+                              page_seconds: Optional[List[float]] = None,
+                              time_seconds: bool = False) -> Optional[Dict]:
+    """
+    Build a competition's results from the HTML of its subpages.
+
+    Args:
+        comp_dict: Subpage data with ``subpages`` and ``original_text``
+        pages_html: HTML of every subpage, in the order of ``comp_dict['subpages']``
+        page_seconds: If given, the parse CPU time of every page is appended to it
+        time_seconds: Add a numeric ``time_seconds`` next to every participant's ``time``
+
+    Returns:
+        Competition dictionary with url, resultat and metadata, or None if the
+        competition has no subpages or a page cannot be parsed
+    """
+    # ELITE competitions do not have subpages
+    if not comp_dict['subpages']:
+        return None
+
+    competition_data = {
+        "url": comp_dict["subpages"][0]['url'],
+        "resultat": [],
+    }
+
+    # Save competition metadata with robust validation
+    competition_data.update(parse_competition_metadata(comp_dict.get("original_text", "")))
+
+    # Go through moments of competition - TOT, M1, M2, M3, M4
+    search_type = ""
+
+    for page, html in zip(comp_dict['subpages'], pages_html):
+        start = time.thread_time()
+        try:
+            result_dict, search_type = parse_result_page(
+                html, page['type'], competition_data['typ'], search_type
+            )
+        except Exception as e:
+            logger.error(f"Error parsing competition {page['url']}: {e}")
+            return None
+        finally:
+            if page_seconds is not None:
+                page_seconds.append(time.thread_time() - start)
+        if result_dict is not None:
+            if time_seconds:
+                for participant in result_dict['tabell']:
+                    if 'time' in participant:
+                        participant['time_seconds'] = parse_time_seconds(participant['time'])
+            competition_data['resultat'].append(result_dict)
+
+    return competition_data
+
+
+def parse_fetched_competition(fetched: Tuple[Dict, Optional[List[str]]],
+                              time_seconds: bool = False) -> Tuple[str, Optional[Dict], List[float]]:
+    """
+    Parse stage of the scrape pipeline; runs in a worker process.
+
+    Args:
+        fetched: Subpage data and the fetched subpage HTML (None if fetching failed)
+        time_seconds: Add numeric ``time_seconds`` to participants, see :func:`build_competition_results`
+
+    Returns:
+        Tuple of the competition URL, its results (None if nothing was
+        collected) and the parse CPU time of every page
+    """
+    comp_dict, pages_html = fetched
+    page_seconds: List[float] = []
+    if pages_html is None:
+        return comp_dict["main_url"], None, page_seconds
+    result = build_competition_results(comp_dict, pages_html, page_seconds, time_seconds)
+    return comp_dict["main_url"], result, page_seconds
@@ -0,0 +1,206 @@
+"""
+Request Rate Limiting
+=====================
+
+Token-bucket rate limiting shared by every scraper request. Each host gets its
+own bucket, so concurrent workers can overlap network waits while the total
+number of requests per second sent to snwktavling.se stays polite.
+
+:class:`AdaptiveRateLimiter` additionally adjusts each host's rate from the
+responses it sees (AIMD): the rate grows additively while the server answers
+quickly and is cut multiplicatively on 429/503, timeouts or slow responses.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean the server is overloaded or asking us to slow down
+OVERLOAD_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens are refilled continuously at ``rate`` per second up to ``capacity``.
+    Each call to :meth:`acquire` consumes one token and blocks until one is
+    available.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available.
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Reserve the token immediately so concurrent callers queue up
+            # behind each other instead of all waking at the same moment.
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate; tokens accrued so far keep the old rate."""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for at least ``seconds`` (e.g. after a Retry-After)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class HostRateLimiter:
+    """
+    Keeps one :class:`TokenBucket` per host.
+
+    Args:
+        rate_per_second: Sustained requests per second allowed for each host
+        burst: Number of requests that may be sent back-to-back after idling
+    """
+
+    def __init__(self, rate_per_second: float, burst: float = 1.0):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = self.host(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_second, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url: str) -> float:
+        """
+        Wait for permission to send a request to the host of ``url``.
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        return self.bucket_for(url).acquire()
+
+    def record(self, url: str, latency: float, status_code: Optional[int] = None,
+               retry_after: Optional[float] = None) -> None:
+        """
+        Feedback about a finished request; the fixed-rate limiter ignores it.
+
+        Args:
+            url: Requested URL
+            latency: Response time in seconds
+            status_code: HTTP status, or None if the request timed out or failed to connect
+            retry_after: Seconds from a ``Retry-After`` header, if any
+        """
+
+    def rates(self) -> Dict[str, float]:
+        """Current requests per second of every host seen so far."""
+        with self._lock:
+            return {host: bucket.rate for host, bucket in self._buckets.items()}
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """
+    Per-host rate limiter that paces itself from server feedback (AIMD).
+
+    Every healthy response raises the host's rate by ``additive_increase``
+    requests/s, up to ``max_rate``. Overload responses, timeouts and
+    connection errors multiply it by ``decrease_factor``; responses slower
+    than ``slow_latency`` multiply it by ``slow_decrease_factor``. Decreases
+    are applied at most once per ``cooldown`` seconds, so a burst of failures
+    from requests that were already in flight counts as one signal.
+
+    Args:
+        initial_rate: Requests per second each host starts at
+        min_rate: Floor for the rate
+        max_rate: Ceiling for the rate
+        burst: Number of requests that may be sent back-to-back after idling
+        additive_increase: Rate increase per healthy response, in requests/s
+        decrease_factor: Rate multiplier on 429/5xx overload, timeouts and connection errors
+        slow_latency: Response time in seconds above which the server counts as struggling
+        slow_decrease_factor: Rate multiplier on slow responses
+        cooldown: Minimum seconds between two decreases of the same host
+    """
+
+    def __init__(self, initial_rate: float, min_rate: float, max_rate: float, burst: float = 1.0,
+                 additive_increase: float = 0.05, decrease_factor: float = 0.5,
+                 slow_latency: float = 2.0, slow_decrease_factor: float = 0.8, cooldown: float = 1.0):
+        if not 0 < min_rate <= initial_rate <= max_rate:
+            raise ValueError("rates must satisfy 0 < min_rate <= initial_rate <= max_rate")
+        super().__init__(initial_rate, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.slow_latency = slow_latency
+        self.slow_decrease_factor = slow_decrease_factor
+        self.cooldown = cooldown
+        self.decreases = 0
+        self._last_decrease: Dict[str, float] = {}
+        self._feedback_lock = threading.Lock()
+
+    def record(self, url: str, latency: float, status_code: Optional[int] = None,
+               retry_after: Optional[float] = None) -> None:
+        bucket = self.bucket_for(url)
+        if status_code is None or status_code in OVERLOAD_STATUS_CODES:
+            reason = f"HTTP {status_code}" if status_code else "timeout/connection error"
+            self._decrease(url, bucket, self.decrease_factor, reason)
+        elif latency > self.slow_latency:
+            self._decrease(url, bucket, self.slow_decrease_factor, f"slow response ({latency:.1f}s)")
+        elif status_code < 400:
+            with self._feedback_lock:
+                rate = min(self.max_rate, bucket.rate + self.additive_increase)
+                if rate != bucket.rate:
+                    bucket.set_rate(rate)
+
+        # After any rate change, so the pause lasts exactly ``retry_after``
+        if retry_after:
+            bucket.pause(retry_after)
+
+    def _decrease(self, url: str, bucket: TokenBucket, factor: float, reason: str) -> None:
+        host = self.host(url)
+        now = time.monotonic()
+        with self._feedback_lock:
+            if now - self._last_decrease.get(host, float("-inf")) < self.cooldown:
+                return
+            self._last_decrease[host] = now
+            old_rate = bucket.rate
+            bucket.set_rate(max(self.min_rate, old_rate * factor))
+            self.decreases += 1
+        logger.info(f"Slowing down {host}: {old_rate:.2f} -> {bucket.rate:.2f} requests/s ({reason})")
@@ -0,0 +1,192 @@
+"""
+Offline Re-parse
+================
+
+Rebuilds a ``snwk_competition_results_*.json`` file from the raw page archive
+written by the scraper, without any network traffic. Use it after fixing a
+parser bug to regenerate old data.
+
+The scrape is replayed against the archive: yearly listings, competition
+pages and result subpages are read back from it (the latest version, or the
+latest one fetched before ``--as-of``), and result pages are parsed on the
+same process pool pipeline as a live run.
+
+Usage:
+    nw-reparse                                   # every archived year
+    nw-reparse --years 2024 2025 --output rebuilt.json
+    nw-reparse --as-of 2025-10-08T05:03:03       # pages as they were then
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import requests
+
+from nw_stats.data_collection import scrape_data
+from nw_stats.data_collection.concurrency import ordered_map, pipelined_map
+from nw_stats.data_collection.http_client import RequestStats
+from nw_stats.data_collection.journal import write_json_array
+from nw_stats.data_collection.page_archive import PageArchive
+from nw_stats.data_collection.parsers import parse_fetched_competition
+
+logger = logging.getLogger(__name__)
+
+Config = scrape_data.Config
+
+# Outside RESULTS_GLOB, so the index, compaction, Parquet and result store
+# builds do not pick the rebuilt copy up next to the originals
+REPARSED_PREFIX = "snwk_reparsed_results"
+
+
+class ArchiveClient:
+    """
+    Stand-in for :class:`HttpClient` that answers every request from a page archive.
+
+    Requests that were never archived get a 404 response.
+
+    Args:
+        archive: Archive to read pages from
+        as_of: Only serve versions fetched at or before this Unix time
+    """
+
+    def __init__(self, archive: PageArchive, as_of: Optional[float] = None):
+        self.archive = archive
+        self.as_of = as_of
+        # Attributes the scraper reads from HttpClient; nothing is paced, cached or measured
+        self.rate_limiter = None
+        self.cache = None
+        self.metrics = None
+        self.stats = RequestStats()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        page = self.archive.get(method, url, kwargs.get("data"), self.as_of)
+        if page is None:
+            response = requests.Response()
+            response.status_code = 404
+            response.reason = "Not archived"
+            response.url = url
+            response._content = b""
+        else:
+            response = page.to_response()
+        self.stats.record(time.perf_counter() - start, len(response.content), failed=page is None)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+def archived_years(archive: PageArchive) -> List[int]:
+    """Years with an archived listing of ``Config.BASE_URL``, newest first."""
+    years = set()
+    for _, url, body in archive.iter_requests("POST"):
+        if url != Config.BASE_URL:
+            continue
+        year = parse_qs(body).get("year", [""])[0]
+        if year.isdigit():
+            years.add(int(year))
+    return sorted(years, reverse=True)
+
+
+def reparse(output_path: Optional[Path] = None, years: Optional[List[int]] = None,
+            as_of: Optional[float] = None) -> Optional[Path]:
+    """
+    Rebuild competition results from the page archive.
+
+    Args:
+        output_path: Results file to write, defaults to a timestamped
+            ``snwk_reparsed_results_*.json`` in the data directory. The
+            name deliberately does not match ``RESULTS_GLOB``: a rebuilt copy
+            is reviewed before it replaces the originals, and is never read
+            as collected results next to them
+        years: Years to rebuild, defaults to every archived year
+        as_of: Use pages as they were at this Unix time
+
+    Returns:
+        Path of the written results file, or None if there was nothing to rebuild
+    """
+    archive = PageArchive(Config.ARCHIVE_DIR)
+    client = ArchiveClient(archive, as_of)
+    if years is None:
+        years = archived_years(archive)
+    if not years:
+        logger.warning(f"No archived listings for {Config.BASE_URL} in {Config.ARCHIVE_DIR}")
+        archive.close()
+        return None
+
+    # The scraper functions use the module-level client
+    live_client = scrape_data.http_client
+    scrape_data.http_client = client
+    try:
+        competitions = scrape_data.scrape_all_competitions(years)
+        archived = [c for c in competitions if archive.contains("GET", c["url"], as_of=as_of)]
+        if len(archived) < len(competitions):
+            logger.info(f"{len(competitions) - len(archived)} listed competitions are not in the archive")
+        logger.info(f"Re-parsing {len(archived)} competitions from {Config.ARCHIVE_DIR}")
+
+        subpages = ordered_map(
+            scrape_data.collect_competition_subpages, archived, Config.MAX_CONCURRENT_REQUESTS
+        )
+
+        def fetch_pages(subpage_data: Dict):
+            return subpage_data, scrape_data.fetch_competition_pages(subpage_data)
+
+        results = pipelined_map(
+            fetch_pages,
+            partial(parse_fetched_competition, time_seconds=Config.STORE_TIME_SECONDS),
+            subpages,
+            fetch_workers=Config.MAX_CONCURRENT_REQUESTS,
+            parse_workers=Config.PARSE_WORKERS,
+            max_pending=Config.PARSE_QUEUE_SIZE,
+        )
+        if output_path is None:
+            output_path = scrape_data.timestamped_path(REPARSED_PREFIX)
+        count = write_json_array((result for _, result, _ in results if result is not None), output_path)
+    finally:
+        scrape_data.http_client = live_client
+        client.close()
+
+    stats = client.stats.summary()
+    logger.info(
+        f"Rebuilt {count} competitions into {output_path} from {stats['requests']} archived pages "
+        f"({stats['failures']} missing)"
+    )
+    return Path(output_path)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments for nw-reparse."""
+    parser = argparse.ArgumentParser(description="Rebuild SNWK competition results from the page archive.")
+    parser.add_argument("--years", type=int, nargs="+", help="years to rebuild (default: every archived year)")
+    parser.add_argument("--as-of", help="ISO date/time; use pages as they were archived at that time")
+    parser.add_argument("--output", type=Path, help="results file to write")
+    parser.add_argument("--parse-workers", type=int, help="parse processes, 0 parses in the main process")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.parse_workers is not None:
+        Config.PARSE_WORKERS = args.parse_workers
+    as_of = datetime.fromisoformat(args.as_of).timestamp() if args.as_of else None
+
+    start = time.perf_counter()
+    output_path = reparse(args.output, args.years, as_of)
+    if output_path is not None:
+        logger.info(f"Re-parse finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+On-Disk HTTP Response Cache
+===========================
+
+Content-addressed cache for scraper responses. Entries are keyed by a hash of
+the request method, URL and POST body, so repeat and resumed runs only hit the
+network for pages that have actually changed.
+
+- Bodies are stored as individual files, metadata in a small SQLite index
+- Entries younger than the TTL are served without any request
+- Stale entries are revalidated with ETag / Last-Modified when available
+- Total body size is bounded with least-recently-used eviction
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+RequestBody = Union[None, str, bytes, Dict]
+
+
+def encode_body(body: RequestBody) -> bytes:
+    """
+    Encode a request body for keying.
+
+    Dictionary bodies are encoded with sorted keys so equivalent form posts
+    map to the same entry.
+    """
+    if isinstance(body, dict):
+        body = urlencode(sorted(body.items()))
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return body or b""
+
+
+def cache_key(method: str, url: str, body: RequestBody = None) -> str:
+    """Build the cache key for a request from its method, URL and encoded body."""
+    body = encode_body(body)
+    digest = hashlib.sha256()
+    digest.update(method.upper().encode("ascii"))
+    digest.update(b"\n")
+    digest.update(url.encode("utf-8"))
+    digest.update(b"\n")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class CacheEntry:
+    """A cached response body and the metadata needed to revalidate it."""
+
+    def __init__(self, key: str, url: str, body: bytes, headers: Dict, encoding: Optional[str],
+                 etag: Optional[str], last_modified: Optional[str], stored_at: float):
+        self.key = key
+        self.url = url
+        self.body = body
+        self.headers = headers
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        return time.time() - self.stored_at < ttl_seconds
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a ``requests.Response`` equivalent to the original one."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response._content = self.body
+        return response
+
+
+class ResponseCache:
+    """
+    Size-bounded on-disk response cache.
+
+    Args:
+        directory: Directory holding the index and body files
+        ttl_seconds: Age after which entries must be revalidated
+        max_bytes: Maximum total size of stored bodies
+    """
+
+    def __init__(self, directory: Path, ttl_seconds: float = 6 * 3600, max_bytes: int = 500 * 1024 ** 2):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.directory / "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._db.commit()
+
+    def _body_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.body"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for ``key`` regardless of age, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, headers, encoding, etag, last_modified, stored_at FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                body = self._body_path(key).read_bytes()
+            except FileNotFoundError:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+        url, headers, encoding, etag, last_modified, stored_at = row
+        return CacheEntry(key, url, body, json.loads(headers), encoding, etag, last_modified, stored_at)
+
+    def put(self, key: str, response: requests.Response) -> None:
+        """Store a successful response under ``key``."""
+        body = response.content
+        path = self._body_path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        headers = {k: v for k, v in response.headers.items() if k.lower() == "content-type"}
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, response.url, json.dumps(headers), response.encoding,
+                    response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                    now, now, len(body),
+                ),
+            )
+            self._db.commit()
+            self._evict()
+
+    def refresh(self, key: str) -> None:
+        """Mark an entry as fresh again after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                self._body_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._db.commit()
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup outcome: ``hit``, ``miss`` or ``revalidated``."""
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
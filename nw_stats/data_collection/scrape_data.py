@@ -18,29 +18,127 @@ Author: Loke Nilsson
 Date: 2025-10-07
 """
 
+import argparse
 import json
 import logging
+import os
 import re
 import requests
-import time
+import threading
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional, Set
-import glob
+from bs4 import SoupStrainer
+from typing import Iterable, List, Dict, Optional, Set
 
 from nw_stats.config import ProjectPaths
+from nw_stats.data import compaction, entities, parquet_store, result_store
+from nw_stats.data_collection.competition_index import RESULTS_GLOB, CompetitionIndex, extract_competition_id
+from nw_stats.data_collection.concurrency import ordered_map, pipelined_map
+from nw_stats.data_collection.http_client import HttpClient
+from nw_stats.data_collection.journal import STAGE_RESULTS, ScrapeJournal, write_json_array
+from nw_stats.data_collection.listing_watermarks import ListingWatermarks
+from nw_stats.data_collection.metrics import RunMetrics
+from nw_stats.data_collection.page_archive import PageArchive
+from nw_stats.data_collection.parsers import (
+    build_competition_results,
+    make_soup,
+    parse_fetched_competition,
+)
+from nw_stats.data_collection.rate_limit import AdaptiveRateLimiter, HostRateLimiter
+from nw_stats.data_collection.response_cache import ResponseCache
+
+
+class DataPath:
+    """
+    A path under ``Config.DATA_DIR``, resolved each time it is read.
+
+    Derived paths follow a changed ``DATA_DIR`` (e.g. a benchmark's temporary
+    directory) instead of keeping the value ``DATA_DIR`` had when ``Config``
+    was created. Assigning the attribute on ``Config`` still overrides it.
+
+    Args:
+        relative: Location relative to the data directory; a path under
+            ``ProjectPaths.DATA`` is taken relative to it
+    """
+
+    def __init__(self, relative):
+        relative = Path(relative)
+        self.relative = relative.relative_to(ProjectPaths.DATA) if relative.is_absolute() else relative
+
+    def __get__(self, instance, owner) -> Path:
+        return owner.DATA_DIR / self.relative
 
 
 # Configuration
 class Config:
-    BASE_URL = "https://www.snwktavling.se/?page=resultat"
+    # Site root without trailing slash; point it at a replay server to run offline
+    SITE_URL = "https://www.snwktavling.se"
+    BASE_URL = f"{SITE_URL}/?page=resultat"
     YEARS_TO_SCRAPE = [2025, 2024, 2023, 2022, 2021, 2020]
-    REQUEST_DELAY_SECONDS = 2.0
-    SUBPAGE_DELAY_SECONDS = 0.5
+    # Politeness: requests per second per host, shared by all workers. With
+    # ADAPTIVE_RATE_LIMIT the rate starts at REQUESTS_PER_SECOND, climbs towards
+    # MAX_REQUESTS_PER_SECOND while the site responds quickly and is cut on
+    # 429/503, timeouts or responses slower than SLOW_RESPONSE_SECONDS.
+    REQUESTS_PER_SECOND = 2.0
+    ADAPTIVE_RATE_LIMIT = True
+    MIN_REQUESTS_PER_SECOND = 0.2
+    MAX_REQUESTS_PER_SECOND = 5.0
+    SLOW_RESPONSE_SECONDS = 2.0
+    RATE_LIMIT_BURST = 1
+    MAX_CONCURRENT_REQUESTS = 4
+    # Result pages are parsed on a process pool; 0 parses in the main process
+    PARSE_WORKERS = os.cpu_count() or 1
+    # Fetched competitions allowed to wait for parsing (bounds memory)
+    PARSE_QUEUE_SIZE = 32
     COMPETITION_TYPES = ["alla"]
     REQUEST_TIMEOUT = 30
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_SECONDS = 1.0
+    # Every *_DIR/*_PATH below is a DataPath under DATA_DIR
     DATA_DIR = ProjectPaths.DATA
+    # Journal and checkpoint of the current run, used by --resume
+    RUN_DIR = DataPath(".scrape_run")
+    # Listings of years older than this many years before the current one are
+    # treated as frozen and only re-fetched every LISTING_RECHECK_DAYS
+    LISTING_HORIZON_YEARS = 1
+    LISTING_RECHECK_DAYS = 30
+    
+    # On-disk response cache; stale pages are revalidated with ETag/Last-Modified
+    USE_RESPONSE_CACHE = True
+    CACHE_DIR = DataPath(".http_cache")
+    CACHE_TTL_SECONDS = 6 * 3600
+    CACHE_MAX_BYTES = 500 * 1024 ** 2
+    
+    # Compressed archive of every fetched page, re-parsed offline by nw-reparse
+    USE_PAGE_ARCHIVE = True
+    ARCHIVE_DIR = DataPath("page_archive")
+    
+    # Store each participant's time as numeric seconds (time_seconds) next to
+    # the original "MM:SS,ss" string
+    STORE_TIME_SECONDS = True
+    
+    # Flattened participants as Parquet partitioned by year/klass/typ (needs pyarrow)
+    WRITE_PARQUET_DATASET = True
+    PARQUET_DATASET_DIR = DataPath(ProjectPaths.PARTICIPANTS_DATASET)
+    
+    # Merge the timestamped results files into one deduplicated dataset
+    COMPACT_RESULTS = True
+    COMPACTED_DIR = DataPath(ProjectPaths.COMPACTED_RESULTS)
+    
+    # Dog/handler/judge/club/competition tables with stable integer ids and a
+    # fact table of starts, rebuilt from the compacted dataset (needs pyarrow)
+    WRITE_ENTITY_TABLES = True
+    ENTITY_TABLES_DIR = DataPath(ProjectPaths.ENTITY_TABLES)
+    
+    # SQLite store of normalised results with indexes for point lookups
+    WRITE_RESULT_STORE = True
+    RESULT_STORE_PATH = DataPath(ProjectPaths.RESULT_STORE)
+    
+    # Per-run JSON metrics reports; set PROMETHEUS_TEXTFILE to also export them
+    # for node_exporter's textfile collector
+    METRICS_DIR = DataPath("metrics")
+    PROMETHEUS_TEXTFILE: Optional[Path] = None
     
     REQUEST_HEADERS = {
         "User-Agent": "snwk-statistics-scraper/1.0 ",
@@ -68,6 +166,49 @@ def setup_logging():
 
 logger = setup_logging()
 
+# Shared across all worker threads so the per-host rate holds for the whole
+# run. Built on first use, so importing this module creates no cache or
+# archive files; tools that replay or record a scrape assign their own.
+http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def build_http_client() -> HttpClient:
+    """Create an HttpClient with the rate limiter, response cache and page archive of ``Config``."""
+    if Config.ADAPTIVE_RATE_LIMIT:
+        rate_limiter = AdaptiveRateLimiter(
+            Config.REQUESTS_PER_SECOND,
+            min_rate=Config.MIN_REQUESTS_PER_SECOND,
+            max_rate=Config.MAX_REQUESTS_PER_SECOND,
+            burst=Config.RATE_LIMIT_BURST,
+            slow_latency=Config.SLOW_RESPONSE_SECONDS,
+        )
+    else:
+        rate_limiter = HostRateLimiter(Config.REQUESTS_PER_SECOND, Config.RATE_LIMIT_BURST)
+    return HttpClient(
+        headers=Config.REQUEST_HEADERS,
+        timeout=Config.REQUEST_TIMEOUT,
+        rate_limiter=rate_limiter,
+        max_retries=Config.MAX_RETRIES,
+        backoff_factor=Config.RETRY_BACKOFF_SECONDS,
+        pool_maxsize=Config.MAX_CONCURRENT_REQUESTS,
+        cache=ResponseCache(
+            Config.CACHE_DIR,
+            ttl_seconds=Config.CACHE_TTL_SECONDS,
+            max_bytes=Config.CACHE_MAX_BYTES,
+        ) if Config.USE_RESPONSE_CACHE else None,
+        archive=PageArchive(Config.ARCHIVE_DIR) if Config.USE_PAGE_ARCHIVE else None,
+    )
+
+
+def get_http_client() -> HttpClient:
+    """The shared client (``http_client``), built from ``Config`` on first use."""
+    global http_client
+    with _http_client_lock:
+        if http_client is None:
+            http_client = build_http_client()
+        return http_client
+
 
 def fetch_competitions_for_year(year: int, competition_type: str = "alla") -> List[Dict]:
     """
@@ -89,12 +230,7 @@ def fetch_competitions_for_year(year: int, competition_type: str = "alla") -> Li
     }
     
     try:
-        response = requests.post(
-            Config.BASE_URL,
-            data=post_data,
-            headers=Config.REQUEST_HEADERS,
-            timeout=Config.REQUEST_TIMEOUT
-        )
+        response = get_http_client().post(Config.BASE_URL, data=post_data)
         response.raise_for_status()
         
         json_response = json.loads(response.text)
@@ -104,7 +240,7 @@ def fetch_competitions_for_year(year: int, competition_type: str = "alla") -> Li
             return []
             
         html_content = json_response["body"]
-        soup = BeautifulSoup(html_content, "html.parser")
+        soup = make_soup(html_content, SoupStrainer("a"))
         
         competitions = []
         for anchor in soup.find_all("a", href=True):
@@ -115,7 +251,7 @@ def fetch_competitions_for_year(year: int, competition_type: str = "alla") -> Li
             if any(keyword in href.lower() for keyword in ["page=showres", "page=", "tavling"]):
                 # Convert relative URLs to absolute
                 if href.startswith("?"):
-                    full_url = f"https://www.snwktavling.se/{href}"
+                    full_url = f"{Config.SITE_URL}/{href}"
                 else:
                     full_url = href
                     
@@ -140,27 +276,63 @@ def fetch_competitions_for_year(year: int, competition_type: str = "alla") -> Li
         return []
 
 
-def scrape_all_competitions() -> List[Dict]:
+def scrape_all_competitions(years: Optional[List[int]] = None,
+                            watermarks: Optional[ListingWatermarks] = None,
+                            full: bool = False) -> List[Dict]:
     """
     Main function to scrape competitions from all configured years and types.
     
+    Args:
+        years: Years to scrape, defaults to ``Config.YEARS_TO_SCRAPE``
+        watermarks: Listing watermarks; frozen listings are skipped and
+            unchanged listings only return their unresolved competitions
+        full: Fetch every listing and return every competition, but still
+            record the watermarks
+        
     Returns:
         Complete list of all competitions found
     """
+    if years is None:
+        years = Config.YEARS_TO_SCRAPE
     all_competitions = []
     
-    logger.info(f"Starting competition scrape for years: {Config.YEARS_TO_SCRAPE}")
-    logger.info(f"Request delay: {Config.REQUEST_DELAY_SECONDS}s between requests")
+    logger.info(f"Starting competition scrape for years: {years}")
+    limiter = get_http_client().rate_limiter
+    if isinstance(limiter, AdaptiveRateLimiter):
+        logger.info(
+            f"Rate limit: adaptive, starting at {limiter.rate_per_second} requests/s per host "
+            f"({limiter.min_rate}-{limiter.max_rate}), {Config.MAX_CONCURRENT_REQUESTS} concurrent workers"
+        )
+    elif limiter is not None:
+        logger.info(
+            f"Rate limit: {limiter.rate_per_second} requests/s per host, "
+            f"{Config.MAX_CONCURRENT_REQUESTS} concurrent workers"
+        )
     
-    for i, year in enumerate(Config.YEARS_TO_SCRAPE):
-        for competition_type in Config.COMPETITION_TYPES:
-            competitions = fetch_competitions_for_year(year, competition_type)
-            all_competitions.extend(competitions)
-            
-            # Add respectful delay between requests (except for the last one)
-            if i < len(Config.YEARS_TO_SCRAPE) - 1:
-                logger.info(f"Waiting {Config.REQUEST_DELAY_SECONDS}s before next request")
-                time.sleep(Config.REQUEST_DELAY_SECONDS)
+    listings = [
+        (year, competition_type)
+        for year in years
+        for competition_type in Config.COMPETITION_TYPES
+    ]
+    if watermarks is not None and not full:
+        frozen = [
+            listing for listing in listings
+            if watermarks.is_frozen(*listing, Config.LISTING_HORIZON_YEARS, Config.LISTING_RECHECK_DAYS)
+        ]
+        if frozen:
+            logger.info(f"Skipping {len(frozen)} frozen listings: {', '.join(str(year) for year, _ in frozen)}")
+            listings = [listing for listing in listings if listing not in frozen]
+    
+    for (year, competition_type), competitions in zip(listings, ordered_map(
+        lambda listing: fetch_competitions_for_year(*listing),
+        listings,
+        Config.MAX_CONCURRENT_REQUESTS,
+    )):
+        if watermarks is not None:
+            considered = watermarks.observe(year, competition_type, competitions)
+            if not full:
+                competitions = considered
+        all_competitions.extend(competitions)
     
     return all_competitions
 
@@ -174,10 +346,10 @@ def extract_competition_subpages(competition_url: str, headers: Optional[Dict] =
         headers = Config.REQUEST_HEADERS
     
     try:
-        response = requests.get(competition_url, headers=headers, timeout=Config.REQUEST_TIMEOUT)
+        response = get_http_client().get(competition_url, headers=headers)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = make_soup(response.text, SoupStrainer("button"))
         
         competition_data = {
             "main_url": competition_url,
@@ -201,11 +373,11 @@ def extract_competition_subpages(competition_url: str, headers: Optional[Dict] =
                     
                     # Convert to absolute URL
                     if relative_url.startswith("?"):
-                        full_url = f"https://www.snwktavling.se/{relative_url}"
+                        full_url = f"{Config.SITE_URL}/{relative_url}"
                     elif relative_url.startswith("/"):
-                        full_url = f"https://www.snwktavling.se{relative_url}"
+                        full_url = f"{Config.SITE_URL}{relative_url}"
                     elif not relative_url.startswith("http"):
-                        full_url = f"https://www.snwktavling.se/{relative_url}"
+                        full_url = f"{Config.SITE_URL}/{relative_url}"
                     else:
                         full_url = relative_url
                     
@@ -229,321 +401,81 @@ def extract_competition_subpages(competition_url: str, headers: Optional[Dict] =
         }
 
 
-def parse_competition_results(comp_dict: Dict, headers: Optional[Dict] = None) -> Optional[Dict]:
+def collect_competition_subpages(competition: Dict) -> Dict:
     """
-    Parse competition results from subpages with better text extraction.
+    Extract a competition's subpages and attach its listing metadata.
+    
+    Args:
+        competition: Competition from the yearly listing
+        
+    Returns:
+        Subpage data as stored in the journal and the subpages file
     """
-    if headers is None:
-        headers = Config.REQUEST_HEADERS
+    subpage_data = extract_competition_subpages(competition["url"])
+    
+    # Add original competition metadata
+    subpage_data.update({
+        "original_text": competition.get("text", ""),
+        "year": competition.get("year", ""),
+        "type": competition.get("type", "")
+    })
+    return subpage_data
 
-    # ELITE competitions do not have subpages
-    if not comp_dict['subpages']:
-        return None
-        
-    competition_data = {
-        "url": comp_dict["subpages"][0]['url'],
-        "resultat": [],
-    }
 
-    # Save competition metadata with robust validation
-    info_text = comp_dict.get("original_text", "")
-    info_text_list = info_text.split()
-    
-    # Initialize with safe defaults
-    competition_data.update({
-        'datum': "",
-        'plats': "",
-        'typ': "",
-        'klass': "",
-        'arrangör': "",
-        'anordnare': ""
-    })
+def fetch_competition_pages(comp_dict: Dict, headers: Optional[Dict] = None) -> Optional[List[str]]:
+    """
+    Fetch the HTML of every result subpage of a competition.
     
-    if info_text_list:
-        try:
-            # Extract date (first element that looks like a date)
-            for item in info_text_list:
-                if re.match(r'\d{4}-\d{2}-\d{2}', item):
-                    competition_data['datum'] = item
-                    break
-            else:
-                # Fallback: use first element if it looks like a date format
-                if info_text_list and re.match(r'\d{2,4}[-/]\d{1,2}[-/]\d{2,4}', info_text_list[0]):
-                    competition_data['datum'] = info_text_list[0]
-            
-            # Extract location (second element, with validation)
-            if len(info_text_list) > 1:
-                # Skip invalid location values
-                potential_location = info_text_list[1]
-                if potential_location not in ['TEM', 'TSM', 'NW1', 'NW2', 'NW3', 'ELIT', 'Arrangör:', 'Anordnare:']:
-                    competition_data['plats'] = potential_location
-            
-            # Extract competition type (look for TEM, TSM, etc.)
-            for item in info_text_list:
-                if item in ['TEM', 'TSM']:
-                    competition_data['typ'] = item
-                    break
-            else:
-                # Fallback: check position 3 but validate it's actually a competition type
-                if len(info_text_list) > 3:
-                    potential_typ = info_text_list[3]
-                    # Only accept known competition types, reject invalid values like "-"
-                    if potential_typ in ['TEM', 'TSM', 'Utomhus', 'Inomhus']:
-                        competition_data['typ'] = potential_typ
-            
-            # Extract class (look for NW1, NW2, NW3, ELIT, etc.)
-            for item in info_text_list:
-                if re.match(r'^(NW[123]|ELIT)$', item):
-                    competition_data['klass'] = item
-                    break
-            else:
-                # Fallback: check position 5 but validate it's actually a class
-                if len(info_text_list) > 5:
-                    potential_klass = info_text_list[5]
-                    # Only accept known class values, reject invalid values like "Arrangör" and "Inomhus"
-                    if re.match(r'^(NW[123]|ELIT)$', potential_klass):
-                        competition_data['klass'] = potential_klass
-            
-            # Extract organizer (between 'Arrangör:' and 'Anordnare:')
-            try:
-                start_arr = info_text_list.index('Arrangör:') + 1
-                try:
-                    end_arr = info_text_list.index('Anordnare:')
-                    competition_data['arrangör'] = " ".join(info_text_list[start_arr:end_arr])
-                except ValueError:
-                    # No 'Anordnare:' found, take up to 5 words after 'Arrangör:'
-                    competition_data['arrangör'] = " ".join(info_text_list[start_arr:start_arr+5])
-            except ValueError:
-                # No 'Arrangör:' found
-                pass
-            
-            # Extract coordinator (everything after 'Anordnare:')
-            try:
-                start_anor = info_text_list.index('Anordnare:') + 1
-                competition_data['anordnare'] = " ".join(info_text_list[start_anor:])
-            except ValueError:
-                # No 'Anordnare:' found
-                pass
-                
-        except Exception as e:
-            logger.warning(f"Failed to parse metadata for competition. Error: {e}")
-            logger.warning(f"Text was: {info_text}")
-            # Keep the safe defaults we set earlier
-
-    # Go through moments of competition - TOT, M1, M2, M3, M4
-    search_type = ""
+    Returns:
+        Page HTML in subpage order, or None if any page could not be fetched
+    """
+    if headers is None:
+        headers = Config.REQUEST_HEADERS
     
+    pages_html = []
     for page in comp_dict['subpages']:
         url = page['url']
-        result_dict = {}
-        
         try:
-            response = requests.get(url, headers=headers, timeout=Config.REQUEST_TIMEOUT)
+            response = get_http_client().get(url, headers=headers)
             response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Add respectful delay between sub-page requests
-            time.sleep(Config.SUBPAGE_DELAY_SECONDS)
-            
-            # Add what type of search with validation
-            if competition_data['typ'] == "TEM":
-                if not search_type and page['type'].split()[-1] == "total":
-                    result_dict['sök'] = "total"
-
-                    h2_headers = soup.find_all("h2")
-                    if h2_headers:
-                        extracted_search_type = h2_headers[-1].text.split()[-1]
-                        # Validate and clean the search type
-                        if extracted_search_type and extracted_search_type not in ['', 'total']:
-                            search_type = extracted_search_type
-                    
-                elif search_type and search_type.strip():  # Ensure search_type is not empty
-                    result_dict['sök'] = search_type
-
-            elif competition_data['typ'] == "TSM":
-                h2_headers = soup.find_all("h2")
-                raw_search_type = page['type'].split()[-1].removesuffix("sök")
-                
-                # Clean and standardize search type names
-                if raw_search_type == "Behållar":
-                    search_type = "Behållare"
-                elif raw_search_type == "Fordons":
-                    search_type = "Fordon"
-                elif raw_search_type and raw_search_type.strip():  # Not empty
-                    search_type = raw_search_type
-                else:
-                    search_type = ""
-
-                # Only add if search_type is valid and not empty
-                if search_type and search_type.strip():
-                    result_dict['sök'] = search_type
-
-            # Add referee information
-            if page['type'].split()[-1] == "total":
-                ref_div = soup.find("div", class_="domardiv")
-                if ref_div:
-                    text_list = ref_div.get_text().split()
-                    
-                    # Handle different formats
-                    if len(text_list) == 4:  # Simple format: "Domare Förnamn Efternamn"
-                        result_dict['domare'] = [f"{text_list[-2]} {text_list[-1]}"]
-                    elif len(text_list) == 8:  # Two refs, simple format
-                        result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}"]
-                    elif len(text_list) == 12:  # Three refs, simple format
-                        result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}", f"{text_list[-2]} {text_list[-1]}"]
-                    elif len(text_list) == 9:  # Two refs with numbered format: "Domare 1: Name Name Domare 2: Name Name"
-                        result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}"]
-                    elif len(text_list) == 13:  # Three refs with numbered format
-                        result_dict['domare'] = [f"{text_list[2]} {text_list[3]}", f"{text_list[6]} {text_list[7]}", f"{text_list[10]} {text_list[11]}"]
-                    else:
-                        # Try to extract judge names using regex for more flexible parsing
-                        import re
-                        judge_text = ref_div.get_text()
-                        # Pattern to match judge names after "Domare X:" or similar
-                        # Look for sequences like "Domare 1: Firstname Lastname"
-                        judge_pattern = r"Domare\s*\d*\s*:\s*([A-ZÅÄÖ][\w\-\s]+?)(?=\s*(?:Domare\s*\d*\s*:|$))"
-                        matches = re.findall(judge_pattern, judge_text, re.IGNORECASE)
-                        if matches:
-                            # Clean up the matches (remove extra whitespace)
-                            result_dict['domare'] = [match.strip() for match in matches]
-                        else:
-                            # Log the unexpected format for debugging
-                            print(f"Warning: Unexpected domardiv format with {len(text_list)} elements: {text_list}")
-                            print(f"Raw text: '{judge_text}'")
-                            result_dict['domare'] = ["okänd"]
-                else:
-                    # No domardiv found, set as unknown
-                    result_dict['domare'] = ["okänd"]
-            else: 
-                p = soup.find("p", string=re.compile("Domare"))
-                if p:
-                    match = re.search(r"Domare\s*[^:]*:\s*(.*)", p.get_text())
-                    if match:
-                        result_dict['domare'] = [match.group(1).strip()]
-                    else:
-                        # Found "Domare" paragraph but couldn't parse it
-                        print(f"Warning: Found Domare paragraph but couldn't parse: {p.get_text()}")
-                        result_dict['domare'] = ["okänd"]
-                else:
-                    # No Domare paragraph found, set as unknown
-                    result_dict['domare'] = ["okänd"]
-            
-            # Add results for this branch
-            branch_results = []
-            results_list = soup.find("ul")
-            if results_list:
-                participants = results_list.find_all("li")
-                
-                # Get results for each participant
-                for participant in participants:
-                    participant_results = {}
-                    # Get all text and work with it
-                    participant_text = participant.get_text()
-
-                    placement_match = re.search(r"Placering:\s*(\d+)", participant_text)
-                    if placement_match:
-                        participant_results["placement"] = int(placement_match.group(1))
-                
-                    # Look for pattern like "Name Surname & DogName"
-                    strong_tags = participant.find_all("strong")
-                    for strong in strong_tags:
-                        strong_text = strong.get_text().strip()
-                        if "&" in strong_text and "Placering" not in strong_text and "Totalpoäng" not in strong_text:
-                            if " & " in strong_text:
-                                handler, dog = strong_text.split(" & ", 1)
-                                participant_results["dog_call_name"] = dog.strip()
-                            break
-
-                    # Extract total scores
-                    total_points_match = re.search(r"Totalpoäng:\s*(\d+)", participant_text)
-                    points_match = re.search(r"Poäng:\s*(\d+)", participant_text)
-                    if total_points_match:
-                        participant_results["points"] = int(total_points_match.group(1))
-                    elif points_match:
-                        participant_results["points"] = int(points_match.group(1)) 
-
-                    # Faults count
-                    total_faults_match = re.search(r"Totalfel:\s*(\d+)", participant_text)
-                    faults_match = re.search(r"Fel:\s*(\d+)", participant_text)
-                    if total_faults_match:
-                        participant_results["faults"] = int(total_faults_match.group(1))
-                    elif faults_match: 
-                        participant_results["faults"] = int(faults_match.group(1))
-
-                    # Total time 
-                    total_time_match = re.search(r"Totaltid:\s*([\d:,]+)", participant_text)
-                    time_match = re.search(r"Tid:\s*([\d:,]+)", participant_text)
-                    if total_time_match:
-                        participant_results["time"] = total_time_match.group(1).strip()
-                    elif time_match:
-                        participant_results["time"] = time_match.group(1).strip()
-
-                    # Start number
-                    start_match = re.search(r"Startnr:\s*(\d+)", participant_text)
-                    if start_match:
-                        participant_results["start_number"] = int(start_match.group(1))
-
-                    # Handler name
-                    handler_match = re.search(r"Förare:\s*([^\n\r]+)", participant_text)
-                    if handler_match:
-                        participant_results["handler"] = handler_match.group(1).strip()
-
-                    # Dog name
-                    dog_match = re.search(r"Hund:\s*([^\n\r]+)", participant_text)
-                    if dog_match:
-                        participant_results["dog_full_name"] = dog_match.group(1).strip()
-
-                    # Dog breed
-                    breed_match = re.search(r"Ras:\s*([^\n\r]+)", participant_text)
-                    if breed_match:
-                        participant_results["dog_breed"] = breed_match.group(1).strip()
-
-                    branch_results.append(participant_results)
-
-                result_dict['tabell'] = branch_results
-                competition_data['resultat'].append(result_dict)
-
+            pages_html.append(response.text)
         except Exception as e:
-            logger.error(f"Error parsing competition {url}: {e}")
+            logger.error(f"Error fetching competition page {url}: {e}")
             return None
-        
-    return competition_data
+    return pages_html
 
 
-def get_existing_competition_urls() -> Set[str]:
+def parse_competition_results(comp_dict: Dict, headers: Optional[Dict] = None) -> Optional[Dict]:
     """
-    Get all competition URLs that have already been processed.
-    
-    Returns:
-        Set of URLs that have already been collected
+    Fetch and parse competition results from subpages.
     """
-    existing_urls = set()
-    
-    # Check existing result files
-    result_files = glob.glob(str(Config.DATA_DIR / "snwk_competition_results_*.json"))
+    # ELITE competitions do not have subpages
+    if not comp_dict['subpages']:
+        return None
     
-    for result_file in result_files:
-        try:
-            with open(result_file, "r", encoding="utf-8") as f:
-                results = json.load(f)
-                for result in results:
-                    if "url" in result:
-                        existing_urls.add(result["url"])
-        except Exception as e:
-            logger.warning(f"Error reading existing results file {result_file}: {e}")
+    pages_html = fetch_competition_pages(comp_dict, headers)
+    if pages_html is None:
+        return None
+    return build_competition_results(comp_dict, pages_html, time_seconds=Config.STORE_TIME_SECONDS)
+
+
+def get_existing_competition_index() -> CompetitionIndex:
+    """
+    Load the index of competitions that have already been processed.
     
-    logger.info(f"Found {len(existing_urls)} existing competition URLs")
-    return existing_urls
+    Returns:
+        CompetitionIndex with the ids of all collected competitions
+    """
+    return CompetitionIndex.load(Config.DATA_DIR)
 
 
-def find_new_competitions(all_competitions: List[Dict], existing_urls: Set[str]) -> List[Dict]:
+def find_new_competitions(all_competitions: List[Dict], existing_ids: Set[str]) -> List[Dict]:
     """
     Find competitions that haven't been processed yet.
     
     Args:
         all_competitions: List of all available competitions
-        existing_urls: Set of URLs that have already been processed
+        existing_ids: Competition ids (``arr=`` values) that have already been processed
         
     Returns:
         List of new competitions to process
@@ -551,27 +483,22 @@ def find_new_competitions(all_competitions: List[Dict], existing_urls: Set[str])
     new_competitions = []
     
     for competition in all_competitions:
-        # The URL in results data has additional parameters, so we need to match the base competition
-        comp_url = competition["url"]
-        
-        # Check if this competition has already been processed by looking for the base URL pattern
-        already_processed = False
-        for existing_url in existing_urls:
-            # Extract the competition identifier from both URLs for comparison
-            if "arr=" in comp_url and "arr=" in existing_url:
-                comp_id = comp_url.split("arr=")[1].split("&")[0]
-                existing_id = existing_url.split("arr=")[1].split("&")[0]
-                if comp_id == existing_id:
-                    already_processed = True
-                    break
-        
-        if not already_processed:
+        # The URL in results data has additional parameters, so match on the competition id
+        comp_id = extract_competition_id(competition["url"])
+        if comp_id is None or comp_id not in existing_ids:
             new_competitions.append(competition)
     
     logger.info(f"Found {len(new_competitions)} new competitions to process")
     return new_competitions
 
 
+def timestamped_path(filename_prefix: str) -> Path:
+    """Build a timestamped JSON path in the data directory."""
+    Config.DATA_DIR.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return Config.DATA_DIR / f"{filename_prefix}_{timestamp}.json"
+
+
 def save_data_with_timestamp(data: List[Dict], filename_prefix: str) -> str:
     """
     Save data to a JSON file with timestamp.
@@ -583,10 +510,7 @@ def save_data_with_timestamp(data: List[Dict], filename_prefix: str) -> str:
     Returns:
         Path to the saved file
     """
-    Config.DATA_DIR.mkdir(exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = Config.DATA_DIR / f"{filename_prefix}_{timestamp}.json"
+    filename = timestamped_path(filename_prefix)
     
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
@@ -595,95 +519,343 @@ def save_data_with_timestamp(data: List[Dict], filename_prefix: str) -> str:
     return str(filename)
 
 
-def main():
+def log_request_summary():
+    """Log request counts, retries, bytes and latency for this run."""
+    client = get_http_client()
+    stats = client.stats.summary()
+    logger.info(
+        f"HTTP requests: {stats['requests']} ({stats['retries']} retries, "
+        f"{stats['failures']} failed attempts), {stats['bytes_received'] / 1e6:.1f} MB received"
+    )
+    if stats["requests"]:
+        logger.info(
+            f"Request latency: mean {stats['latency_mean']:.2f}s, "
+            f"p50 {stats['latency_p50']:.2f}s, p95 {stats['latency_p95']:.2f}s, "
+            f"max {stats['latency_max']:.2f}s"
+        )
+    if isinstance(client.rate_limiter, AdaptiveRateLimiter):
+        rates = ", ".join(f"{host} {rate:.2f}/s" for host, rate in client.rate_limiter.rates().items())
+        logger.info(f"Adaptive rate limit: {client.rate_limiter.decreases} slow-downs, final rates: {rates}")
+    if client.cache is not None:
+        cache_stats = client.cache.summary()
+        logger.info(
+            f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['revalidated']} revalidated (304)"
+        )
+    if client.archive is not None:
+        archive_stats = client.archive.summary()
+        logger.info(
+            f"Page archive: {archive_stats['pages_added']} pages added "
+            f"({archive_stats['bytes_added'] / 1e6:.1f} MB compressed), "
+            f"{archive_stats['records']} archived in total"
+        )
+
+
+def update_parquet_dataset(new_results: Iterable[Dict]) -> None:
+    """
+    Add new results to the Parquet participants dataset.
+    
+    Results of competitions already in the dataset replace their rows, so
+    this is safe to repeat on a resumed run. The first time, or when the
+    dataset predates the ``competition_id`` column, the dataset is (re)built
+    from every results file in the data directory (including the one just
+    saved) so it is complete from the start.
+    """
+    if not parquet_store.pyarrow_available():
+        logger.warning("pyarrow is not installed, skipping the Parquet participants dataset")
+        return
+    
+    dataset_dir = Config.PARQUET_DATASET_DIR
+    try:
+        if parquet_store.dataset_exists(dataset_dir) and parquet_store.dataset_is_keyed(dataset_dir):
+            rows = parquet_store.write_participants(new_results, dataset_dir)
+        else:
+            result_files = sorted(Config.DATA_DIR.glob(RESULTS_GLOB))
+            logger.info(f"Creating the Parquet participants dataset from {len(result_files)} results files")
+            rows = parquet_store.build_dataset(result_files, dataset_dir, overwrite=True)
+        logger.info(f"Added {rows} participant rows to {dataset_dir}")
+    except Exception as e:
+        # The JSON results are already saved; the dataset can be rebuilt with
+        # python -m nw_stats.data.parquet_store build --overwrite
+        logger.error(f"Could not update the Parquet dataset {dataset_dir}: {e}")
+
+
+def compact_results() -> None:
+    """Append the competitions of new results files to the compacted dataset."""
+    try:
+        summary = compaction.compact(Config.DATA_DIR, Config.COMPACTED_DIR)
+        logger.info(
+            f"Compacted dataset {Config.COMPACTED_DIR} holds {summary.competitions} competitions "
+            f"({summary.records_appended} appended from {len(summary.inputs_merged)} files)"
+        )
+    except Exception as e:
+        # The JSON results are already saved; nw-compact merges them later
+        logger.error(f"Could not update the compacted dataset {Config.COMPACTED_DIR}: {e}")
+
+
+def update_entity_tables() -> None:
+    """Rebuild the entity tables from the compacted dataset, keeping existing ids."""
+    if not entities.pyarrow_available():
+        logger.warning("pyarrow is not installed, skipping the entity tables")
+        return
+    
+    try:
+        tables = entities.build_entities(compaction.CompactedResults(Config.COMPACTED_DIR), Config.ENTITY_TABLES_DIR)
+        logger.info(
+            f"Entity tables {Config.ENTITY_TABLES_DIR}: {len(tables.participants)} starts, "
+            f"{len(tables.dogs)} dogs, {len(tables.handlers)} handlers"
+        )
+    except Exception as e:
+        # Rebuilt with python -m nw_stats.data.entities build
+        logger.error(f"Could not update the entity tables {Config.ENTITY_TABLES_DIR}: {e}")
+
+
+def update_result_store(new_results: Iterable[Dict]) -> None:
+    """
+    Add new results to the SQLite result store.
+    
+    The first time, the store is built from every results file in the data
+    directory (including the one just saved) so it is complete from the start.
+    """
+    store_path = Config.RESULT_STORE_PATH
+    try:
+        if store_path.exists():
+            with result_store.ResultStore(store_path) as store:
+                rows = store.add_competitions(new_results)
+        else:
+            result_files = sorted(Config.DATA_DIR.glob(RESULTS_GLOB))
+            logger.info(f"Creating the result store from {len(result_files)} results files")
+            rows = result_store.build_store(result_files, store_path)
+        logger.info(f"Added {rows} participant rows to {store_path}")
+    except Exception as e:
+        # The JSON results are already saved; the store can be rebuilt with
+        # python -m nw_stats.data.result_store build --overwrite
+        logger.error(f"Could not update the result store {store_path}: {e}")
+
+
+def write_run_metrics(metrics: RunMetrics, prometheus_textfile: Optional[Path] = None) -> Path:
+    """
+    Write the run metrics report, and optionally a Prometheus textfile.
+    
+    Args:
+        metrics: Metrics of the finished run
+        prometheus_textfile: Path of the Prometheus textfile, if wanted
+        
+    Returns:
+        Path of the JSON metrics report
+    """
+    client = get_http_client()
+    if client.rate_limiter is not None:
+        metrics.summaries["rate_limit"] = {
+            "requests_per_second": client.rate_limiter.rates(),
+            "slow_downs": getattr(client.rate_limiter, "decreases", 0),
+        }
+    if client.cache is not None:
+        metrics.summaries["response_cache"] = client.cache.summary()
+    if client.archive is not None:
+        metrics.summaries["page_archive"] = client.archive.summary()
+    
+    timestamp = metrics.started_at.strftime("%Y%m%d_%H%M%S")
+    metrics_file = Config.METRICS_DIR / f"scrape_metrics_{timestamp}.json"
+    metrics.write_json(metrics_file)
+    logger.info(f"Run metrics written to {metrics_file}")
+    if prometheus_textfile is not None:
+        metrics.write_prometheus(prometheus_textfile)
+        logger.info(f"Prometheus metrics written to {prometheus_textfile}")
+    return metrics_file
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments for nw-scrape."""
+    parser = argparse.ArgumentParser(description="Collect new SNWK competition results.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run from its journal instead of starting over",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        type=Path,
+        help="also write the run metrics to this Prometheus textfile",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="fetch every listing, ignoring the listing watermarks of earlier runs",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
     """
     Main execution function that orchestrates the entire data collection process.
+    
+    Progress is journaled to ``Config.RUN_DIR`` as it happens, so an
+    interrupted run can be continued with ``--resume``.
     """
+    args = parse_args(argv)
     logger.info("Starting SNWK Competition Data Collection")
     logger.info("=" * 50)
     
+    journal = ScrapeJournal(Config.RUN_DIR)
+    metrics = RunMetrics()
+    client = get_http_client()
+    client.metrics = metrics
+    status = "failed"
+    
     try:
-        # Step 1: Get existing competition URLs
+        # Step 1: Get existing competition ids
         logger.info("Step 1: Checking existing data...")
-        existing_urls = get_existing_competition_urls()
-        
-        # Step 2: Fetch all current competitions
-        logger.info("Step 2: Fetching current competitions...")
-        all_competitions = scrape_all_competitions()
-        logger.info(f"Found {len(all_competitions)} total competitions")
-        
-        # Step 3: Find new competitions
-        logger.info("Step 3: Identifying new competitions...")
-        new_competitions = find_new_competitions(all_competitions, existing_urls)
-        
-        if not new_competitions:
-            logger.info("No new competitions found. Data collection is up to date.")
-            return
+        competition_index = get_existing_competition_index()
+        watermarks = ListingWatermarks.load(Config.DATA_DIR)
+        
+        if args.resume and journal.exists():
+            checkpoint = journal.load_checkpoint()
+            new_competitions = checkpoint["competitions"]
+            logger.info(
+                f"Resuming run started {checkpoint['started_at']} at stage '{checkpoint['stage']}' "
+                f"({len(new_competitions)} competitions)"
+            )
+        else:
+            if args.resume:
+                logger.info("No unfinished run to resume, starting a new one")
+            elif journal.exists():
+                logger.warning("Discarding journal of an unfinished run (use --resume to continue it)")
+            
+            # Step 2: Fetch all current competitions
+            logger.info("Step 2: Fetching current competitions...")
+            with metrics.stage("listing"):
+                all_competitions = scrape_all_competitions(watermarks=watermarks, full=args.full)
+            metrics.count("competitions_listed", len(all_competitions), stage="listing")
+            logger.info(f"Found {len(all_competitions)} total competitions")
+            
+            # Step 3: Find new competitions
+            logger.info("Step 3: Identifying new competitions...")
+            new_competitions = find_new_competitions(all_competitions, competition_index.ids)
+            
+            if not new_competitions:
+                watermarks.commit(competition_index, extract_competition_id)
+                logger.info("No new competitions found. Data collection is up to date.")
+                log_request_summary()
+                status = "completed"
+                return
+            
+            journal.start(new_competitions)
         
         logger.info(f"Processing {len(new_competitions)} new competitions...")
         
         # Step 4: Extract subpages for new competitions
         logger.info("Step 4: Extracting subpages for new competitions...")
-        new_subpages = []
-        
-        for i, competition in enumerate(new_competitions, 1):
-            logger.info(f"Processing subpages {i}/{len(new_competitions)}: {competition.get('text', '')[:50]}...")
-            
-            subpage_data = extract_competition_subpages(competition["url"])
-            
-            # Add original competition metadata
-            subpage_data.update({
-                "original_text": competition.get("text", ""),
-                "year": competition.get("year", ""),
-                "type": competition.get("type", "")
-            })
+        done_subpages = journal.completed_subpage_urls()
+        pending_competitions = [c for c in new_competitions if c["url"] not in done_subpages]
+        if done_subpages:
+            logger.info(f"Skipping {len(done_subpages)} competitions with subpages already in the journal")
+        
+        def collect_subpages(indexed_competition):
+            i, competition = indexed_competition
+            logger.info(f"Processing subpages {i}/{len(pending_competitions)}: {competition.get('text', '')[:50]}...")
+            return collect_competition_subpages(competition)
+        
+        with metrics.stage("subpages"):
+            for subpage_data in ordered_map(
+                collect_subpages,
+                enumerate(pending_competitions, 1),
+                Config.MAX_CONCURRENT_REQUESTS,
+            ):
+                journal.append_subpages(subpage_data)
+                metrics.count("competitions")
+            journal.set_stage(STAGE_RESULTS)
             
-            new_subpages.append(subpage_data)
-            
-            # Add delay between requests
-            if i < len(new_competitions):
-                time.sleep(Config.REQUEST_DELAY_SECONDS)
-        
-        # Save subpages data
-        subpages_file = save_data_with_timestamp(new_subpages, "snwk_new_subpages")
+            # Save subpages data
+            subpages_file = journal.output_path("subpages", lambda: timestamped_path("snwk_new_subpages"))
+            total_competitions = write_json_array(journal.iter_subpages(), subpages_file)
+            logger.info(f"Saved {total_competitions} items to {subpages_file}")
         
         # Step 5: Extract detailed results
         logger.info("Step 5: Extracting detailed results...")
-        new_results = []
-        
-        for i, subpage_data in enumerate(new_subpages, 1):
-            logger.info(f"Processing results {i}/{len(new_subpages)}: {subpage_data.get('original_text', '')[:50]}...")
-            
-            result = parse_competition_results(subpage_data)
-            if result:
-                new_results.append(result)
-            
-            # Add delay between competitions
-            time.sleep(Config.REQUEST_DELAY_SECONDS)
+        done_results = journal.completed_result_urls()
+        if done_results:
+            logger.info(f"Skipping {len(done_results)} competitions with results already in the journal")
+        
+        def fetch_results(indexed_subpages):
+            i, subpage_data = indexed_subpages
+            logger.info(f"Processing results {i}/{total_competitions}: {subpage_data.get('original_text', '')[:50]}...")
+            return subpage_data, fetch_competition_pages(subpage_data)
+        
+        # Competitions are fetched concurrently on threads and parsed on a
+        # process pool; each competition's subpages are parsed in order (TEM
+        # search types depend on the preceding total page). Pending work is
+        # streamed from the journal so memory stays flat.
+        pending_subpages = (
+            (i, subpage_data)
+            for i, subpage_data in enumerate(journal.iter_subpages(), 1)
+            if subpage_data["main_url"] not in done_results
+        )
+        with metrics.stage("results"):
+            for main_url, result, page_seconds in pipelined_map(
+                fetch_results,
+                partial(parse_fetched_competition, time_seconds=Config.STORE_TIME_SECONDS),
+                pending_subpages,
+                fetch_workers=Config.MAX_CONCURRENT_REQUESTS,
+                parse_workers=Config.PARSE_WORKERS,
+                max_pending=Config.PARSE_QUEUE_SIZE,
+            ):
+                journal.append_result(main_url, result)
+                metrics.record_parse(page_seconds)
+                metrics.count("competitions")
+                if result is None:
+                    metrics.count("competitions_without_results")
         
         # Step 6: Save new results
         logger.info("Step 6: Saving new results...")
-        results_file = save_data_with_timestamp(new_results, "snwk_competition_results")
+        with metrics.stage("save"):
+            # A resumed run rewrites the same file; the index, the compacted
+            # dataset, the Parquet dataset and the result store replace by competition
+            results_file = journal.output_path("results", lambda: timestamped_path("snwk_competition_results"))
+            new_results_count = write_json_array(journal.iter_results(), results_file)
+            logger.info(f"Saved {new_results_count} items to {results_file}")
+            competition_index.add((result["url"] for result in journal.iter_results()), results_file.name)
+            competition_index.save()
+            watermarks.commit(competition_index, extract_competition_id)
+            metrics.count("results_saved", new_results_count)
+            if Config.COMPACT_RESULTS:
+                compact_results()
+                if Config.WRITE_ENTITY_TABLES:
+                    update_entity_tables()
+            if Config.WRITE_PARQUET_DATASET:
+                update_parquet_dataset(journal.iter_results())
+            if Config.WRITE_RESULT_STORE:
+                update_result_store(journal.iter_results())
+        
+        # Generate summary statistics before the journal is removed
+        total_subpages = sum(len(comp["subpages"]) for comp in journal.iter_subpages())
+        journal.clear()
         
         # Final summary
         logger.info("=" * 50)
         logger.info("Data collection completed successfully!")
         logger.info(f"New competitions processed: {len(new_competitions)}")
-        logger.info(f"New results collected: {len(new_results)}")
+        logger.info(f"New results collected: {new_results_count}")
         logger.info(f"Subpages saved to: {subpages_file}")
         logger.info(f"Results saved to: {results_file}")
         
-        # Generate summary statistics
-        total_subpages = sum(len(comp["subpages"]) for comp in new_subpages)
         logger.info(f"Total sub-pages processed: {total_subpages}")
-        if new_subpages:
-            logger.info(f"Average sub-pages per competition: {total_subpages/len(new_subpages):.1f}")
+        if total_competitions:
+            logger.info(f"Average sub-pages per competition: {total_subpages/total_competitions:.1f}")
+        
+        log_request_summary()
+        status = "completed"
         
     except KeyboardInterrupt:
-        logger.info("Data collection interrupted by user")
+        status = "interrupted"
+        logger.info("Data collection interrupted by user (progress kept, rerun with --resume)")
     except Exception as e:
-        logger.error(f"Unexpected error during data collection: {e}")
+        logger.error(f"Unexpected error during data collection: {e} (rerun with --resume to continue)")
         raise
+    finally:
+        client.metrics = None
+        metrics.finish(status)
+        write_run_metrics(metrics, args.prometheus_textfile or Config.PROMETHEUS_TEXTFILE)
 
 
 if __name__ == "__main__":
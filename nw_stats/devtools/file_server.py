@@ -0,0 +1,231 @@
+"""
+Release Asset Server
+====================
+
+Local HTTP stand-in for GitHub Releases that serves the files of a directory
+with ``Range`` support, so the dashboard's dataset download can be tested
+without the real release. Interrupted connections can be injected to
+exercise resuming.
+
+Usage:
+    python -m nw_stats.data.dataset_cache checksum data/snwk_competition_results_20251008_050303.json
+    python -m nw_stats.devtools.file_server data/ --port 8766 --interrupt-after 1000000
+    NW_STATS_DATASET_URL=http://127.0.0.1:8766/snwk_competition_results_20251008_050303.json \\
+        streamlit run nw_stats/streamlit_app/streamlit_app.py
+"""
+
+import argparse
+import hashlib
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+SEND_CHUNK_BYTES = 64 * 1024
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range`` header.
+
+    Returns:
+        Inclusive ``(start, end)``, or None when the range cannot be satisfied
+
+    Raises:
+        ValueError: The header is not a single byte range
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError(f"Unsupported range {header!r}")
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+class FileServer:
+    """
+    Threaded HTTP server for the files of one directory.
+
+    Args:
+        directory: Directory to serve
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+        interrupt_after: Close the connection after this many body bytes of a response
+        interruptions: Number of responses to interrupt
+        latency: Fixed delay in seconds before every response
+    """
+
+    def __init__(self, directory: Path, host: str = "127.0.0.1", port: int = 0,
+                 interrupt_after: Optional[int] = None, interruptions: int = 1, latency: float = 0.0):
+        self.directory = Path(directory).resolve()
+        self.interrupt_after = interrupt_after
+        self.interruptions_left = interruptions if interrupt_after is not None else 0
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.requests_served = 0
+        self.range_requests = 0
+        self.interrupted = 0
+        self.bytes_sent = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _take_interruption(self, length: int) -> Optional[int]:
+        with self._lock:
+            if self.interruptions_left <= 0 or length <= self.interrupt_after:
+                return None
+            self.interruptions_left -= 1
+            self.interrupted += 1
+            return self.interrupt_after
+
+    def _resolve(self, request_path: str) -> Optional[Path]:
+        path = (self.directory / unquote(urlsplit(request_path).path).lstrip("/")).resolve()
+        if self.directory not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _error(self, status: int, message: str, extra_headers=()) -> None:
+                body = message.encode("utf-8")
+                self.send_response(status)
+                for name, value in extra_headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _serve(self) -> None:
+                if server.latency:
+                    time.sleep(server.latency)
+                path = server._resolve(self.path)
+                if path is None:
+                    self._error(404, "Not Found")
+                    return
+                stat = path.stat()
+                size = stat.st_size
+                etag = '"' + hashlib.sha1(f"{path.name}-{size}-{stat.st_mtime_ns}".encode()).hexdigest()[:16] + '"'
+
+                start, end, status = 0, size - 1, 200
+                range_header = self.headers.get("Range")
+                if range_header and self.headers.get("If-Range", etag) == etag:
+                    try:
+                        byte_range = parse_range(range_header, size)
+                    except ValueError:
+                        byte_range = (0, size - 1)
+                    if byte_range is None:
+                        self._error(416, "Range Not Satisfiable", [("Content-Range", f"bytes */{size}")])
+                        return
+                    start, end = byte_range
+                    status = 206
+                    with server._lock:
+                        server.range_requests += 1
+
+                length = end - start + 1
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(length))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", etag)
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                with server._lock:
+                    server.requests_served += 1
+                if self.command == "HEAD":
+                    return
+
+                limit = server._take_interruption(length)
+                remaining = length if limit is None else min(length, limit)
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    while remaining > 0:
+                        chunk = f.read(min(SEND_CHUNK_BYTES, remaining))
+                        if not chunk:
+                            break
+                        self.wfile.write(chunk)
+                        remaining -= len(chunk)
+                        with server._lock:
+                            server.bytes_sent += len(chunk)
+                if limit is not None:
+                    # Drop the connection mid-body, like a failed download
+                    self.close_connection = True
+                    self.wfile.flush()
+                    self.connection.close()
+
+            def do_GET(self):
+                self._serve()
+
+            def do_HEAD(self):
+                self._serve()
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> str:
+        """Serve in a background thread and return the server's base URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FileServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a directory like GitHub Releases, with Range support.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--interrupt-after", type=int, help="drop connections after this many body bytes")
+    parser.add_argument("--interruptions", type=int, default=1, help="number of responses to interrupt")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixed delay per response in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    server = FileServer(args.directory, args.host, args.port, args.interrupt_after, args.interruptions,
+                        args.latency)
+    logger.info(f"Serving {server.directory} on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+SNWK Replay Server
+==================
+
+Local HTTP stand-in for snwktavling.se that serves recorded listing,
+competition and result pages, so the scraper can be benchmarked and
+regression-tested without touching the live site.
+
+A recording is a directory with a ``recordings.json`` manifest and the page
+bodies under ``pages/``. Listing responses (``POST ?page=resultat``) are
+stored as plain HTML and wrapped in the site's ``{"body": ...}`` JSON when
+served. Latency and error rate can be configured to mimic a slow or failing
+server.
+
+Usage:
+    python -m nw_stats.devtools.replay_server synthesize recordings/
+    python -m nw_stats.devtools.replay_server serve recordings/ --latency 0.2 --error-rate 0.01
+    python -m nw_stats.devtools.replay_server record recordings/   # scrape the live site and record
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from requests.utils import requote_uri
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "recordings.json"
+LIVE_SITE_URL = "https://www.snwktavling.se"
+
+
+def request_key(method: str, path_query: str, body: Union[None, str, bytes, Dict] = None) -> str:
+    """
+    Build the lookup key for a request.
+
+    Form bodies are normalised (sorted fields) so the key does not depend on
+    the order the scraper encodes them in.
+    """
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    if isinstance(body, str):
+        body = parse_qsl(body, keep_blank_values=True)
+    if isinstance(body, dict):
+        body = list(body.items())
+    encoded_body = urlencode(sorted(body)) if body else ""
+    return f"{method.upper()} {path_query} {encoded_body}".rstrip()
+
+
+def _path_query(url: str) -> str:
+    # Quoted the way requests sends it, which is what the server sees
+    parts = urlsplit(requote_uri(url))
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+class RecordingWriter:
+    """
+    Writes pages into a recording directory.
+
+    Args:
+        directory: Recording directory, created if missing
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.pages_dir = self.directory / "pages"
+        self.pages_dir.mkdir(parents=True, exist_ok=True)
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        manifest = self.directory / MANIFEST_FILENAME
+        if manifest.exists():
+            with open(manifest, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)["entries"]
+
+    def add(self, method: str, url: str, body: Union[None, str, bytes, Dict], content: str,
+            json_body: bool = False) -> None:
+        """
+        Record one page.
+
+        Args:
+            method: HTTP method of the request
+            url: Requested URL (only path and query are kept)
+            body: Form body of the request
+            content: Page HTML
+            json_body: Serve the page wrapped in ``{"body": ...}``
+        """
+        key = request_key(method, _path_query(url), body)
+        filename = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24] + ".html"
+        (self.pages_dir / filename).write_text(content, encoding="utf-8")
+        with self._lock:
+            self.entries[key] = {"file": filename, "json_body": json_body}
+
+    def save(self) -> None:
+        with self._lock:
+            with open(self.directory / MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f, indent=2, ensure_ascii=False)
+
+
+class ReplayServer:
+    """
+    Threaded HTTP server replaying a recording.
+
+    Args:
+        recordings_dir: Directory written by :class:`RecordingWriter`
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+        latency: Fixed delay in seconds added to every response
+        latency_jitter: Extra random delay, uniform in ``[0, latency_jitter]``
+        error_rate: Probability of answering 503 instead of the page
+        seed: Seed for the jitter and error injection
+    """
+
+    def __init__(self, recordings_dir: Path, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.recordings_dir = Path(recordings_dir)
+        with open(self.recordings_dir / MANIFEST_FILENAME, "r", encoding="utf-8") as f:
+            self.entries: Dict[str, Dict] = json.load(f)["entries"]
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.not_found = 0
+        self.bytes_sent = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.requests_served += 1
+                    server.bytes_sent += len(body)
+
+            def _serve(self, body: bytes = b"") -> None:
+                delay, fail = server._draw()
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    with server._lock:
+                        server.errors_injected += 1
+                    self._respond(503, b"Service Unavailable", "text/plain")
+                    return
+
+                entry = server.entries.get(request_key(self.command, self.path, body))
+                if entry is None:
+                    with server._lock:
+                        server.not_found += 1
+                    self._respond(404, b"Not recorded", "text/plain")
+                    return
+
+                content = (server.recordings_dir / "pages" / entry["file"]).read_text(encoding="utf-8")
+                content = content.replace(LIVE_SITE_URL, server.url)
+                if entry.get("json_body"):
+                    payload = json.dumps({"body": content}).encode("utf-8")
+                    self._respond(200, payload, "application/json; charset=utf-8")
+                else:
+                    self._respond(200, content.encode("utf-8"), "text/html; charset=utf-8")
+
+            def do_GET(self):
+                self._serve()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._serve(self.rfile.read(length))
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> str:
+        """Serve in a background thread and return the server's base URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def record_live_scrape(directory: Path, argv=None) -> None:
+    """
+    Run the scraper against the live site and record every page it fetches.
+
+    Args:
+        directory: Recording directory
+        argv: Arguments passed on to the scraper's ``main``
+    """
+    from nw_stats.data_collection import scrape_data
+
+    writer = RecordingWriter(directory)
+    client = scrape_data.get_http_client()
+    original_request = client.request
+
+    def recording_request(method, url, **kwargs):
+        response = original_request(method, url, **kwargs)
+        if response.status_code == 200:
+            if "page=resultat" in url and method.upper() == "POST":
+                writer.add(method, url, kwargs.get("data"), response.json().get("body", ""), json_body=True)
+            else:
+                writer.add(method, url, kwargs.get("data"), response.text)
+        return response
+
+    client.request = recording_request
+    try:
+        scrape_data.main(argv)
+    finally:
+        client.request = original_request
+        writer.save()
+        logger.info(f"Recorded {len(writer.entries)} pages to {directory}")
+
+
+def main():
+    from nw_stats.devtools.synthetic_site import write_synthetic_site
+
+    parser = argparse.ArgumentParser(description="Replay recorded SNWK pages locally.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="serve a recording")
+    serve.add_argument("directory", type=Path)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="fixed delay per response in seconds")
+    serve.add_argument("--jitter", type=float, default=0.0, help="extra random delay per response in seconds")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+
+    synthesize = subparsers.add_parser("synthesize", help="write a synthetic recording")
+    synthesize.add_argument("directory", type=Path)
+    synthesize.add_argument("--years", type=int, nargs="+", default=[2025, 2024])
+    synthesize.add_argument("--competitions", type=int, default=20, help="competitions per year")
+    synthesize.add_argument("--participants", type=int, default=40, help="starters per class")
+
+    record = subparsers.add_parser("record", help="scrape the live site and record every page")
+    record.add_argument("directory", type=Path)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "synthesize":
+        write_synthetic_site(args.directory, args.years, args.competitions, args.participants)
+        logger.info(f"Wrote synthetic recording to {args.directory}")
+    elif args.command == "record":
+        record_live_scrape(args.directory, [])
+    else:
+        server = ReplayServer(args.directory, args.host, args.port, args.latency, args.jitter, args.error_rate)
+        logger.info(f"Replaying {len(server.entries)} pages on {server.url}")
+        try:
+            server._httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
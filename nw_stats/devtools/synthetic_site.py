@@ -0,0 +1,168 @@
+"""
+Synthetic SNWK Pages
+====================
+
+Deterministic generators for pages shaped like snwktavling.se result pages.
+Used by the benchmarks to exercise the parsers without saved or live pages.
+"""
+
+import random
+from html import escape
+from typing import List
+
+FIRST_NAMES = ["Anna", "Erik", "Karin", "Lars", "Maria", "Johan", "Eva", "Per", "Åsa", "Örjan"]
+LAST_NAMES = ["Andersson", "Johansson", "Karlsson", "Nilsson", "Eriksson", "Larsson", "Öberg", "Lindqvist"]
+CALL_NAMES = ["Rex", "Vilja", "Flora", "Zally", "Ester", "Nemo", "Bamse", "Sigge", "Tassa", "Molly"]
+BREEDS = ["Labrador retriever", "Shih tzu", "Lagotto romagnolo", "Border collie", "Tysk schäferhund"]
+KENNELS = ["Suki-Yaki's", "Tufflaz", "Springer Nova's", "Nosewise", "Sökarglädjens"]
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def participant_html(rng: random.Random, placement: int, start_number: int, total: bool) -> str:
+    """Render one participant ``<li>`` of a result list."""
+    handler = _person(rng)
+    call_name = rng.choice(CALL_NAMES)
+    points = rng.choice([0, 25, 50, 75, 100])
+    faults = rng.randint(0, 3)
+    minutes, seconds = rng.randint(0, 4), rng.uniform(0, 59.99)
+    prefix = "Total" if total else ""
+    points_label = "Totalpoäng" if total else "Poäng"
+    return "\n".join([
+        "<li>",
+        f"<strong>Placering: {placement}</strong>",
+        f"<strong>{escape(handler)} &amp; {escape(call_name)}</strong>",
+        f"<span>{points_label}: {points}</span>",
+        f"<span>{prefix}{'fel' if total else 'Fel'}: {faults}</span>",
+        f"<span>{prefix}{'tid' if total else 'Tid'}: {minutes:02d}:{seconds:05.2f}</span>".replace(".", ","),
+        f"<span>Startnr: {start_number}</span>",
+        f"<div>Förare: {escape(handler)}</div>",
+        f"<div>Hund: {escape(rng.choice(KENNELS))} {escape(call_name)}</div>",
+        f"<div>Ras: {escape(rng.choice(BREEDS))}</div>",
+        "</li>",
+    ])
+
+
+def result_page_html(seed: int, participants: int = 60, search_type: str = "Inomhus",
+                     total: bool = True, judges: int = 1) -> str:
+    """
+    Render a result subpage.
+
+    Args:
+        seed: Seed making the page deterministic
+        participants: Number of starters in the result list
+        search_type: Search type shown in the last ``<h2>``
+        total: Render a "total" page (judge div) rather than a moment page (judge paragraph)
+        judges: Number of judges on total pages
+    """
+    rng = random.Random(seed)
+    if total:
+        judge_html = '<div class="domardiv">' + " ".join(
+            f"Domare {i + 1}: {_person(rng)}" for i in range(judges)
+        ) + "</div>"
+    else:
+        judge_html = f"<p>Domare: {escape(_person(rng))}</p>"
+
+    start_numbers: List[int] = rng.sample(range(1, participants + 1), participants)
+    items = [
+        participant_html(rng, placement, start_number, total)
+        for placement, start_number in enumerate(start_numbers, 1)
+    ]
+    navigation = "".join(f'<div class="nav"><a href="?page=x{i}">Länk {i}</a></div>' for i in range(20))
+    return (
+        "<!DOCTYPE html><html><head><title>SNWK Resultat</title></head><body>"
+        f'<div class="wrapper"><header>{navigation}</header>'
+        '<div class="content">'
+        f"<h2>Resultat</h2><h2>Sök {escape(search_type)}</h2>{judge_html}"
+        '<ul class="resultlist">\n' + "\n".join(items) + "\n</ul>"
+        '</div><footer><p>Svenska Nose Work Klubben</p></footer></div>'
+        "</body></html>"
+    )
+
+
+LOCATIONS = ["Stockholm", "Göteborg", "Malmö", "Uppsala", "Västerås", "Örebro", "Linköping"]
+CLASSES = ["NW1", "NW2", "NW3"]
+TSM_SEARCHES = ["Behållarsök", "Inomhussök", "Utomhussök", "Fordonssök"]
+TEM_SEARCHES = ["Behållare", "Inomhus", "Utomhus", "Fordon"]
+
+
+def _competition_id(year: int, number: int) -> str:
+    return f"syn{year}x{number:04d}"
+
+
+def listing_html(year: int, competitions: int) -> str:
+    """Render the yearly competition listing returned by ``POST ?page=resultat``."""
+    rng = random.Random(year)
+    rows = []
+    for number in range(competitions):
+        typ = "TEM" if number % 3 else "TSM"
+        klass = CLASSES[number % len(CLASSES)]
+        date = f"{year}-{1 + number % 12:02d}-{1 + number % 28:02d}"
+        href = f"?page=showres&showres=&typ={typ}&arr={_competition_id(year, number)}&klass={klass}"
+        text = (
+            f"{date} {rng.choice(LOCATIONS)} - {typ} - {klass} "
+            f"Arrangör: Svenska Nose Work Klubben Anordnare: {rng.choice(LAST_NAMES)}s Brukshundklubb"
+        )
+        rows.append(f'<tr><td><a href="{escape(href)}">{escape(text)}</a></td></tr>')
+    return "<table>" + "".join(rows) + "</table>"
+
+
+def competition_subpages(year: int, number: int):
+    """Return the (button text, subpage query) pairs of a synthetic competition."""
+    typ = "TEM" if number % 3 else "TSM"
+    klass = CLASSES[number % len(CLASSES)]
+    base = f"?page=showres&showres=&typ={typ}&arr={_competition_id(year, number)}&klass={klass}"
+    if typ == "TSM":
+        moments = [("Visa total", "moment_alla")] + [
+            (f"Visa {search}", f"moment_{i + 1}") for i, search in enumerate(TSM_SEARCHES)
+        ]
+    else:
+        moments = [("Visa total", "moment_alla"), ("Visa Moment 1", "moment_1")]
+    return [(text, f"{base}&moment={moment}") for text, moment in moments]
+
+
+def competition_html(year: int, number: int) -> str:
+    """Render a competition page with its ``Visa ...`` subpage buttons."""
+    buttons = "".join(
+        f"<button id=\"btn{i}\" onclick=\"location='{escape(query)}'\">{escape(text)}</button>"
+        for i, (text, query) in enumerate(competition_subpages(year, number))
+    )
+    return f"<html><body><h1>Tävling</h1><div class=\"buttons\">{buttons}</div></body></html>"
+
+
+def write_synthetic_site(directory, years: List[int], competitions_per_year: int, participants: int) -> None:
+    """
+    Write a complete synthetic recording for the replay server.
+
+    Args:
+        directory: Recording directory
+        years: Years with a listing page
+        competitions_per_year: Competitions in every listing
+        participants: Starters in every result list
+    """
+    from nw_stats.devtools.replay_server import LIVE_SITE_URL, RecordingWriter
+
+    writer = RecordingWriter(directory)
+    for year in years:
+        writer.add(
+            "POST", f"{LIVE_SITE_URL}/?page=resultat",
+            {"tavTyp": "alla", "klass": "alla", "year": str(year)},
+            listing_html(year, competitions_per_year), json_body=True,
+        )
+        for number in range(competitions_per_year):
+            subpages = competition_subpages(year, number)
+            # The competition page is the first subpage URL without its moment
+            competition_url = f"{LIVE_SITE_URL}/{subpages[0][1].rsplit('&moment=', 1)[0]}"
+            writer.add("GET", competition_url, None, competition_html(year, number))
+            search_type = TEM_SEARCHES[number % len(TEM_SEARCHES)]
+            for i, (text, query) in enumerate(subpages):
+                writer.add("GET", f"{LIVE_SITE_URL}/{query}", None, result_page_html(
+                    seed=year * 10000 + number * 10 + i,
+                    participants=participants,
+                    search_type=search_type,
+                    total=text == "Visa total",
+                    judges=1 + number % 2,
+                ))
+    writer.save()
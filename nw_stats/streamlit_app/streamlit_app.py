@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import json
 import sys
-import requests
 from pathlib import Path
 
 # Add the project root to Python path for imports
@@ -11,14 +9,35 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from nw_stats.config import ProjectPaths
+from nw_stats.data.aggregate_cube import build_cube
+from nw_stats.data.parquet_store import dataset_exists, pyarrow_available, read_participants
+from nw_stats.data.compaction import CompactedResults
+from nw_stats.data.dataset_cache import DatasetCache
+from nw_stats.data.dog_index import DogIndex
+from nw_stats.data.filter_index import FilterIndex
+from nw_stats.data.histogram import histogram_bins, histogram_figure
+from nw_stats.data.results_stream import load_participants, participants_from_competitions
 import os
 
-dataset_link = "https://github.com/LokeNilsson/NWdata/releases/download/v1.0.0/snwk_competition_results_20251008_050303.json"
+dataset_link = os.environ.get(
+    "NW_STATS_DATASET_URL",
+    "https://github.com/LokeNilsson/NWdata/releases/download/v1.0.0/snwk_competition_results_20251008_050303.json",
+)
+# None reads the checksum published next to the asset (dataset_link + ".sha256")
+dataset_sha256 = os.environ.get("NW_STATS_DATASET_SHA256")
 
 
 # Load data
-@st.cache_data(show_spinner=False)
-def load_data():
+def read_dataset():
+    # The partitioned Parquet dataset is already flat and typed, no JSON needed
+    if pyarrow_available() and dataset_exists():
+        return read_participants(), "Parquet Dataset (Local)"
+    
+    # The compacted dataset holds every collected competition exactly once
+    compacted = CompactedResults(ProjectPaths.COMPACTED_RESULTS)
+    if compacted.exists():
+        return participants_from_competitions(compacted), "Compacted Dataset (Local)"
+    
     # Try to load full dataset first, then fallback to sample for online deployment
     full_filename = "snwk_competition_results_20251008_050303.json"
     sample_filename = "sample_competition_results.json"
@@ -29,101 +48,67 @@ def load_data():
     # Check if local file exists (for local development)
     if os.path.exists(full_filepath):
         dataset_type = "Full Dataset (Local)"
-        with open(full_filepath, "r", encoding="utf-8") as f:
-            competitions_data = json.load(f)
+        # Streamed and flattened in chunks; the nested JSON is never loaded whole
+        return load_participants(full_filepath), dataset_type
     # elif os.path.exists(sample_filepath):
     #     dataset_type = "Sample Dataset (50 competitions)"
     #     with open(sample_filepath, "r", encoding="utf-8") as f:
     #         competitions_data = json.load(f)
     else:
-        # Try to download from GitHub Releases
+        # Download from GitHub Releases once; later cold starts read the local cache
         try:
+            dataset_cache = DatasetCache()
+            if dataset_cache.is_cached(dataset_link, dataset_sha256):
+                return dataset_cache.load(dataset_link), "Full Dataset (GitHub Releases, cached)"
+            
             # Create a placeholder for temporary messages
             status_placeholder = st.empty()
             status_placeholder.info(" Laddar ner fullständig dataset från GitHub Releases...")
             
-            response = requests.get(dataset_link, timeout=120)
-            response.raise_for_status()
-            competitions_data = response.json()
+            participants = dataset_cache.fetch(dataset_link, dataset_sha256)
             dataset_type = "Full Dataset (GitHub Releases)"
             
             # Clear the loading message and show brief success
             status_placeholder.empty()
+            return participants, dataset_type
             
         except Exception as e:
             st.error(f" Kunde inte ladda data från GitHub Releases: {str(e)}")
             st.error("För lokal användning: se till att din dataset-fil finns i data-mappen.")
             st.error("För online-deployment: kontrollera GitHub Release med dataset-filen.")
             st.stop()
-    
 
-    # Transform to dataframe (copy the function from your notebook)
-    def convert_time_to_seconds(time_str):
-        if pd.isna(time_str) or time_str == '':
-            return None
-        try:
-            time_str = str(time_str).replace(',', '.')
-            if ':' in time_str:
-                parts = time_str.split(':')
-                if len(parts) == 2:
-                    minutes = float(parts[0])
-                    seconds = float(parts[1])
-                    return minutes * 60 + seconds
-                elif len(parts) == 3:
-                    hours = float(parts[0])
-                    minutes = float(parts[1]) 
-                    seconds = float(parts[2])
-                    return hours * 3600 + minutes * 60 + seconds
-            else:
-                return float(time_str)
-        except:
-            return None
-
-    def create_participants_dataframe(competitions_data):
-        participants_list = []
-
-        for comp in competitions_data:
-            comp_date = comp.get('datum', '')
-            comp_location = comp.get('plats', '')
-            comp_type = comp.get('typ', '')
-            comp_class = comp.get('klass', '')
-            comp_organizer = comp.get('arrangör', '')
-            comp_coordinator = comp.get('anordnare', '')
-
-            for result_set in comp.get('resultat', []):
-                search_type = result_set.get('sök', '')
-                judges = result_set.get('domare', [])
-                judge_names = ', '.join(judges) if judges else ''
-
-                for participant in result_set.get('tabell', []):
-                    participant_row = {
-                        'klass': comp_class,
-                        'datum': comp_date,
-                        'plats': comp_location,
-                        'typ': comp_type,
-                        'arrangör': comp_organizer,
-                        'anordnare': comp_coordinator,
-                        'typ_av_sök': search_type,
-                        'domare': judge_names,
-                        'förare': participant.get('handler', ''),
-                        'hund_namn': participant.get('dog_call_name', ''),
-                        'stamtavlenamn': participant.get('dog_full_name', ''),
-                        'hundras': participant.get('dog_breed', ''),
-                        'start_position': participant.get('start_number', ''),
-                        'placering': participant.get('placement', ''),
-                        'poäng': participant.get('points', ''),
-                        'fel': participant.get('faults', ''),
-                        'tid': convert_time_to_seconds(participant.get('time', ''))
-                    }
-                    participants_list.append(participant_row)
-
-        return pd.DataFrame(participants_list)
-
-    return create_participants_dataframe(competitions_data), dataset_type
+
+@st.cache_data(show_spinner=False)
+def load_data():
+    participants, dataset_type = read_dataset()
+    # Hashed once per load; the resources below are keyed on it, so they are
+    # rebuilt whenever the loaded data changes, not only when its source does
+    data_version = f"{len(participants)}:{pd.util.hash_pandas_object(participants, index=False).sum()}"
+    return participants, dataset_type, data_version
+
+
+@st.cache_resource(show_spinner=False)
+def load_cube(_participants, data_version):
+    # Built once per version of the data and shared by all sessions; the frame itself is not hashed
+    return build_cube(_participants)
+
+
+@st.cache_resource(show_spinner=False)
+def load_filter_index(_participants, data_version):
+    return FilterIndex(_participants)
+
+
+@st.cache_resource(show_spinner=False)
+def load_dog_index(_participants, data_version):
+    return DogIndex(_participants)
+
 
 # Load the data
 with st.spinner(""):  # Empty spinner to override default
-    df_participants, dataset_type = load_data()
+    df_participants, dataset_type, data_version = load_data()
+    filter_index = load_filter_index(df_participants, data_version)
+    dog_index = load_dog_index(df_participants, data_version)
 
 # Simple Streamlit test with your competition data
 st.title("🐕 Statistik För NoseWork Sök 🐕")
@@ -142,9 +127,9 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric("Totala Sök", len(df_participants))
 with col2:
-    st.metric("Olika Hundraser", df_participants['hundras'].nunique())
+    st.metric("Olika Hundraser", len(filter_index.values('hundras')))
 with col3:
-    st.metric("Olika Förare", df_participants['förare'].nunique())
+    st.metric("Olika Förare", len(filter_index.values('förare')))
 with col4:
     st.metric("Olika Arrangörer", df_participants['arrangör'].nunique())
 
@@ -152,27 +137,27 @@ with col4:
 st.sidebar.header("Filter")
 selected_comp_type = st.sidebar.selectbox(
     "Typ av Tävling:",
-    ['All'] + list(df_participants['typ'].unique())
+    ['All'] + filter_index.values('typ')
 )
 
 selected_search_type = st.sidebar.selectbox(
     "Typ av Sök:",
-    list(df_participants['typ_av_sök'].unique())
+    filter_index.values('typ_av_sök')
 )
 
 selected_class = st.sidebar.selectbox(
     "Klass:",
-    ['All'] + list(df_participants['klass'].unique())
+    ['All'] + filter_index.values('klass')
 )
 
 selected_ref = st.sidebar.selectbox(
     "Domare:",
-    ['All'] + list(df_participants['domare'].unique())
+    ['All'] + filter_index.values('domare')
 )
 
 selected_race = st.sidebar.selectbox(
     "Hundras:",
-    ['All'] + list(df_participants['hundras'].unique())
+    ['All'] + filter_index.values('hundras')
 )
 
 # Author info in sidebar
@@ -186,79 +171,53 @@ st.sidebar.markdown("""
 """)
 
 
-# Apply filters
-filtered_df = df_participants.copy()
-if selected_comp_type != 'All':
-    filtered_df = filtered_df[filtered_df['typ'] == selected_comp_type]
-
-filtered_df = filtered_df[filtered_df['typ_av_sök'] == selected_search_type]
-
-if selected_class != 'All':
-    filtered_df = filtered_df[filtered_df['klass'] == selected_class]
-
-if selected_ref != 'All':
-    filtered_df = filtered_df[filtered_df['domare'] == selected_ref]
+# Apply filters by intersecting precomputed row positions ('All' is no filter);
+# only the matching rows are copied
+filtered_df = filter_index.take(
+    typ=selected_comp_type,
+    typ_av_sök=selected_search_type,
+    klass=selected_class,
+    domare=selected_ref,
+    hundras=selected_race,
+)
 
-if selected_race != 'All':
-    filtered_df = filtered_df[filtered_df['hundras'] == selected_race]
 
+# Charts are looked up in the aggregate cube instead of recomputed from the rows
+cube = load_cube(df_participants, data_version)
+cell = cube.cell(selected_comp_type, selected_search_type, selected_class, selected_ref, selected_race)
 
-# Charts
-st.header(f" Statistik Enligt Filter ({len(filtered_df)} sök)")
+st.header(f" Statistik Enligt Filter ({cube.starts(cell)} sök)")
 
-# Points distribution
-fig_points = px.histogram(
-    filtered_df, 
-    x = 'poäng', 
-    title ='Poängdistribution',
-    nbins = 10,
-    labels={'poäng': 'Poäng'}
+# Points distribution, binned here so only the bars are sent to the browser
+points = cube.points(cell)
+fig_points = histogram_figure(
+    histogram_bins(points['poäng'], points['count'], nbins=10),
+    title='Poängdistribution', label='Poäng', y_label="Antal Sök",
 )
-fig_points.update_layout(yaxis_title="Antal Sök")
 st.plotly_chart(fig_points, use_container_width=True)
 
 # Errors Distribution
-fig_errors = px.histogram(
-    filtered_df, 
-    x = 'fel', 
-    title ='Feldistribution',
-    nbins = 10,
-    labels={'fel': 'Fel'}
+faults = cube.faults(cell)
+fig_errors = histogram_figure(
+    histogram_bins(faults['fel'], faults['count'], nbins=10),
+    title='Feldistribution', label='Fel', y_label="Antal Sök",
 )
-fig_errors.update_layout(yaxis_title="Antal Sök")
 st.plotly_chart(fig_errors, use_container_width=True)
 
 # Time Distribution
-time_data = filtered_df[filtered_df['tid'].notna()].copy()
-time_data['tid_kategori'] = pd.cut(
-    time_data['tid'], 
-    bins=[0, 30, 60, 120, 300, float('inf')],
-    labels=['<30s', '30-60s', '1-2min', '2-5min', '>5min']
-)
-
-fig_time = px.histogram(
-    time_data,
+fig_time = px.bar(
+    cube.time_categories(cell),
     x='tid_kategori',
+    y='count',
     title='Tidsdistribution',
     labels={'tid_kategori': 'Tid'}
 )
 fig_time.update_layout(yaxis_title="Antal Sök")
 st.plotly_chart(fig_time, use_container_width=True)
 
-# Time vs Points Relationship (using binned heatmap for performance)
-time_points_data = filtered_df[(filtered_df['tid'].notna()) & (filtered_df['poäng'].notna())].copy()
-if len(time_points_data) > 0:
-    # Create time bins for better performance
-    time_points_data['tid_binned'] = pd.cut(
-        time_points_data['tid'], 
-        bins=10, 
-        precision=0
-    ).astype(str)
-    
-    # Create average points by time bin
-    time_summary = time_points_data.groupby('tid_binned')['poäng'].agg(['mean', 'count']).reset_index()
-    time_summary = time_summary[time_summary['count'] >= 5]  # Only bins with enough data
-    
+# Time vs Points Relationship (average points per time group, groups with at least 5 searches)
+time_summary = cube.time_points(cell)
+if len(time_summary) > 0:
     fig_time_points = px.bar(
         time_summary,
         x='tid_binned',
@@ -270,41 +229,9 @@ if len(time_points_data) > 0:
     fig_time_points.update_xaxes(tickangle=45)
     st.plotly_chart(fig_time_points, use_container_width=True)
 
-# Start Position vs Placement Analysis
-placement_data = filtered_df[(filtered_df['start_position'].notna()) & 
-                           (filtered_df['placering'].notna())].copy()
-# Convert to numeric to ensure proper plotting
-placement_data['start_position'] = pd.to_numeric(placement_data['start_position'], errors='coerce')
-placement_data['placering'] = pd.to_numeric(placement_data['placering'], errors='coerce')
-placement_data = placement_data.dropna(subset=['start_position', 'placering'])
-
-# Start Position vs Placement Analysis (using binned averages for performance)
-placement_data = filtered_df[(filtered_df['start_position'].notna()) & 
-                           (filtered_df['placering'].notna())].copy()
-# Convert to numeric to ensure proper plotting
-placement_data['start_position'] = pd.to_numeric(placement_data['start_position'], errors='coerce')
-placement_data['placering'] = pd.to_numeric(placement_data['placering'], errors='coerce')
-placement_data = placement_data.dropna(subset=['start_position', 'placering'])
-
-if len(placement_data) > 0:
-    # Create start position bins for better performance
-    max_start = placement_data['start_position'].max()
-    bin_size = max(1, int(max_start / 10))  # Create ~10 bins
-    placement_data['start_binned'] = (
-        (placement_data['start_position'] - 1) // bin_size * bin_size + 1
-    ).astype(int)
-    
-    # Calculate average placement by start position bin
-    placement_summary = placement_data.groupby('start_binned').agg({
-        'placering': ['mean', 'count'],
-        'start_position': 'mean'
-    }).round(1)
-    
-    # Flatten column names
-    placement_summary.columns = ['avg_placement', 'count', 'avg_start_pos']
-    placement_summary = placement_summary.reset_index()
-    placement_summary = placement_summary[placement_summary['count'] >= 5]  # Only bins with enough data
-    
+# Start Position vs Placement Analysis (average placement per start position group)
+placement_summary = cube.placement(cell)
+if len(placement_summary) > 0:
     fig_position_placement = px.bar(
         placement_summary,
         x='start_binned',
@@ -343,19 +270,13 @@ if len(filtered_df) > 0:
 st.header(" Statistik per Hund")
 dog_name = st.selectbox("Välj hund genom stamtavlenamn", filtered_df['stamtavlenamn'].unique())
 
-dog_df = df_participants.copy()
-if selected_comp_type != 'All':
-    dog_df = dog_df[dog_df['typ'] == selected_comp_type]
-if selected_class != 'All':
-    dog_df = dog_df[dog_df['klass'] == selected_class]
-
 if dog_name:
-    dog_data = dog_df[dog_df['stamtavlenamn'] == dog_name]
+    dog_rows = dog_index.rows(dog_name, typ=selected_comp_type, klass=selected_class)
 
-    st.write(f"**{dog_name}** har genomfört {len(dog_data)} sök")
+    st.write(f"**{dog_name}** har genomfört {len(dog_rows)} sök")
 
     # Performance by search type
-    performance_by_search = dog_data.groupby('typ_av_sök')['poäng'].mean().reset_index()
+    performance_by_search = dog_index.search_averages(dog_name, typ=selected_comp_type, klass=selected_class)
 
     fig_dog_performance = px.bar(
         performance_by_search,
@@ -368,8 +289,11 @@ if dog_name:
     # Recent competitions
     searches_to_show = 10
     st.write(f"Senaste {searches_to_show} Sök:")
-    recent_comps = dog_data.sort_values('datum', ascending=False).head(searches_to_show)
-    st.dataframe(recent_comps[['datum', 'plats', 'typ_av_sök', 'poäng', 'placering']], use_container_width=True)
+    recent_comps = dog_index.recent(
+        dog_name, searches_to_show, typ=selected_comp_type, klass=selected_class,
+        columns=['datum', 'plats', 'typ_av_sök', 'poäng', 'placering'],
+    )
+    st.dataframe(recent_comps, use_container_width=True)
 
 # Footer
 st.markdown("---")
@@ -27,6 +27,9 @@ setup(
             "matplotlib>=3.5.0",
             "seaborn>=0.11.0",
         ],
+        "parquet": [
+            "pyarrow>=10.0.0",
+        ],
         "notebooks": [
             "jupyter>=1.0.0",
             "ipykernel>=6.15.0",
@@ -45,11 +48,14 @@ setup(
             "seaborn>=0.11.0",
             "jupyter>=1.0.0",
             "ipykernel>=6.15.0",
+            "pyarrow>=10.0.0",
         ],
     },
     entry_points={
         "console_scripts": [
             "nw-scrape=nw_stats.data_collection.scrape_data:main",
+            "nw-reparse=nw_stats.data_collection.reparse:main",
+            "nw-compact=nw_stats.data.compaction:main",
         ],
     },
     classifiers=[